@@ -1,9 +1,139 @@
-from flask import Flask, request, render_template
+import os
+import threading
+import time
 
-from src.pipeline.predict_pipeline import CustomData, PredictPipeline
+from flask import Flask, Response, g, request, render_template, jsonify
+
+from src.exception import ValidationError
+from src.logger import logging
+from src.metrics import metrics, timed
+
+from src.pipeline.inference_executor import DeadlineExceeded, InferenceExecutor, InferenceExecutorConfig, Overloaded
+from src.pipeline.memory_report import process_memory
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+from src.pipeline.model_registry import get_model_registry
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS, CustomData, PredictPipeline, columns_to_records
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+from src.pipeline.request_capture import RequestCapture, RequestCaptureConfig
 
 app = Flask(__name__)
 
+# One model and preprocessor for the whole process, loaded by warm_up() and not on import.
+# Under the pre-fork server (gunicorn.conf.py) warm_up() runs in the master, so all workers
+# share one copy; otherwise it runs on the first request
+model_registry = get_model_registry()
+
+# Opt-in prediction cache keyed on the (small, discrete) input space
+prediction_cache = None
+if os.environ.get('PREDICTION_CACHE') == '1':
+    prediction_cache = PredictionCache(PredictionCacheConfig(
+        max_entries=int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', 100_000)),
+        ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL_SECONDS', 3600)),
+        precompute_grid=os.environ.get('PREDICTION_CACHE_GRID') == '1'
+    ))
+
+# Opt-in micro-batching: concurrent single-row requests are grouped
+# into one vectorized preprocessor/model call
+micro_batcher = None
+if os.environ.get('MICRO_BATCHING') == '1':
+    micro_batcher = MicroBatcher(PredictPipeline(cache=prediction_cache), MicroBatcherConfig(
+        max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64)),
+        max_wait_ms=float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2.0)),
+        default_timeout_ms=float(os.environ.get('MICRO_BATCH_TIMEOUT_MS', 1000))
+    ))
+
+# Opt-in capture of prediction requests and results to a JSON-lines file,
+# written off the request path, for replaying real traffic (benchmarks/replay.py)
+request_capture = None
+if os.environ.get('REQUEST_CAPTURE') == '1':
+    request_capture = RequestCapture(RequestCaptureConfig(
+        file_path=os.environ.get('REQUEST_CAPTURE_PATH', RequestCaptureConfig.file_path),
+        max_bytes=int(os.environ.get('REQUEST_CAPTURE_MAX_BYTES', 50 * 1024 * 1024)),
+        sample_rate=float(os.environ.get('REQUEST_CAPTURE_SAMPLE_RATE', 1.0))
+    ))
+
+# Bounded pool for /api/predict/async: requests beyond the queue depth get a 429
+# and requests that cannot be answered before their deadline get a 503
+inference_executor = InferenceExecutor(InferenceExecutorConfig(
+    max_workers=int(os.environ.get('INFERENCE_WORKERS', 4)),
+    max_queue_depth=int(os.environ.get('INFERENCE_QUEUE_DEPTH', 32)),
+    default_deadline_ms=float(os.environ.get('INFERENCE_DEADLINE_MS', 1000))
+))
+
+def warm_up():
+    """
+    Loads the model and preprocessor, if they are not loaded yet.
+
+    Raises:
+        CustomException: If the artifacts cannot be read or deserialized.
+    """
+    model_registry.get()
+
+def start_background_threads(watch_artifacts=True):
+    """
+    Starts the artifact watcher (hot-reloads changed artifacts) and the micro-batcher.
+
+    Threads do not survive fork(), so the pre-fork server skips this in the master
+    and calls it in every worker after forking instead.
+    """
+    warm_up()
+    if watch_artifacts:
+        model_registry.start_watching()
+    if micro_batcher is not None:
+        micro_batcher.start()
+
+_started = False
+_start_lock = threading.Lock()
+
+@app.before_request
+def start_on_first_request():
+    # The pre-fork server warms up and starts the threads from its hooks instead
+    global _started
+    if _started or os.environ.get('PREFORK_SERVER') == '1':
+        return
+    with _start_lock:
+        if not _started:
+            start_background_threads()
+            _started = True
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.observe(
+            'http_request_duration_seconds', time.perf_counter() - started,
+            endpoint=request.url_rule.rule if request.url_rule is not None else 'unmatched',
+            method=request.method, status=response.status_code
+        )
+    return response
+
+def capture_request(records, status, results=None, error=None):
+    """
+    Hands one prediction request to the request capture, if it is enabled.
+    
+    Args:
+        records (list): The input records.
+        status (int): The HTTP status of the response.
+        results (dict): The predict_batch result, if the request was scored.
+        error (str): Why the request was rejected, if it was.
+    """
+    if request_capture is None:
+        return
+    started = g.get('request_started')
+    request_capture.capture(
+        endpoint=request.url_rule.rule,
+        records=records,
+        status=status,
+        latency_ms=(time.perf_counter() - started) * 1000.0 if started is not None else 0.0,
+        model_version=results['model_version'] if results is not None else model_registry.version,
+        predictions=results['predictions'] if results is not None else None,
+        errors=results['errors'] if results is not None else [error]
+    )
+
 # Route for a home page
 @app.route('/')
 def index():
@@ -15,23 +145,139 @@ def predict_datapoint():
     if request.method == 'GET':
         return render_template('home.html')
     else:
-        input_data = CustomData(
-            gender = request.form.get('gender'),
-            race_ethnicity = request.form.get('race_ethnicity'),
-            parental_level_of_education = request.form.get('parental_level_of_education'),
-            lunch = request.form.get('lunch'),
-            test_preparation_course = request.form.get('test_preparation_course'),
-            reading_score = float(request.form.get('reading_score')),
-            writing_score = float(request.form.get('writing_score'))
-        )
+        with timed('prediction_stage_seconds', stage='parse_form'):
+            form_record = {column: request.form.get(column) for column in FEATURE_COLUMNS}
         
-        input_df = input_data.get_input_data_as_data_frame()
-        print(input_df)
+        predict_pipeline = PredictPipeline(cache=prediction_cache)
+        try:
+            # Reject bad input before any DataFrame is built or the model is called
+            input_data = CustomData(**predict_pipeline.validate(form_record))
+        except ValidationError as e:
+            capture_request([form_record], 400, error=str(e))
+            return render_template("home.html", error=str(e)), 400
         
-        predict_pipeline = PredictPipeline()
-        math_score_results = predict_pipeline.predict(input_df)
-        return render_template("home.html", results=math_score_results[0])
+        if micro_batcher is not None:
+            deadline_ms = request.headers.get('X-Request-Deadline-Ms', type=float)
+            try:
+                math_score_result = micro_batcher.predict(
+                    input_data.get_input_data_as_dict(),
+                    timeout=deadline_ms / 1000.0 if deadline_ms is not None else None
+                )
+            except DeadlineExceeded as e:
+                capture_request([form_record], 503, error=str(e))
+                return render_template("home.html", error="The prediction service is busy, please try again"), 503
+        else:
+            input_df = input_data.get_input_data_as_data_frame()
+            logging.debug(f"Prediction input: {input_data.get_input_data_as_dict()}")
+            math_score_result = predict_pipeline.predict(input_df)[0]
+        
+        capture_request([form_record], 200, results={
+            'predictions': [float(math_score_result)], 'errors': [], 'model_version': model_registry.version
+        })
+        return render_template("home.html", results=math_score_result)
+
+def parse_records_payload(payload):
+    """
+    Normalizes a prediction request body to a list of records.
+
+    Returns:
+        tuple: (records, None), or (None, error message) for a malformed body.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get('records', payload.get('columns'))
+    if not isinstance(payload, (list, dict)):
+        return None, "expected a list of records or a dict of columns"
+    
+    if isinstance(payload, dict):
+        try:
+            payload = columns_to_records(payload)
+        except ValidationError as e:
+            return None, str(e)
+    return payload, None
+
+@app.route('/api/predict', methods=['POST'])
+def predict_api():
+    """
+    Scores a batch of students in one call.
+
+    Accepts either a JSON list of records, {"records": [...]} or
+    {"columns": {"gender": [...], ...}} and returns one prediction per record
+    plus a list of per-record validation errors.
+    """
+    records, error = parse_records_payload(request.get_json(silent=True))
+    if error is not None:
+        return jsonify(error=error), 400
+    
+    predict_pipeline = PredictPipeline(cache=prediction_cache)
+    results = predict_pipeline.predict_batch(records)
+    capture_request(records, 200, results=results)
+    return jsonify(results)
+
+@app.route('/api/predict/async', methods=['POST'])
+async def predict_api_async():
+    """
+    Same contract as /api/predict, but the scoring runs on the bounded inference pool.
+
+    An optional X-Request-Deadline-Ms header sets the time budget for this request.
+    Returns 429 when the pool's queue is full and 503 when the deadline passes first.
+    """
+    records, error = parse_records_payload(request.get_json(silent=True))
+    if error is not None:
+        return jsonify(error=error), 400
+    
+    deadline_ms = request.headers.get('X-Request-Deadline-Ms', type=float)
+    predict_pipeline = PredictPipeline(cache=prediction_cache)
+    try:
+        results = await inference_executor.run(predict_pipeline.predict_batch, records, deadline_ms=deadline_ms)
+    except Overloaded as e:
+        capture_request(records, 429, error=str(e))
+        return jsonify(error=str(e)), 429, {'Retry-After': '1'}
+    except DeadlineExceeded as e:
+        capture_request(records, 503, error=str(e))
+        return jsonify(error=str(e)), 503
+    capture_request(records, 200, results=results)
+    return jsonify(results)
+
+@app.route('/api/predict/async/stats')
+def inference_executor_stats():
+    return jsonify(inference_executor.stats())
+
+@app.route('/api/batcher/stats')
+def batcher_stats():
+    if micro_batcher is None:
+        return jsonify(error="micro-batching is disabled, set MICRO_BATCHING=1"), 404
+    return jsonify(micro_batcher.stats())
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    if prediction_cache is None:
+        return jsonify(error="prediction cache is disabled, set PREDICTION_CACHE=1"), 404
+    return jsonify(prediction_cache.stats())
+
+@app.route('/api/capture/stats')
+def capture_stats():
+    if request_capture is None:
+        return jsonify(error="request capture is disabled, set REQUEST_CAPTURE=1"), 404
+    return jsonify(request_capture.stats())
+
+@app.route('/api/memory')
+def memory_stats():
+    """
+    Memory footprint of the process serving this request, to compare workers of the pre-fork server.
+    """
+    memory = process_memory()
+    if memory is None:
+        return jsonify(error="memory stats need /proc/self/smaps_rollup (Linux)"), 404
+    return jsonify(pid=os.getpid(), model_version=model_registry.version, memory_kb=memory)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Request and prediction stage timings in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # Run the application if the script is executed directly
 if __name__ == '__main__':
+    warm_up()
     app.run(debug=True)
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUD_CSV = os.path.join(REPO_ROOT, "notebook", "data", "stud.csv")
+
+CATEGORICAL_COLUMNS = ["gender", "race_ethnicity", "parental_level_of_education", "lunch", "test_preparation_course"]
+SCORE_COLUMNS = ["math_score", "reading_score", "writing_score"]
+
+def load_students():
+    return pd.read_csv(STUD_CSV)
+
+def synthetic_students(n_rows, seed=0):
+    """
+    Builds a dataset shaped like stud.csv with `n_rows` rows, without any network access.
+
+    Rows are drawn with replacement from stud.csv, so the joint distribution of the
+    categories and scores is kept, and each score gets a small integer jitter (clipped to
+    0-100) so the rows are not exact duplicates. The categorical columns are pandas
+    Categoricals, which keeps 10^7 rows at a few hundred MB.
+
+    Args:
+        n_rows (int): Number of rows.
+        seed (int): Random seed; the same seed always gives the same dataset.
+
+    Returns:
+        pd.DataFrame: Same columns as stud.csv.
+    """
+    source = load_students()
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(source), size=n_rows)
+
+    data = {}
+    for column in source.columns:
+        if column in CATEGORICAL_COLUMNS:
+            categorical = pd.Categorical(source[column])
+            data[column] = pd.Categorical.from_codes(categorical.codes[rows], categories=categorical.categories)
+        else:
+            jitter = rng.integers(-3, 4, size=n_rows)
+            data[column] = np.clip(source[column].to_numpy()[rows] + jitter, 0, 100).astype(np.int64)
+    return pd.DataFrame(data)
+
+def with_object_categoricals(df):
+    """
+    Converts the Categorical columns back to object dtype, the way pd.read_csv returns them.
+    """
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype(object)
+    return df
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.pipeline.inference_executor import percentile  # noqa: E402
+
+SAMPLE_VALUES = {
+    "gender": ["female", "male"],
+    "race_ethnicity": ["group A", "group B", "group C", "group D", "group E"],
+    "parental_level_of_education": [
+        "associate's degree", "bachelor's degree", "high school",
+        "master's degree", "some college", "some high school",
+    ],
+    "lunch": ["free/reduced", "standard"],
+    "test_preparation_course": ["completed", "none"],
+}
+
+def random_record(rng):
+    record = {column: rng.choice(values) for column, values in SAMPLE_VALUES.items()}
+    record["reading_score"] = rng.randint(0, 100)
+    record["writing_score"] = rng.randint(0, 100)
+    return record
+
+def start_local_server():
+    """
+    Serves app.py in-process on a free port with the threaded development server.
+
+    Returns:
+        str: The server's base URL.
+    """
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def run_load(url, concurrency, duration, batch_size, deadline_ms, burst_every=None):
+    """
+    Sends prediction requests from `concurrency` closed-loop clients for `duration` seconds.
+
+    With burst_every set, the clients idle for that many seconds between bursts of
+    one second each, to reproduce the bursty traffic the admission control is for.
+
+    Returns:
+        dict: Requests per status code, throughput and p50 / p90 / p99 latency (ms) per status.
+    """
+    stop_at = time.monotonic() + duration
+    latencies = {}
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < stop_at:
+            if burst_every and (time.monotonic() % (burst_every + 1)) >= 1:
+                time.sleep(0.01)
+                continue
+            body = json.dumps([random_record(rng) for _ in range(batch_size)]).encode()
+            headers = {"Content-Type": "application/json"}
+            if deadline_ms is not None:
+                headers["X-Request-Deadline-Ms"] = str(deadline_ms)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, body, headers)) as response:
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = "connection_error"
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with lock:
+                statuses[status] += 1
+                latencies.setdefault(status, []).append(elapsed_ms)
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "duration_seconds": round(elapsed, 2),
+        "requests_per_second": round(sum(statuses.values()) / elapsed, 1),
+        "status_counts": {str(status): count for status, count in statuses.items()},
+        "latency_ms": {
+            str(status): {
+                "p50": round(percentile(sorted(values), 50), 2),
+                "p90": round(percentile(sorted(values), 90), 2),
+                "p99": round(percentile(sorted(values), 99), 2),
+            }
+            for status, values in latencies.items()
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the prediction endpoints and report latency percentiles")
+    parser.add_argument("--url", help="Base URL of a running server; by default app.py is served in-process "
+                                      "(run from the repo root with trained artifacts)")
+    parser.add_argument("--endpoint", default="/api/predict/async", help="/api/predict/async or /api/predict")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--batch-size", type=int, default=1, help="Records per request")
+    parser.add_argument("--deadline-ms", type=float, help="X-Request-Deadline-Ms sent with every request")
+    parser.add_argument("--burst-every", type=float, help="Seconds of idle time between one-second bursts")
+    args = parser.parse_args()
+
+    base_url = args.url or start_local_server()
+    report = run_load(base_url + args.endpoint, args.concurrency, args.duration,
+                      args.batch_size, args.deadline_ms, args.burst_every)
+    if args.endpoint == "/api/predict/async":
+        with urllib.request.urlopen(base_url + "/api/predict/async/stats") as response:
+            report["server_stats"] = json.load(response)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,247 @@
+"""
+Replays captured prediction traffic (REQUEST_CAPTURE=1, see src/pipeline/request_capture.py)
+against the prediction endpoints or PredictPipeline, and reports throughput and latency.
+
+    python benchmarks/replay.py logs/captured_requests.jsonl --speed 1
+    python benchmarks/replay.py logs/captured_requests.jsonl --rate 200 --concurrency 16
+    python benchmarks/replay.py logs/captured_requests.jsonl --target pipeline --output replay.json
+    python benchmarks/replay.py logs/captured_requests.jsonl --output replay.json --compare baseline.json
+
+Pacing:
+- --speed S: keeps the captured inter-arrival times, divided by S (2 = twice as fast)
+- --rate R: sends R requests per second, evenly spaced
+- neither: every client sends its next request as soon as the previous one returns
+
+Each request keeps its captured endpoint and records (or goes to --endpoint). Latency is
+measured from the moment a request is sent; lag_ms is how far sends fell behind their
+schedule, which grows when --concurrency is too low for the requested pace.
+
+With --compare, the run is checked against a previous --output file the same way as
+benchmarks/suite.py: requests_per_second must not drop and the latency percentiles must
+not grow by more than --threshold. The process exits with status 1 on a regression.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.suite import compare, environment  # noqa: E402
+from src.pipeline.inference_executor import percentile  # noqa: E402
+
+def load_captured_requests(file_path, include_rotated=False, limit=None):
+    """
+    Reads captured requests, oldest first.
+
+    Args:
+        file_path (str): The capture file.
+        include_rotated (bool): Also read the rotated files (<file_path>.N ... <file_path>.1) before it.
+        limit (int): Keep at most this many requests.
+
+    Returns:
+        list: Captured entries that have records to replay.
+    """
+    paths = [file_path]
+    if include_rotated:
+        index = 1
+        while os.path.exists(f"{file_path}.{index}"):
+            paths.insert(0, f"{file_path}.{index}")
+            index += 1
+
+    entries = []
+    for path in paths:
+        with open(path) as file_obj:
+            for line in file_obj:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by a crash
+                if entry.get("records"):
+                    entries.append(entry)
+                if limit is not None and len(entries) >= limit:
+                    return entries
+    return entries
+
+def http_sender(base_url, endpoint=None):
+    """
+    Sends a captured request to a running server: the form for /predictdata, JSON otherwise.
+    """
+    def send(entry):
+        path = endpoint or entry["endpoint"]
+        if path == "/predictdata":
+            body = urllib.parse.urlencode(entry["records"][0]).encode()
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        else:
+            body = json.dumps(entry["records"]).encode()
+            headers = {"Content-Type": "application/json"}
+        try:
+            with urllib.request.urlopen(urllib.request.Request(base_url + path, body, headers)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            return "connection_error"
+    return send
+
+def pipeline_sender():
+    """
+    Scores a captured request in-process with PredictPipeline.predict_batch, without HTTP.
+    """
+    from src.pipeline.predict_pipeline import PredictPipeline
+
+    predict_pipeline = PredictPipeline()
+
+    def send(entry):
+        try:
+            predict_pipeline.predict_batch(entry["records"])
+            return 200
+        except Exception:
+            return "error"
+    return send
+
+def schedule(entries, rate=None, speed=None):
+    """
+    Send offsets in seconds from the start of the run, None to send back to back.
+    """
+    if speed:
+        start = datetime.fromisoformat(entries[0]["timestamp"])
+        return [(datetime.fromisoformat(entry["timestamp"]) - start).total_seconds() / speed for entry in entries]
+    if rate:
+        return [index / rate for index in range(len(entries))]
+    return None
+
+def _latency_summary(values):
+    values = sorted(values)
+    return {
+        "p50": round(percentile(values, 50), 2),
+        "p90": round(percentile(values, 90), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(values[-1], 2),
+    } if values else None
+
+def run_replay(entries, send, concurrency, offsets=None):
+    """
+    Replays `entries` with `concurrency` client threads.
+
+    Returns:
+        dict: Requests and records sent, throughput, status counts, latency and lag
+              percentiles (ms), and the latency percentiles captured with the same requests.
+    """
+    latencies, lags = [], []
+    statuses = Counter()
+    lock = threading.Lock()
+    next_index = iter(range(len(entries)))
+
+    def client():
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                return
+            if offsets is not None:
+                delay = started + offsets[index] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent = time.perf_counter()
+            status = send(entries[index])
+            elapsed_ms = (time.perf_counter() - sent) * 1000.0
+            with lock:
+                statuses[status] += 1
+                latencies.append(elapsed_ms)
+                if offsets is not None:
+                    lags.append(max(sent - started - offsets[index], 0.0) * 1000.0)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    n_records = sum(len(entry["records"]) for entry in entries)
+    return {
+        "requests": len(entries),
+        "records": n_records,
+        "duration_seconds": round(elapsed, 2),
+        "requests_per_second": round(len(entries) / elapsed, 1),
+        "records_per_second": round(n_records / elapsed, 1),
+        "status_counts": {str(status): count for status, count in statuses.items()},
+        "latency_ms": _latency_summary(latencies),
+        "lag_ms": _latency_summary(lags),
+        "captured_latency_ms": _latency_summary([entry["latency_ms"] for entry in entries if entry["status"] == 200]),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured prediction traffic and report latency percentiles",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("capture_file", help="JSON-lines file written with REQUEST_CAPTURE=1")
+    parser.add_argument("--include-rotated", action="store_true", help="Also replay the rotated capture files")
+    parser.add_argument("--limit", type=int, help="Replay at most this many requests")
+    parser.add_argument("--target", choices=("http", "pipeline"), default="http",
+                        help="http: POST to the server, pipeline: call PredictPipeline in-process")
+    parser.add_argument("--url", help="Base URL of a running server; by default app.py is served in-process "
+                                      "(run from the repo root with trained artifacts)")
+    parser.add_argument("--endpoint", help="Send every request here instead of its captured endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--rate", type=float, help="Requests per second")
+    pacing.add_argument("--speed", type=float, help="Replay the captured timing, this many times faster")
+    parser.add_argument("--output", help="Write the report JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Previous --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative change that counts as a regression (default 0.25)")
+    args = parser.parse_args()
+
+    entries = load_captured_requests(args.capture_file, args.include_rotated, args.limit)
+    if not entries:
+        parser.error(f"{args.capture_file} has no captured requests to replay")
+
+    if args.target == "pipeline":
+        send = pipeline_sender()
+    else:
+        from benchmarks.load_test import start_local_server
+        send = http_sender(args.url or start_local_server(), args.endpoint)
+
+    replay = run_replay(entries, send, args.concurrency, schedule(entries, args.rate, args.speed))
+    unit_id = f"replay/target={args.target}"
+    report = {
+        "environment": environment(),
+        "settings": {"capture_file": args.capture_file, "target": args.target, "endpoint": args.endpoint,
+                     "concurrency": args.concurrency, "rate": args.rate, "speed": args.speed},
+        "replay": replay,
+        # Same layout as benchmarks/suite.py results, so runs can be compared
+        "results": [{"id": unit_id, "case": "replay", "params": {"target": args.target}, "info": {}, "metrics": {
+            "requests_per_second": replay["requests_per_second"],
+            "latency_p50_ms": replay["latency_ms"]["p50"],
+            "latency_p90_ms": replay["latency_ms"]["p90"],
+            "latency_p99_ms": replay["latency_ms"]["p99"],
+        }}],
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file_obj:
+            report["comparison"] = compare(report["results"], json.load(file_obj), args.threshold)
+        regressions = [entry for entry in report["comparison"] if entry["regression"]]
+        for entry in regressions:
+            print(f"REGRESSION {entry['id']} {entry['metric']}: {entry['baseline']:.6g} -> "
+                  f"{entry['current']:.6g} ({entry['change']:+.1%})", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            file_obj.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Everything app.py imports from src
+SERVING_MODULES = (
+    "src.metrics",
+    "src.pipeline.inference_executor",
+    "src.pipeline.memory_report",
+    "src.pipeline.micro_batcher",
+    "src.pipeline.model_registry",
+    "src.pipeline.predict_pipeline",
+    "src.pipeline.prediction_cache",
+    "src.pipeline.request_capture",
+)
+
+# Training-only code that must never be imported by the serving modules
+FORBIDDEN_SERVING_IMPORTS = (
+    "catboost",
+    "xgboost",
+    "pandas",
+    "joblib",
+    "sklearn",
+    "src.components",
+    "src.stage_cache",
+)
+
+TARGETS = {
+    "serving": f"import {', '.join(SERVING_MODULES)}",
+    "serving_with_artifacts": (
+        f"import {', '.join(SERVING_MODULES)}; "
+        "from src.pipeline.model_registry import get_model_registry; get_model_registry().get()"
+    ),
+    "training": "import src.components.data_ingestion",
+}
+
+_MEASURE = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}}))
+"""
+
+def _run(statement):
+    """
+    Runs `statement` in a fresh interpreter, so every measurement is a cold import.
+
+    Returns:
+        dict: {"seconds": import time, "modules": every module loaded afterwards}
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE.format(statement=statement)],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def forbidden_imports(modules):
+    return sorted(
+        module for module in modules
+        if any(module == name or module.startswith(name + ".") for name in FORBIDDEN_SERVING_IMPORTS)
+    )
+
+def check_serving_imports():
+    """
+    Imports the serving modules in a fresh interpreter and lists any training-only module they pulled in.
+    """
+    return forbidden_imports(_run(TARGETS["serving"])["modules"])
+
+def benchmark(targets, repeat):
+    """
+    Measures the cold import time of each target.
+
+    Returns:
+        dict: Target -> median / min seconds over `repeat` runs and the number of modules loaded.
+    """
+    results = {}
+    for target in targets:
+        runs = [_run(TARGETS[target]) for _ in range(repeat)]
+        seconds = [run["seconds"] for run in runs]
+        results[target] = {
+            "median_seconds": round(statistics.median(seconds), 4),
+            "min_seconds": round(min(seconds), 4),
+            "modules_loaded": len(runs[0]["modules"]),
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold start of the serving and training import paths")
+    parser.add_argument("--check", action="store_true",
+                        help="Only verify that the serving modules do not import the training stack (exit 1 if they do)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=["serving", "training"],
+                        help="serving_with_artifacts also needs trained artifacts in ./artifacts")
+    args = parser.parse_args()
+
+    leaked = check_serving_imports()
+    if args.check:
+        if leaked:
+            print("Serving modules import training-only code:\n  " + "\n  ".join(leaked), file=sys.stderr)
+            sys.exit(1)
+        print("Serving import check passed")
+        sys.exit(0)
+
+    report = {"serving_import_check": "failed" if leaked else "passed", "results": benchmark(args.targets, args.repeat)}
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,440 @@
+"""
+Benchmark suite for training and inference performance.
+
+Every benchmark unit runs in a fresh interpreter, so timings do not depend on what ran
+before and each unit reports its own peak RSS. Everything runs offline from
+notebook/data/stud.csv and synthetic datasets derived from it (benchmarks/datasets.py).
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --output results.json --compare baseline.json
+    python benchmarks/suite.py --cases preprocessing --sizes 10000 1000000 10000000
+
+Cases:
+- training_search: wall time of evaluate_models with the repo's grid per model, on stud.csv
+- training_fit: fit time of each model with default parameters on synthetic data per size
+- preprocessing: ColumnTransformer fit / transform and CompiledPreprocessor throughput per size
+- data_pipeline: data ingestion and transformation of a synthetic CSV per size, for their wall
+  time and peak RSS
+- inference: single-row latency and batch throughput through PredictPipeline per model
+- cold_start: importing the serving modules and loading the artifacts, per model
+- artifact_load: loading model.pkl / compiled_model.pkl with dill versus from the artifact
+  store (memory-mapped arrays, with and without the hash check), per model
+Except for training_search, cold_start and artifact_load's first_load_seconds, every timing is the median of several rounds.
+
+With --compare, every metric is checked against the baseline file: *_per_second
+metrics must not drop and all other metrics (seconds, MB) must not grow by more than
+--threshold. The process exits with status 1 if any metric regressed. Compare runs
+from the same machine; on shared hardware, run-to-run noise alone can reach 20%.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+CASES = ("training_search", "training_fit", "preprocessing", "data_pipeline", "inference", "cold_start", "artifact_load")
+LOAD_SOURCES = ("dill", "store", "store_unverified")
+DEFAULT_SIZES = (10_000, 100_000)
+BATCH_SIZES = (100, 10_000)
+
+def _median_seconds(fn, rounds=3):
+    """
+    Median wall time of `rounds` calls of fn, to damp the noise of a single measurement.
+    """
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def _split_students():
+    from sklearn.model_selection import train_test_split
+
+    from benchmarks.datasets import load_students
+    return train_test_split(load_students(), test_size=0.2, random_state=42)
+
+def _transform(train_df, test_df=None):
+    """
+    Fits the repo's preprocessor on train_df and returns it with X / y arrays.
+    """
+    from src.components.data_transformation import TARGET_COLUMN_NAME, DataTransformation
+
+    preprocessor = DataTransformation().get_data_transformer_object()
+    X_train = preprocessor.fit_transform(train_df.drop(columns=[TARGET_COLUMN_NAME]))
+    y_train = train_df[TARGET_COLUMN_NAME].to_numpy()
+    if test_df is None:
+        return preprocessor, X_train, y_train
+    X_test = preprocessor.transform(test_df.drop(columns=[TARGET_COLUMN_NAME]))
+    return preprocessor, X_train, y_train, X_test, test_df[TARGET_COLUMN_NAME].to_numpy()
+
+def _model(name):
+    from src.components.model_trainer import ModelTrainer
+    return ModelTrainer().get_models()[name]
+
+def run_training_search(model):
+    from src.components.model_search import evaluate_models
+    from src.components.model_trainer import ModelTrainer
+
+    train_df, test_df = _split_students()
+    _, X_train, y_train, X_test, y_test = _transform(train_df, test_df)
+    started = time.perf_counter()
+    report = evaluate_models(X_train, y_train, X_test, y_test, models={model: _model(model)},
+                             parameters=ModelTrainer().get_model_params())
+    return {"metrics": {"wall_seconds": time.perf_counter() - started}, "info": {"test_r2": report[model]}}
+
+def run_training_fit(model, n_rows):
+    from benchmarks.datasets import synthetic_students, with_object_categoricals
+
+    _, X, y = _transform(with_object_categoricals(synthetic_students(n_rows)))
+    elapsed = _median_seconds(lambda: _model(model).fit(X, y))
+    return {"metrics": {"fit_seconds": elapsed, "fit_rows_per_second": n_rows / elapsed}}
+
+def run_preprocessing(n_rows):
+    from benchmarks.datasets import synthetic_students, with_object_categoricals
+    from src.components.data_transformation import TARGET_COLUMN_NAME, DataTransformation
+    from src.pipeline.compiled_preprocessor import compile_preprocessor
+
+    features_df = with_object_categoricals(synthetic_students(n_rows)).drop(columns=[TARGET_COLUMN_NAME])
+    preprocessor = DataTransformation().get_data_transformer_object()
+
+    fit_seconds = _median_seconds(lambda: preprocessor.fit(features_df))
+    transform_seconds = _median_seconds(lambda: preprocessor.transform(features_df))
+
+    compiled = compile_preprocessor(preprocessor)
+    columns = {column: features_df[column].to_numpy() for column in compiled.input_columns}
+    compiled_seconds = _median_seconds(lambda: compiled.transform_columns(columns))
+
+    return {"metrics": {
+        "fit_seconds": fit_seconds,
+        "transform_rows_per_second": n_rows / transform_seconds,
+        "compiled_transform_rows_per_second": n_rows / compiled_seconds,
+    }}
+
+def run_build_dataset(n_rows, data_dir):
+    """
+    Writes a synthetic dataset of `n_rows` rows to data_dir/source.csv.
+    """
+    from benchmarks.datasets import synthetic_students
+
+    synthetic_students(n_rows).to_csv(os.path.join(data_dir, "source.csv"), index=False)
+    return {"metrics": {}}
+
+def run_data_pipeline(data_dir):
+    """
+    Runs DataIngestion and DataTransformation on data_dir/source.csv, with every artifact
+    written to data_dir and the stage cache off.
+    """
+    from src.components.data_ingestion import DataIngestion
+    from src.components.data_transformation import DataTransformation
+
+    data_ingestion = DataIngestion()
+    ingestion_config = data_ingestion.ingestion_config
+    ingestion_config.source_data_path = os.path.join(data_dir, "source.csv")
+    for name in ("train", "test", "raw"):
+        setattr(ingestion_config, f"{name}_data_path", os.path.join(data_dir, f"{name}.csv"))
+    ingestion_config.use_stage_cache = False
+
+    data_transformation = DataTransformation()
+    transformation_config = data_transformation.data_transformation_config
+    for name in ("preprocessor_obj", "compiled_preprocessor", "train_array", "test_array"):
+        file_name = os.path.basename(getattr(transformation_config, f"{name}_file_path"))
+        setattr(transformation_config, f"{name}_file_path", os.path.join(data_dir, file_name))
+    transformation_config.use_stage_cache = False
+
+    started = time.perf_counter()
+    train_path, test_path = data_ingestion.initiate_data_ingestion()
+    ingestion_seconds = time.perf_counter() - started
+    data_transformation.initiate_data_transformation(train_path, test_path)
+    return {"metrics": {
+        "ingestion_seconds": ingestion_seconds,
+        "transformation_seconds": time.perf_counter() - started - ingestion_seconds,
+    }}
+
+def run_build_artifacts(model, artifacts_dir):
+    """
+    Trains `model` with default parameters on stud.csv and writes model.pkl,
+    preprocessor.pkl, compiled_preprocessor.pkl and (if the model can be compiled)
+    compiled_model.pkl to artifacts_dir, then publishes them to artifacts_dir/store
+    as the training pipeline does.
+    """
+    from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+    from src.pipeline.compiled_model import compile_model
+    from src.pipeline.compiled_preprocessor import compile_preprocessor
+    from src.utils import save_object
+
+    train_df, _ = _split_students()
+    preprocessor, X_train, y_train = _transform(train_df)
+    objects = {
+        "model": _model(model).fit(X_train, y_train),
+        "preprocessor": preprocessor,
+        "compiled_preprocessor": compile_preprocessor(preprocessor),
+    }
+    try:
+        objects["compiled_model"] = compile_model(objects["model"])
+    except ValueError:
+        pass
+    for name, obj in objects.items():
+        save_object(os.path.join(artifacts_dir, f"{name}.pkl"), obj)
+    ArtifactStore(ArtifactStoreConfig(root_dir=os.path.join(artifacts_dir, "store"))).publish(objects)
+    return {"metrics": {}}
+
+def _registry(artifacts_dir):
+    from src.pipeline.model_registry import ModelRegistry, ModelRegistryConfig
+    return ModelRegistry(ModelRegistryConfig(
+        model_file_path=os.path.join(artifacts_dir, "model.pkl"),
+        preprocessor_file_path=os.path.join(artifacts_dir, "preprocessor.pkl"),
+        compiled_preprocessor_file_path=os.path.join(artifacts_dir, "compiled_preprocessor.pkl"),
+        compiled_model_file_path=os.path.join(artifacts_dir, "compiled_model.pkl"),
+        artifact_store_dir=os.path.join(artifacts_dir, "store"),
+    ))
+
+def run_inference(model, artifacts_dir, repeat):
+    from benchmarks.datasets import synthetic_students
+    from src.pipeline.inference_executor import percentile
+    from src.pipeline.predict_pipeline import FEATURE_COLUMNS, PredictPipeline
+
+    predict_pipeline = PredictPipeline(registry=_registry(artifacts_dir))
+    records = synthetic_students(max(BATCH_SIZES), seed=1)[FEATURE_COLUMNS].astype(object).to_dict("records")
+    # Load the artifacts and warm up outside the timings
+    for record in records[:50]:
+        predict_pipeline.predict_batch([record])
+
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        predict_pipeline.predict_batch([records[i % len(records)]])
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    latencies.sort()
+    metrics = {
+        "single_row_p50_ms": percentile(latencies, 50),
+        "single_row_p99_ms": percentile(latencies, 99),
+    }
+    for batch_size in BATCH_SIZES:
+        seconds = _median_seconds(lambda: predict_pipeline.predict_batch(records[:batch_size]), rounds=5)
+        metrics[f"batch_{batch_size}_rows_per_second"] = batch_size / seconds
+    return {"metrics": metrics}
+
+def run_cold_start(artifacts_dir):
+    # Must run first in its interpreter: the whole point is what these imports cost
+    started = time.perf_counter()
+    import src.pipeline.predict_pipeline  # noqa: F401
+    import_seconds = time.perf_counter() - started
+    _registry(artifacts_dir).get()
+    return {"metrics": {
+        "import_seconds": import_seconds,
+        "import_and_load_seconds": time.perf_counter() - started,
+    }}
+
+def run_artifact_load(artifacts_dir, artifact, source):
+    from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+    from src.utils import load_object
+
+    store = ArtifactStore(ArtifactStoreConfig(root_dir=os.path.join(artifacts_dir, "store")))
+    if source == "dill":
+        load = lambda: load_object(os.path.join(artifacts_dir, f"{artifact}.pkl"))
+        artifact_bytes = os.path.getsize(os.path.join(artifacts_dir, f"{artifact}.pkl"))
+    else:
+        load = lambda: store.load(artifact, verify=source == "store")
+        entry = store.manifest()["artifacts"][artifact]
+        artifact_bytes = entry["pickle"]["bytes"] + entry["buffers"]["bytes"]
+
+    # The first load also pays for importing the model's library
+    started = time.perf_counter()
+    load()
+    first_load_seconds = time.perf_counter() - started
+    return {
+        "metrics": {"first_load_seconds": first_load_seconds, "load_seconds": _median_seconds(load, rounds=5)},
+        "info": {"artifact_bytes": artifact_bytes},
+    }
+
+UNIT_RUNNERS = {
+    "training_search": run_training_search,
+    "training_fit": run_training_fit,
+    "preprocessing": run_preprocessing,
+    "build_dataset": run_build_dataset,
+    "data_pipeline": run_data_pipeline,
+    "build_artifacts": run_build_artifacts,
+    "inference": run_inference,
+    "cold_start": run_cold_start,
+    "artifact_load": run_artifact_load,
+}
+
+def run_unit(case, params):
+    """
+    Runs one benchmark unit in a fresh interpreter.
+
+    Returns:
+        dict: {"metrics": {...}, "info": {...}}, metrics include the unit's peak_rss_mb.
+    """
+    unit = json.dumps({"case": case, "params": params})
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--unit", unit],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark {case} {params} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def _peak_rss_mb():
+    # VmHWM belongs to this process's address space. ru_maxrss is carried over from the parent
+    # through fork and exec, so it is never lower than the suite process's own RSS
+    try:
+        with open("/proc/self/status") as file_obj:
+            for line in file_obj:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def _unit_main(unit):
+    unit = json.loads(unit)
+    result = UNIT_RUNNERS[unit["case"]](**unit["params"])
+    result["metrics"]["peak_rss_mb"] = _peak_rss_mb()
+    print(json.dumps(result))
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+def run_suite(cases, models, sizes, repeat):
+    """
+    Runs the selected benchmark cases.
+
+    Returns:
+        list: One {"id", "case", "params", "metrics", "info"} dict per unit.
+    """
+    results = []
+
+    def record(case, params, result, **id_params):
+        unit_id = "/".join([case] + [f"{name}={value}" for name, value in id_params.items()])
+        results.append({"id": unit_id, "case": case, "params": id_params,
+                        "metrics": result["metrics"], "info": result.get("info", {})})
+        print(f"{unit_id}: {json.dumps(result['metrics'])}", file=sys.stderr)
+
+    if "training_search" in cases:
+        for model in models:
+            record("training_search", {}, run_unit("training_search", {"model": model}), model=model)
+    if "training_fit" in cases:
+        for n_rows in sizes:
+            for model in models:
+                record("training_fit", {}, run_unit("training_fit", {"model": model, "n_rows": n_rows}),
+                       model=model, n_rows=n_rows)
+    if "preprocessing" in cases:
+        for n_rows in sizes:
+            record("preprocessing", {}, run_unit("preprocessing", {"n_rows": n_rows}), n_rows=n_rows)
+    if "data_pipeline" in cases:
+        for n_rows in sizes:
+            with tempfile.TemporaryDirectory() as data_dir:
+                run_unit("build_dataset", {"n_rows": n_rows, "data_dir": data_dir})
+                record("data_pipeline", {}, run_unit("data_pipeline", {"data_dir": data_dir}), n_rows=n_rows)
+    if {"inference", "cold_start", "artifact_load"} & set(cases):
+        for model in models:
+            with tempfile.TemporaryDirectory() as artifacts_dir:
+                run_unit("build_artifacts", {"model": model, "artifacts_dir": artifacts_dir})
+                if "inference" in cases:
+                    params = {"model": model, "artifacts_dir": artifacts_dir, "repeat": repeat}
+                    record("inference", {}, run_unit("inference", params), model=model)
+                if "cold_start" in cases:
+                    record("cold_start", {}, run_unit("cold_start", {"artifacts_dir": artifacts_dir}), model=model)
+                if "artifact_load" in cases:
+                    for artifact in ("model", "compiled_model"):
+                        if not os.path.exists(os.path.join(artifacts_dir, f"{artifact}.pkl")):
+                            continue
+                        for source in LOAD_SOURCES:
+                            params = {"artifacts_dir": artifacts_dir, "artifact": artifact, "source": source}
+                            record("artifact_load", {}, run_unit("artifact_load", params),
+                                   model=model, artifact=artifact, source=source)
+    return results
+
+def higher_is_better(metric):
+    return metric.endswith("_per_second")
+
+def compare(results, baseline, threshold):
+    """
+    Compares every metric with the same unit id and name in the baseline.
+
+    Returns:
+        list: One {"id", "metric", "baseline", "current", "change", "regression"} dict per
+              shared metric, where change is the relative difference to the baseline.
+    """
+    baseline_metrics = {result["id"]: result["metrics"] for result in baseline["results"]}
+    comparison = []
+    for result in results:
+        previous = baseline_metrics.get(result["id"], {})
+        for metric, value in result["metrics"].items():
+            if metric not in previous or not previous[metric]:
+                continue
+            change = (value - previous[metric]) / previous[metric]
+            regression = change < -threshold if higher_is_better(metric) else change > threshold
+            comparison.append({"id": result["id"], "metric": metric, "baseline": previous[metric],
+                               "current": value, "change": round(change, 4), "regression": regression})
+    return comparison
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark training and inference performance",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("--unit", help=argparse.SUPPRESS)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--models", nargs="+", help="Model names as in ModelTrainer.get_models (default: all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES),
+                        help="Synthetic dataset sizes in rows, from 10^4 up to 10^7")
+    parser.add_argument("--repeat", type=int, default=500, help="Single-row predictions per inference unit")
+    parser.add_argument("--output", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative change that counts as a regression (default 0.25)")
+    args = parser.parse_args()
+
+    if args.unit:
+        _unit_main(args.unit)
+        sys.exit(0)
+
+    from src.components.model_trainer import ModelTrainer
+    models = args.models or list(ModelTrainer().get_models())
+
+    report = {"environment": environment(),
+              "settings": {"cases": args.cases, "models": models, "sizes": args.sizes, "repeat": args.repeat},
+              "results": run_suite(args.cases, models, args.sizes, args.repeat)}
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file_obj:
+            report["comparison"] = compare(report["results"], json.load(file_obj), args.threshold)
+        regressions = [entry for entry in report["comparison"] if entry["regression"]]
+        for entry in regressions:
+            print(f"REGRESSION {entry['id']} {entry['metric']}: {entry['baseline']:.6g} -> "
+                  f"{entry['current']:.6g} ({entry['change']:+.1%})", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            file_obj.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if regressions else 0)
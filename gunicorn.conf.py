@@ -0,0 +1,68 @@
+"""
+Production serving: `gunicorn` (run from the repo root, this file is picked up automatically).
+
+app.py is imported once in the master process (preload_app) and when_ready loads the model
+and preprocessor there, before the workers are forked from it. The workers share those pages copy-on-write
+instead of each unpickling its own copy of the model.
+
+Settings (environment variables):
+- WEB_WORKERS: worker processes, default one per CPU core
+- WEB_THREADS: threads per worker, default 1 (more than 1 uses the threaded worker)
+- BIND: address to listen on, default 0.0.0.0:8000
+- GRACEFUL_TIMEOUT: seconds a worker gets to finish its requests on reload/shutdown, default 30
+- WATCH_ARTIFACTS=1: let every worker hot-reload changed artifacts on its own. Off by default,
+  since a worker that reloads gets a private copy of the model. Use a graceful reload instead:
+  `kill -HUP <master pid>` reloads the artifacts in the master and replaces the workers
+  with new ones forked from it, while the old workers finish their in-flight requests.
+
+Memory per worker: `python -m src.pipeline.memory_report <master pid>`, or GET /api/memory.
+"""
+import gc
+import os
+
+from src.pipeline.memory_report import process_memory
+
+# Tells app.py not to warm up and start its background threads on the first request,
+# the hooks below do that (the threads in every worker, they would not survive the fork)
+os.environ["PREFORK_SERVER"] = "1"
+
+wsgi_app = "app:app"
+preload_app = True
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1))
+threads = int(os.environ.get("WEB_THREADS", 1))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+
+def _freeze_heap():
+    # Everything alive now was loaded by the master and is shared with the workers. Moving it
+    # out of the collected generations stops the workers' garbage collector from writing to
+    # those objects, which would copy their pages into every worker.
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+def when_ready(server):
+    # Runs in the master before the first workers are forked. A failure stops the server
+    import app
+    app.warm_up()
+    _freeze_heap()
+    server.log.info(f"Artifacts preloaded in the master, memory (kB): {process_memory()}")
+
+def post_fork(server, worker):
+    import app
+    app.start_background_threads(watch_artifacts=os.environ.get("WATCH_ARTIFACTS") == "1")
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker {worker.pid} ready, memory (kB): {process_memory()}")
+
+def on_reload(server):
+    # Runs in the master on SIGHUP, before the new workers are forked from it
+    from src.exception import CustomException
+    from src.pipeline.model_registry import get_model_registry
+    registry = get_model_registry()
+    try:
+        if registry.reload():
+            server.log.info(f"Reloaded model artifacts, version {registry.version}")
+    except CustomException as e:
+        server.log.error(f"Model reload failed, new workers keep version {registry.version}: {e}")
+    _freeze_heap()
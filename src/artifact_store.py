@@ -0,0 +1,298 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import platform
+import shutil
+import sys
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import dill
+import numpy as np
+
+from src.exception import CustomException
+
+MANIFEST_FILE_NAME = "manifest.json"
+# Name of the published version, replaced atomically on every publish
+CURRENT_FILE_NAME = "CURRENT"
+# Every out-of-band buffer starts at a multiple of this in the buffers file, so arrays mapped from it are aligned
+BUFFER_ALIGNMENT = 64
+
+@dataclass
+class ArtifactStoreConfig:
+    root_dir: str = os.path.join("artifacts", "store")
+    # Arrays at least this large are written to the buffers file and memory-mapped on load
+    out_of_band_min_bytes: int = 64 * 1024
+    # Published versions kept on disk (the current version is always kept)
+    keep_versions: int = 5
+
+class _OutOfBandPickler(dill.Pickler):
+    """
+    dill pickles plain ndarrays through __reduce__, which copies the data into the stream.
+    Protocol 5's __reduce_ex__ hands it to buffer_callback instead, so large arrays can be
+    written to a separate file.
+    """
+    def reducer_override(self, obj):
+        if type(obj) is np.ndarray:
+            return obj.__reduce_ex__(self.proto)
+        return NotImplemented
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def dump_artifact(obj, dir_path, name, out_of_band_min_bytes=64 * 1024):
+    """
+    Pickles an object into <name>.pkl, with every array of at least `out_of_band_min_bytes`
+    written to <name>.bin instead of the pickle stream.
+
+    Returns:
+        dict: The object's manifest entry: file names, sizes, SHA-256 hashes and buffer offsets.
+    """
+    buffers = []
+
+    def buffer_callback(buffer):
+        raw = buffer.raw()
+        if raw.nbytes < out_of_band_min_bytes:
+            return True  # Small enough to stay in the stream
+        buffers.append(raw)
+        return False
+
+    stream = io.BytesIO()
+    _OutOfBandPickler(stream, protocol=5, buffer_callback=buffer_callback).dump(obj)
+
+    pickle_file, buffers_file = f"{name}.pkl", f"{name}.bin"
+    with open(os.path.join(dir_path, pickle_file), "wb") as file_obj:
+        file_obj.write(stream.getbuffer())
+
+    offsets = []
+    with open(os.path.join(dir_path, buffers_file), "wb") as file_obj:
+        position = 0
+        for raw in buffers:
+            padding = -position % BUFFER_ALIGNMENT
+            file_obj.write(b"\0" * padding)
+            position += padding
+            file_obj.write(raw)
+            offsets.append([position, raw.nbytes])
+            position += raw.nbytes
+
+    return {
+        "type": f"{type(obj).__module__}.{type(obj).__name__}",
+        "pickle": {"file": pickle_file, "bytes": stream.getbuffer().nbytes,
+                   "sha256": _sha256(os.path.join(dir_path, pickle_file))},
+        "buffers": {"file": buffers_file, "bytes": position, "offsets": offsets,
+                    "sha256": _sha256(os.path.join(dir_path, buffers_file))},
+    }
+
+def load_artifact(dir_path, entry, mmap_buffers=True, verify=True):
+    """
+    Loads an object written by dump_artifact.
+
+    With mmap_buffers=True the out-of-band arrays are read-only views of a memory map of
+    the buffers file: nothing is copied, pages are read when first used and processes
+    loading the same version share them through the page cache.
+
+    Args:
+        dir_path (str): The version directory.
+        entry (dict): The object's manifest entry.
+        mmap_buffers (bool): Map the buffers file instead of reading it into memory.
+        verify (bool): Check both files against the SHA-256 hashes in the manifest first.
+
+    Raises:
+        ValueError: If verify is set and a file does not match its hash.
+    """
+    pickle_path = os.path.join(dir_path, entry["pickle"]["file"])
+    buffers_path = os.path.join(dir_path, entry["buffers"]["file"])
+    if verify:
+        for path, part in ((pickle_path, entry["pickle"]), (buffers_path, entry["buffers"])):
+            if _sha256(path) != part["sha256"]:
+                raise ValueError(f"{path} does not match the hash in its manifest")
+
+    buffers = []
+    if entry["buffers"]["offsets"]:
+        with open(buffers_path, "rb") as file_obj:
+            if mmap_buffers:
+                view = memoryview(mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                view = memoryview(bytearray(file_obj.read()))
+        buffers = [view[start:start + length] for start, length in entry["buffers"]["offsets"]]
+
+    with open(pickle_path, "rb") as file_obj:
+        return dill.Unpickler(file_obj, buffers=buffers).load()
+
+class ArtifactStore:
+    """
+    Versioned store for the fitted artifacts the prediction service loads.
+
+    Each publish writes every object to a new directory versions/<version>/ together
+    with a manifest.json (file hashes and sizes, training metadata, library versions)
+    and then points the CURRENT file at it. The version directory is renamed into
+    place and CURRENT is replaced with os.replace, so a reader sees either the old
+    version or the complete new one.
+
+    Pickled bytes are not stable across runs (e.g. a retrained preprocessor pickles to
+    different bytes), so a rerun with unchanged inputs is recognized by its source key,
+    a hash of those inputs stored in the manifest: publishing with the current version's
+    source key, or objects whose bytes are identical to it, does not create a new version.
+    """
+    def __init__(self, config: ArtifactStoreConfig = None):
+        self.store_config = config or ArtifactStoreConfig()
+        self.versions_dir = os.path.join(self.store_config.root_dir, "versions")
+        self.current_file_path = os.path.join(self.store_config.root_dir, CURRENT_FILE_NAME)
+
+    def current_version(self):
+        """
+        Returns:
+            str: The published version, None if nothing was published yet.
+        """
+        try:
+            with open(self.current_file_path) as file_obj:
+                return file_obj.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _publish_order(self, version):
+        # Sort key: the publish time in the manifest, then the manifest's mtime for versions
+        # published within the same timestamp resolution, then the name
+        manifest_path = os.path.join(self.versions_dir, version, MANIFEST_FILE_NAME)
+        with open(manifest_path) as file_obj:
+            created = datetime.fromisoformat(json.load(file_obj)["created"])
+        return created, os.stat(manifest_path).st_mtime_ns, version
+
+    def versions(self):
+        """
+        Returns:
+            list: Every complete version on disk, oldest first (by the publish time in its manifest).
+        """
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            (version for version in os.listdir(self.versions_dir)
+             if os.path.exists(os.path.join(self.versions_dir, version, MANIFEST_FILE_NAME))),
+            key=self._publish_order,
+        )
+
+    def manifest(self, version=None):
+        """
+        Reads the manifest of a version (the current one by default).
+        """
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"Nothing was published to {self.store_config.root_dir}")
+        with open(os.path.join(self.versions_dir, version, MANIFEST_FILE_NAME)) as file_obj:
+            return json.load(file_obj)
+
+    def publish(self, objects, metadata=None, source_key=None):
+        """
+        Writes a new version holding `objects` and makes it the current one.
+
+        Args:
+            objects (dict): Artifact name -> object, e.g. {"model": ..., "preprocessor": ...}.
+            metadata (dict, optional): Training metadata stored in the manifest (JSON serializable).
+            source_key (str, optional): Hash of everything the objects were built from (e.g. a
+                                        stage cache key). When it equals the current version's,
+                                        nothing is written.
+
+        Returns:
+            str: The published version (the current one if the objects are unchanged).
+
+        Raises:
+            CustomException: If an object cannot be pickled or the files cannot be written.
+        """
+        try:
+            current = self.current_version()
+            if (source_key is not None and current is not None
+                    and self.manifest(current).get("source_key") == source_key):
+                return current
+
+            os.makedirs(self.versions_dir, exist_ok=True)
+            tmp_path = os.path.join(self.versions_dir, f".tmp-{uuid.uuid4().hex}")
+            os.makedirs(tmp_path)
+            try:
+                artifacts = {
+                    name: dump_artifact(obj, tmp_path, name, self.store_config.out_of_band_min_bytes)
+                    for name, obj in sorted(objects.items())
+                }
+                content_hash = hashlib.sha256(json.dumps(
+                    {name: [entry["pickle"]["sha256"], entry["buffers"]["sha256"]] for name, entry in artifacts.items()},
+                    sort_keys=True,
+                ).encode()).hexdigest()
+
+                if current is not None and self.manifest(current)["content_hash"] == content_hash:
+                    shutil.rmtree(tmp_path)
+                    return current
+
+                created = datetime.now(timezone.utc)
+                version = f"{created:%Y%m%dT%H%M%S}-{content_hash[:8]}"
+                manifest = {
+                    "version": version,
+                    "created": created.isoformat(timespec="microseconds"),
+                    "content_hash": content_hash,
+                    "source_key": source_key,
+                    "metadata": metadata or {},
+                    "environment": {
+                        "python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "dill": dill.__version__,
+                    },
+                    "artifacts": artifacts,
+                }
+                with open(os.path.join(tmp_path, MANIFEST_FILE_NAME), "w") as file_obj:
+                    json.dump(manifest, file_obj, indent=2)
+                    file_obj.flush()
+                    os.fsync(file_obj.fileno())
+
+                version_path = os.path.join(self.versions_dir, version)
+                shutil.rmtree(version_path, ignore_errors=True)
+                os.replace(tmp_path, version_path)
+            except BaseException:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+
+            tmp_current = f"{self.current_file_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_current, "w") as file_obj:
+                file_obj.write(version)
+                file_obj.flush()
+                os.fsync(file_obj.fileno())
+            os.replace(tmp_current, self.current_file_path)
+
+            self.prune()
+            return version
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load(self, name, version=None, mmap_buffers=True, verify=True):
+        """
+        Loads one artifact of a version (the current one by default), see load_artifact.
+
+        Raises:
+            CustomException: If the version or artifact does not exist or fails verification.
+        """
+        try:
+            manifest = self.manifest(version)
+            if name not in manifest["artifacts"]:
+                raise KeyError(f"Version {manifest['version']} has no artifact {name!r}")
+            return load_artifact(os.path.join(self.versions_dir, manifest["version"]), manifest["artifacts"][name],
+                                 mmap_buffers=mmap_buffers, verify=verify)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def prune(self):
+        """
+        Deletes all but the `keep_versions` most recently published versions, never the current
+        one (which can be an older version after a rollback).
+        """
+        current = self.current_version()
+        versions = self.versions()
+        keep_versions = self.store_config.keep_versions
+        keep = set(versions[-keep_versions:]) if keep_versions > 0 else set()
+        keep.add(current)
+        for version in versions:
+            if version not in keep:
+                shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
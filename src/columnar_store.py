@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+
+SCHEMA_FILE_NAME = "schema.json"
+
+def columnar_path(csv_path):
+    """
+    Maps a configured CSV path (artifacts/train.csv) to its columnar directory (artifacts/train).
+    """
+    return os.path.splitext(csv_path)[0]
+
+def _smallest_code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def save_frame(df, dir_path):
+    """
+    Writes a DataFrame as a directory of typed, memory-mappable .npy column files.
+
+    Numeric columns are stored as they are. String / categorical columns are dictionary
+    encoded: the smallest integer code array that fits, plus the category list in
+    schema.json (code -1 marks a missing value, as in pandas).
+
+    The directory is written under a temporary name and renamed into place, so readers
+    never see a half-written dataset.
+
+    Args:
+        df (pd.DataFrame): The data to store.
+        dir_path (str): Target directory, replaced if it exists.
+    """
+    try:
+        tmp_path = dir_path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        schema = {"n_rows": len(df), "columns": []}
+        for i, column in enumerate(df.columns):
+            values = df[column]
+            file_name = f"{i:03d}.npy"
+            if pd.api.types.is_numeric_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(tmp_path, file_name), values.to_numpy())
+                schema["columns"].append({"name": column, "kind": "numeric", "file": file_name})
+            else:
+                categorical = pd.Categorical(values)
+                codes = categorical.codes.astype(_smallest_code_dtype(len(categorical.categories)))
+                np.save(os.path.join(tmp_path, file_name), codes)
+                schema["columns"].append({
+                    "name": column, "kind": "categorical", "file": file_name,
+                    "categories": categorical.categories.tolist(),
+                })
+
+        with open(os.path.join(tmp_path, SCHEMA_FILE_NAME), "w") as file_obj:
+            json.dump(schema, file_obj, indent=2)
+
+        shutil.rmtree(dir_path, ignore_errors=True)
+        os.replace(tmp_path, dir_path)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_frame(dir_path, mmap=True):
+    """
+    Loads a directory written by save_frame.
+
+    With mmap=True every column (and every categorical's code array) is a read-only
+    memory map of its .npy file, so loading is zero-copy and pages are only read when used.
+
+    Returns:
+        pd.DataFrame: Numeric columns with their stored dtype, encoded columns as pandas Categoricals.
+    """
+    try:
+        with open(os.path.join(dir_path, SCHEMA_FILE_NAME)) as file_obj:
+            schema = json.load(file_obj)
+
+        mmap_mode = "r" if mmap else None
+        columns = {}
+        for column in schema["columns"]:
+            values = np.load(os.path.join(dir_path, column["file"]), mmap_mode=mmap_mode)
+            if column["kind"] == "categorical":
+                values = pd.Categorical.from_codes(values, categories=column["categories"], validate=False)
+            columns[column["name"]] = values
+        return pd.DataFrame(columns, copy=False)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def read_frame(path, mmap=True):
+    """
+    Reads a dataset artifact in either format: a columnar directory or a CSV file.
+    """
+    if os.path.isdir(path):
+        return load_frame(path, mmap=mmap)
+    return pd.read_csv(path)
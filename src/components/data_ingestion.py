@@ -1,7 +1,14 @@
+import argparse
 import os
 import sys
 from src.exception import CustomException
 from src.logger import logging
+from src.metrics import metrics, timed
+from src.columnar_store import columnar_path, save_frame
+from src import schema as schema_module
+from src.schema import read_students
+from src.stage_cache import StageCache, code_version, config_values, hash_file
+import numpy as np
 import pandas as pd
 
 from sklearn.model_selection import train_test_split
@@ -10,28 +17,78 @@ from dataclasses import dataclass
 from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTrainer
 
+def hash_split(df, test_size):
+    """
+    Assigns rows to the test set by a hash of their content (test if hash % 10000 < test_size * 10000),
+    so the split is deterministic and does not depend on chunk boundaries or on seeing the whole file.
+    
+    Returns:
+        np.ndarray: Boolean mask, True for the test rows.
+    """
+    threshold = int(test_size * 10_000)
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return (row_hashes % np.uint64(10_000)) < threshold
+
 @dataclass
 class DataIngestionConfig:
     train_data_path: str = os.path.join('artifacts', "train.csv")
     test_data_path: str = os.path.join('artifacts', "test.csv")
     raw_data_path: str = os.path.join('artifacts', "data.csv")
+    source_data_path: str = os.path.join('notebook', 'data', 'stud.csv')
+    test_size: float = 0.2
+    random_state: int = 42
+    use_stage_cache: bool = True
+    # Rows per chunk in the streaming mode
+    chunksize: int = 100_000
+    # "columnar": a directory of memory-mappable .npy columns next to each configured path
+    # (artifacts/train.csv -> artifacts/train/), "csv": the CSV files themselves
+    artifact_format: str = "columnar"
+    # Also write the CSV files when using the columnar format
+    export_csv: bool = False
     
 class DataIngestion:
     def __init__(self):
         self.ingestion_config = DataIngestionConfig()
+        self.stage_cache = StageCache("data_ingestion")
+    
+    def _dataset_path(self, csv_path):
+        if self.ingestion_config.artifact_format == "columnar":
+            return columnar_path(csv_path)
+        return csv_path
+    
+    def _write_dataset(self, df, csv_path):
+        """
+        Writes one dataset in the configured format and returns every path written.
+        """
+        written = []
+        if self.ingestion_config.artifact_format == "columnar":
+            save_frame(df, columnar_path(csv_path))
+            written.append(columnar_path(csv_path))
+        if self.ingestion_config.artifact_format == "csv" or self.ingestion_config.export_csv:
+            df.to_csv(csv_path, index=False, header=True)
+            written.append(csv_path)
+        return written
         
+    @timed("training_stage_seconds", stage="data_ingestion")
     def initiate_data_ingestion(self):
         """
         Initiates the data ingestion process by reading a dataset, performing a train-test split, 
         and saving the raw and split data into specified file paths.
         
         This method performs the following steps:
-        1. Reads the raw data from a CSV file located at 'notebook\data\stud.csv'.
+        1. Reads the raw data from the CSV file at `source_data_path` ('notebook/data/stud.csv'),
+           validated against the declared schema and in its compact dtypes (see src/schema.py).
         2. Creates directories for saving the raw and split datasets if they do not already exist.
         3. Saves the raw data to a specified location.
         4. Splits the data into training and testing sets (80% train, 20% test).
         5. Saves the train and test datasets to their respective locations.
         
+        Datasets are written in the columnar format by default (see DataIngestionConfig),
+        with the CSV files as an optional export.
+        
+        Runs are cached on the content of the source file, the config and this module's code,
+        so re-running with nothing changed restores the previous split without re-reading the data.
+        
         Returns:
         tuple: A tuple containing the file paths for the training and testing datasets.
                - train_data_path: Path where the training data is saved.
@@ -43,36 +100,116 @@ class DataIngestion:
         """
         logging.info("Entered the Data Ingestion method or component")
         try:
-            df = pd.read_csv('notebook\data\stud.csv')
+            cache_key = None
+            if self.ingestion_config.use_stage_cache:
+                cache_key = self.stage_cache.make_key(
+                    source=hash_file(self.ingestion_config.source_data_path),
+                    config=config_values(self.ingestion_config),
+                    code=code_version(__file__, schema_module),
+                )
+                if self.stage_cache.load(cache_key) is not None:
+                    logging.info("Data ingestion inputs unchanged, reusing the cached train/test split")
+                    return(
+                        self._dataset_path(self.ingestion_config.train_data_path),
+                        self._dataset_path(self.ingestion_config.test_data_path),
+                    )
+            
+            df = read_students(self.ingestion_config.source_data_path)
             logging.info("Read the dataset as a dataframe")
             
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
             
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            written = self._write_dataset(df, self.ingestion_config.raw_data_path)
             
             logging.info("Train test split initiated")
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
+            train_set, test_set = train_test_split(
+                df, test_size=self.ingestion_config.test_size, random_state=self.ingestion_config.random_state
+            )
             
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
+            written += self._write_dataset(train_set, self.ingestion_config.train_data_path)
             
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            written += self._write_dataset(test_set, self.ingestion_config.test_data_path)
+            
+            if cache_key is not None:
+                self.stage_cache.store(cache_key, files={os.path.basename(path): path for path in written})
             
             logging.info("Ingestion of the data is completed")
             
             return(
-                self.ingestion_config.train_data_path,
-                self.ingestion_config.test_data_path,
+                self._dataset_path(self.ingestion_config.train_data_path),
+                self._dataset_path(self.ingestion_config.test_data_path),
+            )
+        
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    @timed("training_stage_seconds", stage="streaming_data_ingestion")
+    def initiate_streaming_data_ingestion(self):
+        """
+        Out-of-core version of initiate_data_ingestion for source files that do not fit in memory.
+        
+        The source CSV is read in chunks of `chunksize` rows and every chunk is appended to the
+        raw, train and test CSVs straight away (this mode always writes CSV, since the row
+        counts are not known up front). Rows are assigned to the test set by a hash of
+        their content (see hash_split), so the split does not depend on chunk boundaries.
+        
+        Returns:
+        tuple: The file paths of the training and testing datasets.
+        """
+        logging.info("Entered the streaming Data Ingestion method")
+        try:
+            config = self.ingestion_config
+            os.makedirs(os.path.dirname(config.train_data_path), exist_ok=True)
+            
+            output_paths = (config.raw_data_path, config.train_data_path, config.test_data_path)
+            for path in output_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            
+            n_train = n_test = 0
+            for chunk in read_students(config.source_data_path, chunksize=config.chunksize):
+                is_test = hash_split(chunk, config.test_size)
+                
+                for path, part in zip(output_paths, (chunk, chunk[~is_test], chunk[is_test])):
+                    part.to_csv(path, mode="a", index=False, header=not os.path.exists(path))
+                n_train += int((~is_test).sum())
+                n_test += int(is_test.sum())
+            
+            logging.info(f"Streaming ingestion completed with {n_train} train and {n_test} test rows")
+            
+            return(
+                config.train_data_path,
+                config.test_data_path,
             )
         
         except Exception as e:
             raise CustomException(e,sys)
 
 if __name__=="__main__":
-    obj = DataIngestion()
-    train_data, test_data = obj.initiate_data_ingestion()
+    parser = argparse.ArgumentParser(description="Run the training pipeline")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Read and transform the data in chunks (for inputs larger than memory)")
+    parser.add_argument("--feature-plans", action="store_true",
+                        help="Train each model on its own feature layout (sparse one-hot, native categorical)")
+    args = parser.parse_args()
+    if args.streaming and args.feature_plans:
+        parser.error("--feature-plans needs the in-memory transformation, it cannot be combined with --streaming")
     
+    obj = DataIngestion()
     data_transformation = DataTransformation()
-    train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data, test_data)
+    if args.streaming:
+        train_data, test_data = obj.initiate_streaming_data_ingestion()
+        train_arr, test_arr, _ = data_transformation.initiate_streaming_data_transformation(train_data, test_data)
+    else:
+        train_data, test_data = obj.initiate_data_ingestion()
+        train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data, test_data)
     
     model_trainer = ModelTrainer()
-    print(model_trainer.initiate_model_trainer(train_arr, test_arr))
\ No newline at end of file
+    feature_sets = None
+    if args.feature_plans:
+        plans = sorted(set(model_trainer.model_trainer_config.model_feature_plans.values()))
+        feature_sets = data_transformation.initiate_feature_plans(train_data, test_data, plans)
+    print(model_trainer.initiate_model_trainer(train_arr, test_arr, feature_sets=feature_sets))
+    
+    # Stage and per-candidate timings of this run, in the same format as the app's /metrics
+    metrics.write(os.path.join("artifacts", "training_metrics.prom"))
\ No newline at end of file
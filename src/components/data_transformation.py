@@ -1,25 +1,46 @@
 import os
 import sys
+import time
 from dataclasses import dataclass
 
 import numpy as np
 import pandas as pd
 from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
+from src.columnar_store import read_frame
+from src.components.feature_plans import FeatureSet, to_object_matrix
+from src.components.streaming_statistics import StreamingStatistics
 from src.exception import CustomException
 from src.logger import logging
+from src.metrics import timed
+from src.pipeline import compiled_preprocessor as compiled_preprocessor_module
+from src.pipeline.compiled_preprocessor import check_parity, compile_preprocessor
+from src import schema as schema_module
+from src.schema import (
+    CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, TARGET_COLUMN_NAME, apply_schema, feature_frame, read_students,
+)
+from src.stage_cache import StageCache, code_version, config_values, hash_path
 from src.utils import save_object
 
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")
+    compiled_preprocessor_file_path = os.path.join('artifacts', "compiled_preprocessor.pkl")
+    train_array_file_path = os.path.join('artifacts', "train_arr.npy")
+    test_array_file_path = os.path.join('artifacts', "test_arr.npy")
+    use_stage_cache = True
+    # Rows per chunk in the streaming mode, and per transform call when writing the arrays
+    chunksize = 100_000
+    # Training rows the compiled preprocessor is checked against preprocessor.transform on
+    parity_sample_rows = 10_000
     
 class DataTransformation:
     def __init__(self):
         self.data_transformation_config = DataTransformationConfig()
+        self.stage_cache = StageCache("data_transformation")
         
     def get_data_transformer_object(self):
         """
@@ -33,14 +54,8 @@ class DataTransformation:
             ColumnTransformer: A preprocessor object to apply transformations to the data.
         """
         try:
-            numerical_columns = ["reading_score", "writing_score"]
-            categorical_columns = [
-                "gender",
-                "race_ethnicity",
-                "parental_level_of_education",
-                "lunch",
-                "test_preparation_course"
-            ]
+            numerical_columns = NUMERICAL_COLUMNS
+            categorical_columns = CATEGORICAL_COLUMNS
             
             numerical_pipeline = Pipeline(
                 steps = [
@@ -71,49 +86,190 @@ class DataTransformation:
         except Exception as e:
             raise CustomException(e,sys)
         
+    def get_feature_plan_transformer(self, plan):
+        """
+        Creates the (unfitted) preprocessor of a feature plan (see feature_plans.FEATURE_PLANS).
+        
+        The one-hot plans use the standard preprocessor, the sparse one keeps its output as a CSR
+        matrix. The native categorical plans impute the columns and replace each category by its
+        integer code; trees split on the raw numbers, so they are not scaled.
+        
+        Args:
+            plan (str): The feature plan name.
+        
+        Returns:
+            ColumnTransformer | Pipeline: A preprocessor object to apply transformations to the data.
+        """
+        try:
+            if plan == "one_hot_dense":
+                return self.get_data_transformer_object()
+            if plan == "one_hot_sparse":
+                # Sparse whatever the density, instead of densifying below 30% zeros
+                return self.get_data_transformer_object().set_params(sparse_threshold=1.0)
+            
+            preprocessor = ColumnTransformer(
+                [
+                    ("numerical_pipeline", Pipeline(steps=[("imputer", SimpleImputer(strategy="median"))]),
+                     NUMERICAL_COLUMNS),
+                    ("categorical_pipeline", Pipeline(
+                        steps=[
+                            ("imputer", SimpleImputer(strategy="most_frequent")),
+                            ("ordinal_encoder", OrdinalEncoder())
+                        ]
+                    ), CATEGORICAL_COLUMNS)
+                ]
+            )
+            if plan == "native_categorical":
+                return preprocessor
+            if plan == "native_categorical_object":
+                return Pipeline(
+                    steps=[
+                        ("features", preprocessor),
+                        ("object_matrix", FunctionTransformer(to_object_matrix, kw_args={"n_numerical": len(NUMERICAL_COLUMNS)}))
+                    ]
+                )
+            raise ValueError(f"Unknown feature plan {plan!r}")
+            
+        except Exception as e:
+            raise CustomException(e,sys)
+    
+    @timed("training_stage_seconds", stage="feature_plans")
+    def initiate_feature_plans(self, train_path, test_path, plans):
+        """
+        Builds the train / test matrices of every requested feature plan, so each model can be
+        trained on the layout that suits it (sparse one-hot, native categorical) instead of all
+        of them sharing the dense one-hot matrix.
+        
+        The matrix size and preprocessor fit time of each plan are logged for comparison.
+        
+        Args:
+            train_path (str): Path to the training data (columnar directory or CSV file).
+            test_path (str): Path to the testing data (columnar directory or CSV file).
+            plans (iterable): Feature plan names.
+        
+        Returns:
+            dict: Plan name -> FeatureSet.
+        """
+        try:
+            train_df = apply_schema(read_frame(train_path))
+            test_df = apply_schema(read_frame(test_path))
+            
+            input_feature_train_df = feature_frame(train_df, score_dtype=np.float64)
+            target_feature_train = train_df[TARGET_COLUMN_NAME].to_numpy(dtype=np.float64)
+            
+            input_feature_test_df = feature_frame(test_df, score_dtype=np.float64)
+            target_feature_test = test_df[TARGET_COLUMN_NAME].to_numpy(dtype=np.float64)
+            
+            feature_sets = {}
+            for plan in plans:
+                preprocessor = self.get_feature_plan_transformer(plan)
+                started = time.perf_counter()
+                input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+                fit_seconds = time.perf_counter() - started
+                input_feature_test_arr = preprocessor.transform(input_feature_test_df)
+                
+                feature_sets[plan] = FeatureSet(
+                    plan=plan,
+                    X_train=input_feature_train_arr,
+                    y_train=target_feature_train,
+                    X_test=input_feature_test_arr,
+                    y_test=target_feature_test,
+                    preprocessor=preprocessor,
+                    n_numerical=len(NUMERICAL_COLUMNS),
+                    n_categorical=len(CATEGORICAL_COLUMNS),
+                    fit_seconds=fit_seconds,
+                )
+                logging.info(
+                    f"Feature plan {plan}: {input_feature_train_arr.shape[1]} columns, "
+                    f"{feature_sets[plan].nbytes / 1e6:.2f} MB for train + test, fitted in {fit_seconds:.3f}s"
+                )
+            
+            return feature_sets
+            
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    @timed("training_stage_seconds", stage="data_transformation")
     def initiate_data_transformation(self,train_path,test_path):
         """
-        This method reads training and testing data from CSV files, applies the 
+        This method reads the ingested training and testing data, applies the 
         preprocessing transformations to the features (numerical and categorical),
         and returns the transformed training and testing data arrays, along with the 
         file path of the saved preprocessing object.
         
         Args:
-            train_path (str): Path to the training data CSV file.
-            test_path (str): Path to the testing data CSV file.
+            train_path (str): Path to the training data (columnar directory or CSV file).
+            test_path (str): Path to the testing data (columnar directory or CSV file).
         
         Returns:
             tuple: A tuple containing the transformed training data, transformed testing data,
-                and the file path of the saved preprocessing object.
+                and the file path of the saved preprocessing object. The arrays are written
+                as .npy files and returned memory-mapped.
+        
+        The result is cached on the content of both input files, the config and the code of
+        this stage, so an unchanged split restores the fitted preprocessor and arrays directly.
         """
         try:
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
+            cache_key = None
+            if self.data_transformation_config.use_stage_cache:
+                cache_key = self.stage_cache.make_key(
+                    train=hash_path(train_path),
+                    test=hash_path(test_path),
+                    config=config_values(self.data_transformation_config),
+                    code=code_version(__file__, compiled_preprocessor_module, schema_module),
+                )
+                if self.stage_cache.load(cache_key) is not None:
+                    logging.info("Data transformation inputs unchanged, reusing the cached preprocessor and arrays")
+                    return(
+                        np.load(self.data_transformation_config.train_array_file_path, mmap_mode="r"),
+                        np.load(self.data_transformation_config.test_array_file_path, mmap_mode="r"),
+                        self.data_transformation_config.preprocessor_obj_file_path
+                    )
+            
+            # Columnar datasets are memory-mapped, CSV files are parsed; both are validated
+            # against the declared schema and held in its compact dtypes (see src/schema.py)
+            train_df = apply_schema(read_frame(train_path))
+            test_df = apply_schema(read_frame(test_path))
             
             logging.info("Read train and test data completed")
             
             logging.info("Obtaining preprocessing object")
             preprocessing_obj = self.get_data_transformer_object()
             
-            target_column_name = "math_score"
-            
-            input_feature_train_df = train_df.drop(columns=[target_column_name], axis=1)
-            target_feature_train_df = train_df[target_column_name]
+            # The scores are float32 in the schema. The preprocessor is fitted and applied on float64
+            # scores, so its output matches the float64 compiled preprocessor exactly
+            preprocessing_obj.fit(feature_frame(train_df, score_dtype=np.float64))
             
-            input_feature_test_df = test_df.drop(columns=[target_column_name], axis=1)
-            target_feature_test_df = test_df[target_column_name]
+            logging.info("Compiling the fitted preprocessor for fast inference")
+            compiled_preprocessor = compile_preprocessor(preprocessing_obj)
+            # Refuse to ship a compiled preprocessor that does not match sklearn exactly. The check
+            # runs on a fixed-size sample of rows, so its cost does not grow with the dataset
+            parity_sample_rows = min(self.data_transformation_config.parity_sample_rows, len(train_df))
+            check_parity(preprocessing_obj, compiled_preprocessor, feature_frame(
+                train_df.sample(n=parity_sample_rows, random_state=0), score_dtype=np.float64
+            ))
             
             logging.info(
                 "Applying preprocessing object on training dataframe and testing dataframe"
             )
             
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
-            
-            # The transformed features are combined with the target labels
-            # into a single array (train_arr and test_arr)
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
+            # The transformed features and the target labels are written chunk by chunk into a
+            # single memory-mapped array each (train_arr and test_arr) that later stages and
+            # re-runs load directly
+            train_arr = self._transform_to_npy(
+                self._dense_transform(preprocessing_obj),
+                compiled_preprocessor.n_features_out,
+                self._frame_chunks(train_df),
+                len(train_df),
+                self.data_transformation_config.train_array_file_path
+            )
+            test_arr = self._transform_to_npy(
+                self._dense_transform(preprocessing_obj),
+                compiled_preprocessor.n_features_out,
+                self._frame_chunks(test_df),
+                len(test_df),
+                self.data_transformation_config.test_array_file_path
+            )
             
             logging.info("Saving the preprocessing object as a pkl file")
             
@@ -122,6 +278,122 @@ class DataTransformation:
                 obj = preprocessing_obj
             )
             
+            save_object(
+                file_path = self.data_transformation_config.compiled_preprocessor_file_path,
+                obj = compiled_preprocessor
+            )
+            
+            if cache_key is not None:
+                self.stage_cache.store(
+                    cache_key,
+                    files={
+                        "preprocessor.pkl": self.data_transformation_config.preprocessor_obj_file_path,
+                        "compiled_preprocessor.pkl": self.data_transformation_config.compiled_preprocessor_file_path,
+                        "train_arr.npy": self.data_transformation_config.train_array_file_path,
+                        "test_arr.npy": self.data_transformation_config.test_array_file_path,
+                    },
+                )
+            
+            return(
+                train_arr,
+                test_arr,
+                self.data_transformation_config.preprocessor_obj_file_path
+            )
+            
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    def _frame_chunks(self, df):
+        """
+        Splits a DataFrame into row chunks of `chunksize` rows (views, not copies).
+        """
+        chunksize = self.data_transformation_config.chunksize
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    
+    def _dense_transform(self, preprocessor):
+        """
+        preprocessor.transform for one chunk, as a dense array.
+        """
+        def transform(chunk):
+            transformed = preprocessor.transform(feature_frame(chunk, score_dtype=np.float64))
+            return transformed.toarray() if hasattr(transformed, "toarray") else transformed
+        return transform
+    
+    def _transform_to_npy(self, transform, n_features, chunks, n_rows, array_path):
+        """
+        Writes transformed chunks into a (features + target) .npy file, so no more than one
+        transformed chunk is held in memory besides the memory-mapped output.
+        """
+        output = np.lib.format.open_memmap(
+            array_path, mode="w+", dtype=np.float64, shape=(n_rows, n_features + 1)
+        )
+        start = 0
+        for chunk in chunks:
+            stop = start + len(chunk)
+            output[start:stop, :-1] = transform(chunk)
+            output[start:stop, -1] = chunk[TARGET_COLUMN_NAME].to_numpy(dtype=np.float64)
+            start = stop
+        output.flush()
+        del output
+        return np.load(array_path, mmap_mode="r")
+    
+    def _count_rows(self, data_path):
+        return sum(
+            len(chunk) for chunk in pd.read_csv(data_path, usecols=[TARGET_COLUMN_NAME],
+                                                chunksize=self.data_transformation_config.chunksize)
+        )
+    
+    @timed("training_stage_seconds", stage="streaming_data_transformation")
+    def initiate_streaming_data_transformation(self, train_path, test_path):
+        """
+        Out-of-core version of initiate_data_transformation for inputs that do not fit in memory.
+        
+        The training CSV is read in chunks of `chunksize` rows twice: one pass accumulates the
+        preprocessor statistics (StreamingStatistics), a second pass writes the transformed rows
+        straight into a memory-mapped .npy file. Peak memory is bounded by the chunk size,
+        whatever the size of the input.
+        
+        The fitted preprocessor is a CompiledPreprocessor, saved both as the compiled
+        preprocessor and as preprocessor.pkl, since it also accepts DataFrames.
+        
+        Args:
+            train_path (str): Path to the training data CSV file.
+            test_path (str): Path to the testing data CSV file.
+        
+        Returns:
+            tuple: Memory-mapped transformed training and testing arrays (target in the last
+                   column, like initiate_data_transformation), and the preprocessor file path.
+        """
+        try:
+            logging.info("Fitting preprocessor statistics from streamed training data")
+            statistics = StreamingStatistics(NUMERICAL_COLUMNS, CATEGORICAL_COLUMNS)
+            for chunk in read_students(train_path, chunksize=self.data_transformation_config.chunksize):
+                statistics.update(feature_frame(chunk))
+            compiled_preprocessor = statistics.to_compiled_preprocessor()
+            logging.info(f"Fitted preprocessor statistics on {statistics.n_rows} rows")
+            
+            logging.info("Writing transformed train and test arrays chunk by chunk")
+            chunksize = self.data_transformation_config.chunksize
+            train_arr = self._transform_to_npy(
+                compiled_preprocessor.transform_columns,
+                compiled_preprocessor.n_features_out,
+                read_students(train_path, chunksize=chunksize),
+                self._count_rows(train_path),
+                self.data_transformation_config.train_array_file_path
+            )
+            test_arr = self._transform_to_npy(
+                compiled_preprocessor.transform_columns,
+                compiled_preprocessor.n_features_out,
+                read_students(test_path, chunksize=chunksize),
+                self._count_rows(test_path),
+                self.data_transformation_config.test_array_file_path
+            )
+            
+            for file_path in (self.data_transformation_config.preprocessor_obj_file_path,
+                              self.data_transformation_config.compiled_preprocessor_file_path):
+                save_object(file_path=file_path, obj=compiled_preprocessor)
+            
             return(
                 train_arr,
                 test_arr,
@@ -129,4 +401,4 @@ class DataTransformation:
             )
             
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
@@ -0,0 +1,95 @@
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+# How the features are laid out for a model:
+# - "one_hot_dense": the standard preprocessor, a dense float matrix (what the prediction service uses)
+# - "one_hot_sparse": the same features kept as a CSR matrix, for models that accept sparse input
+# - "native_categorical": imputed numbers plus integer category codes, for XGBoost's native categorical splits
+# - "native_categorical_object": the same as an object matrix with int codes, since CatBoost only
+#   accepts categorical features as int or str values
+FEATURE_PLANS = ("one_hot_dense", "one_hot_sparse", "native_categorical", "native_categorical_object")
+
+# Plans whose features are exactly those of the standard preprocessor, so a model trained
+# on them is served with the standard preprocessor.pkl / compiled_preprocessor.pkl
+ONE_HOT_PLANS = ("one_hot_dense", "one_hot_sparse")
+
+@dataclass
+class FeatureSet:
+    """
+    The train / test matrices of one feature plan and the preprocessor that produced them.
+    """
+    plan: str
+    X_train: object
+    y_train: np.ndarray
+    X_test: object
+    y_test: np.ndarray
+    preprocessor: object
+    n_numerical: int
+    n_categorical: int
+    fit_seconds: float
+
+    @property
+    def nbytes(self):
+        return matrix_nbytes(self.X_train) + matrix_nbytes(self.X_test)
+
+def matrix_nbytes(X):
+    """
+    Memory held by a dense, CSR or object feature matrix.
+    """
+    if hasattr(X, "indptr"):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    if X.dtype == object:
+        # Category codes are small ints, which Python caches; every other value is its own float object
+        n_floats = sum(isinstance(value, float) for value in X[0]) * len(X) if len(X) else 0
+        return X.nbytes + n_floats * sys.getsizeof(0.0)
+    return X.nbytes
+
+def to_serving_input(X):
+    """
+    The prediction service feeds every one-hot model the dense output of the compiled
+    preprocessor, so a model trained on the sparse plan is profiled and exported on dense rows.
+    """
+    return X.toarray() if hasattr(X, "toarray") else X
+
+def to_object_matrix(X, n_numerical):
+    """
+    Converts [numbers | float category codes] to an object matrix with int codes for CatBoost.
+    Used as the last step of the "native_categorical_object" preprocessor, so it also runs at serving time.
+    """
+    X = np.asarray(X)
+    output = X.astype(object)
+    output[:, n_numerical:] = X[:, n_numerical:].astype(np.int64).astype(object)
+    return output
+
+def prepare_model(model, plan, n_numerical, n_categorical):
+    """
+    Points a model's native categorical support at the category code columns of a "native_*" plan.
+
+    Args:
+        model: An unfitted estimator, its parameters are set in place.
+        plan (str): One of FEATURE_PLANS.
+        n_numerical (int): Leading numerical columns of the plan's matrix.
+        n_categorical (int): Category code columns after them.
+
+    Returns:
+        dict: Extra keyword arguments for model.fit.
+
+    Raises:
+        ValueError: If the plan is unknown or the model has no native categorical support.
+    """
+    if plan not in FEATURE_PLANS:
+        raise ValueError(f"Unknown feature plan {plan!r}, expected one of {FEATURE_PLANS}")
+    if plan in ONE_HOT_PLANS:
+        return {}
+
+    name = type(model).__name__
+    if name == "XGBRegressor" and plan == "native_categorical":
+        model.set_params(enable_categorical=True, tree_method="hist",
+                         feature_types=["q"] * n_numerical + ["c"] * n_categorical)
+        return {}
+    if name == "CatBoostRegressor" and plan == "native_categorical_object":
+        # Passed to fit rather than set on the estimator, which sklearn's clone() would reject
+        return {"cat_features": list(range(n_numerical, n_numerical + n_categorical))}
+    raise ValueError(f"{name} cannot be trained on the {plan} plan")
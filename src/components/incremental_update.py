@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+from src.columnar_store import columnar_path, read_frame, save_frame
+from src.components.data_ingestion import DataIngestionConfig, hash_split
+from src.components.data_transformation import (
+    CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, TARGET_COLUMN_NAME, DataTransformation,
+)
+from src.components.feature_plans import ONE_HOT_PLANS, to_serving_input
+from src.components.model_trainer import ModelTrainer
+from src.components.streaming_statistics import StreamingStatistics
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import metrics, timed
+from src.schema import apply_schema, feature_frame, read_students
+from src.stage_cache import hash_path
+from src.utils import load_object, save_object
+
+# Models that continue training from their fitted state; any other model is refit
+WARM_START_MODELS = ("XGBRegressor", "CatBoostRegressor", "GradientBoostingRegressor", "RandomForestRegressor")
+
+@dataclass
+class IncrementalUpdateConfig:
+    model_file_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    compiled_preprocessor_file_path: str = os.path.join("artifacts", "compiled_preprocessor.pkl")
+    model_report_file_path: str = os.path.join("artifacts", "model_report.json")
+    # Preprocessor statistics (value counts per column) of the training set, with the hash of the
+    # training set they were counted from
+    statistics_file_path: str = os.path.join("artifacts", "preprocessor_statistics.pkl")
+    # One entry per update: what was done, the R² before / after and the time it took
+    update_report_file_path: str = os.path.join("artifacts", "update_report.json")
+    # Boosting rounds added to an XGBoost / CatBoost / GradientBoosting model per update
+    extra_boosting_rounds: int = 50
+    # Trees added to a RandomForest per update
+    extra_trees: int = 32
+    # A full re-search runs when the updated model's test R² is this far below the current model's, on the same rows
+    drift_threshold: float = 0.02
+    # Also append the new rows to the source data, so the next full pipeline run includes them
+    append_to_source: bool = False
+    # The grown train / test datasets a full re-search runs on, before they replace the current ones
+    staging_dir: str = os.path.join("artifacts", "incremental_update_staging")
+
+class IncrementalUpdate:
+    """
+    Folds newly arrived student records into the current model without re-running the search.
+
+    The new rows are split with the same content hash as the streaming ingestion and appended
+    to the train / test datasets. The best model then continues training from where it
+    stopped: extra boosting rounds (XGBoost, CatBoost, GradientBoosting), extra trees
+    (RandomForest) or partial_fit where the estimator supports it. Any other model is refit
+    with its already-chosen hyperparameters, which is still a fraction of the search.
+
+    Warm-started models keep the preprocessor they were trained with, since their existing
+    trees split on its features. A refit one-hot model gets a compiled preprocessor rebuilt
+    from the incrementally updated statistics instead.
+    """
+    def __init__(self):
+        self.update_config = IncrementalUpdateConfig()
+        self.ingestion_config = DataIngestionConfig()
+
+    def _dataset_path(self, csv_path):
+        if self.ingestion_config.artifact_format == "columnar":
+            return columnar_path(csv_path)
+        return csv_path
+
+    def _append_dataset(self, df, csv_path):
+        """
+        Appends rows to one dataset in every format it is kept in.
+        """
+        config = self.ingestion_config
+        if config.artifact_format == "columnar":
+            dir_path = columnar_path(csv_path)
+            existing = apply_schema(read_frame(dir_path, mmap=False))
+            save_frame(pd.concat([existing, df], ignore_index=True), dir_path)
+        if config.artifact_format == "csv" or config.export_csv:
+            df.to_csv(csv_path, mode="a", index=False, header=not os.path.exists(csv_path))
+
+    def _commit_update(self, new_df, new_train_df, new_test_df, statistics):
+        """
+        Appends the new rows to the datasets and saves the statistics of the grown training set,
+        once the updated model has been accepted.
+        """
+        config = self.update_config
+        ingestion_config = self.ingestion_config
+        self._append_dataset(new_train_df, ingestion_config.train_data_path)
+        self._append_dataset(new_test_df, ingestion_config.test_data_path)
+        self._append_dataset(new_df, ingestion_config.raw_data_path)
+        if config.append_to_source:
+            new_df.to_csv(ingestion_config.source_data_path, mode="a", index=False, header=False)
+        save_object(file_path=config.statistics_file_path,
+                    obj={"train_hash": hash_path(self._dataset_path(ingestion_config.train_data_path)),
+                         "statistics": statistics})
+
+    def _load_statistics(self, train_path, train_df):
+        """
+        The preprocessor statistics of the current training set: the saved ones if they were
+        counted from exactly this training set, otherwise counted again from train_df (first
+        update, or a full pipeline run re-split the data since).
+        """
+        config = self.update_config
+        if os.path.exists(config.statistics_file_path):
+            saved = load_object(config.statistics_file_path)
+            if isinstance(saved, dict) and saved.get("train_hash") == hash_path(train_path):
+                return saved["statistics"]
+            logging.info("The training set changed since the preprocessor statistics were saved, counting them again")
+        statistics = StreamingStatistics(NUMERICAL_COLUMNS, CATEGORICAL_COLUMNS)
+        statistics.update(feature_frame(train_df))
+        return statistics
+
+    def _load_history(self):
+        if not os.path.exists(self.update_config.update_report_file_path):
+            return []
+        with open(self.update_config.update_report_file_path) as file_obj:
+            return json.load(file_obj)
+
+    def _full_retrain_seconds(self, model_report, history):
+        """
+        How long the last full training took: the last re-search an update ran, otherwise the
+        search time of the training run that wrote model_report.json (None if that run was
+        restored from the stage cache).
+        """
+        for entry in reversed(history):
+            if entry["full_retrain"]:
+                return entry["update_seconds"]
+        searched = [plan["search_seconds"] for plan in model_report.get("feature_plans", {}).values()]
+        if searched and all(seconds is not None for seconds in searched):
+            return sum(searched)
+        return None
+
+    def _continue_training(self, model, X_train, y_train, X_new, y_new):
+        """
+        Continues training a fitted model on the grown training set.
+
+        Args:
+            model: The fitted best model, updated in place where the estimator allows it.
+            X_train (np.array): All training features, old and new rows.
+            y_train (np.array): All training targets.
+            X_new (np.array): The new training rows only (for partial_fit).
+            y_new (np.array): Their targets.
+
+        Returns:
+            tuple: The updated model and how it was updated ("partial_fit", "warm_start" or "refit").
+        """
+        config = self.update_config
+        name = type(model).__name__
+
+        if hasattr(model, "partial_fit"):
+            model.partial_fit(X_new, y_new)
+            return model, "partial_fit"
+
+        if name == "XGBRegressor":
+            updated = clone(model).set_params(n_estimators=config.extra_boosting_rounds)
+            X_fit, y_fit, fit_params = X_train, y_train, {}
+            if updated.get_params().get("early_stopping_rounds"):
+                # XGBoost only early-stops on an eval_set, hold out 10% of the training rows for it
+                X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.1, random_state=42)
+                fit_params = {"eval_set": [(X_val, y_val)], "verbose": False}
+            updated.fit(X_fit, y_fit, xgb_model=model.get_booster(), **fit_params)
+            return updated, "warm_start"
+
+        if name == "CatBoostRegressor":
+            updated = clone(model).set_params(iterations=config.extra_boosting_rounds)
+            updated.fit(X_train, y_train, init_model=model, cat_features=model.get_cat_feature_indices() or None)
+            return updated, "warm_start"
+
+        if name == "GradientBoostingRegressor":
+            model.set_params(warm_start=True, n_estimators=model.n_estimators_ + config.extra_boosting_rounds)
+            model.fit(X_train, y_train)
+            return model, "warm_start"
+
+        if name == "RandomForestRegressor":
+            model.set_params(warm_start=True, n_estimators=len(model.estimators_) + config.extra_trees)
+            model.fit(X_train, y_train)
+            return model, "warm_start"
+
+        return clone(model).fit(X_train, y_train), "refit"
+
+    def _full_retrain(self, train_path, test_path, feature_plans):
+        data_transformation = DataTransformation()
+        train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_path, test_path)
+        model_trainer = ModelTrainer()
+        feature_sets = None
+        if feature_plans:
+            plans = sorted(set(model_trainer.model_trainer_config.model_feature_plans.values()))
+            feature_sets = data_transformation.initiate_feature_plans(train_path, test_path, plans)
+        model_trainer.initiate_model_trainer(train_arr, test_arr, feature_sets=feature_sets)
+        with open(self.update_config.model_report_file_path) as file_obj:
+            model_report = json.load(file_obj)
+        return model_report["selected"], model_report["models"][model_report["selected"]]["r2_score"]
+
+    @timed("training_stage_seconds", stage="incremental_update")
+    def initiate_incremental_update(self, new_data_path, force_full_retrain=False):
+        """
+        Appends new student records to the datasets and updates the served model with them.
+
+        A full re-search (DataTransformation and ModelTrainer on the grown datasets) only runs
+        when the updated model's test R² drops more than `drift_threshold` below the current
+        model's R² on the same test rows (the grown test set), when the new rows contain a category the served preprocessor
+        has never seen, or when `force_full_retrain` is set.
+
+        Args:
+            new_data_path (str): CSV file with the new records, in the source data's columns.
+            force_full_retrain (bool): Skip the warm start and re-run the search.
+
+        Returns:
+            dict: The update_report.json entry of this update: rows added, how the model was
+                  updated, test R² of the current and the updated model on the same rows, the update time and the time saved
+                  versus the last full training.
+
+        Raises:
+            CustomException: If the new records cannot be read, do not match the declared
+                             schema (see src/schema.py) or the update fails.
+        """
+        logging.info("Entered the incremental update method")
+        try:
+            started = time.perf_counter()
+            config = self.update_config
+            ingestion_config = self.ingestion_config
+            train_path = self._dataset_path(ingestion_config.train_data_path)
+            test_path = self._dataset_path(ingestion_config.test_data_path)
+
+            new_df = read_students(new_data_path)
+            is_test = hash_split(new_df, ingestion_config.test_size)
+            new_train_df, new_test_df = new_df[~is_test], new_df[is_test]
+            logging.info(f"Read {len(new_df)} new records: {len(new_train_df)} train and {len(new_test_df)} test")
+
+            train_df = apply_schema(read_frame(train_path))
+            test_df = apply_schema(read_frame(test_path))
+            statistics = self._load_statistics(train_path, train_df)
+            statistics.update(feature_frame(new_train_df))
+            # The datasets on disk are only changed once the updated model is accepted (see
+            # _commit_update), so a failed update can be retried without adding the rows twice
+            grown_train_df = pd.concat([train_df, new_train_df], ignore_index=True)
+            grown_test_df = pd.concat([test_df, new_test_df], ignore_index=True)
+
+            with open(config.model_report_file_path) as file_obj:
+                model_report = json.load(file_obj)
+            history = self._load_history()
+            full_retrain_seconds = self._full_retrain_seconds(model_report, history)
+            model_name = model_report["selected"]
+            r2_last_training = model_report["models"][model_name]["r2_score"]
+            feature_plan = model_report["models"][model_name]["feature_plan"]
+            feature_plans = any(entry["feature_plan"] != "one_hot_dense" for entry in model_report["models"].values())
+
+            method, r2_before, r2_after, reason = None, None, None, None
+            if force_full_retrain:
+                reason = "forced"
+            else:
+                model = load_object(config.model_file_path)
+                if os.path.exists(config.compiled_preprocessor_file_path):
+                    preprocessor = load_object(config.compiled_preprocessor_file_path)
+                else:
+                    preprocessor = load_object(config.preprocessor_file_path)
+
+                # The current and the updated model are scored on the same rows: the grown test set,
+                # or the previous test rows when the served preprocessor cannot transform the new ones
+                drift_test_df = grown_test_df
+                try:
+                    X_drift = to_serving_input(preprocessor.transform(grown_test_df))
+                except ValueError:
+                    drift_test_df = test_df
+                    X_drift = to_serving_input(preprocessor.transform(test_df))
+                y_drift = drift_test_df[TARGET_COLUMN_NAME].to_numpy()
+                r2_before = r2_score(y_drift, model.predict(X_drift))
+
+                refreshed_preprocessor = None
+                warm_starts = hasattr(model, "partial_fit") or type(model).__name__ in WARM_START_MODELS
+                if not warm_starts and feature_plan in ONE_HOT_PLANS:
+                    # A refit does not depend on the old features, so it can use the updated statistics
+                    refreshed_preprocessor = preprocessor = statistics.to_compiled_preprocessor()
+
+                try:
+                    X_train = to_serving_input(preprocessor.transform(grown_train_df))
+                    X_test = to_serving_input(preprocessor.transform(grown_test_df))
+                    X_new = to_serving_input(preprocessor.transform(new_train_df))
+                except ValueError as e:
+                    reason = f"the new records do not fit the served preprocessor: {e}"
+                else:
+                    y_train = grown_train_df[TARGET_COLUMN_NAME].to_numpy()
+                    model, method = self._continue_training(model, X_train, y_train, X_new,
+                                                            new_train_df[TARGET_COLUMN_NAME].to_numpy())
+                    if drift_test_df is grown_test_df:
+                        X_drift = X_test
+                    else:
+                        X_drift = to_serving_input(preprocessor.transform(drift_test_df))
+                    r2_after = r2_score(y_drift, model.predict(X_drift))
+                    logging.info(f"Updated {model_name} by {method}: test R² {r2_before:.4f} -> {r2_after:.4f}")
+                    if r2_before - r2_after > config.drift_threshold:
+                        reason = f"test R² drifted from {r2_before:.4f} to {r2_after:.4f}"
+                    else:
+                        save_object(file_path=config.model_file_path, obj=model)
+                        if refreshed_preprocessor is not None:
+                            save_object(file_path=config.compiled_preprocessor_file_path, obj=refreshed_preprocessor)
+                        model_trainer = ModelTrainer()
+                        model_trainer.export_compiled_model(model, X_train, X_test)
+                        model_trainer.publish_artifacts({
+                            "source": "incremental_update",
+                            "selected": model_name,
+                            "r2_score": r2_after,
+                            "feature_plan": feature_plan,
+                            "method": method,
+                            "train_rows_added": len(new_train_df),
+                        })
+                        self._commit_update(new_df, new_train_df, new_test_df, statistics)
+
+            if reason is not None:
+                logging.info(f"Running a full re-search, {reason}")
+                staging_dir = config.staging_dir
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                try:
+                    staged_train_path = os.path.join(staging_dir, "train")
+                    staged_test_path = os.path.join(staging_dir, "test")
+                    save_frame(grown_train_df, staged_train_path)
+                    save_frame(grown_test_df, staged_test_path)
+                    model_name, r2_after = self._full_retrain(staged_train_path, staged_test_path, feature_plans)
+                finally:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                self._commit_update(new_df, new_train_df, new_test_df, statistics)
+                method = "full_retrain"
+
+            update_seconds = time.perf_counter() - started
+            entry = {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "new_records": new_data_path,
+                "train_rows_added": len(new_train_df),
+                "test_rows_added": len(new_test_df),
+                "model": model_name,
+                "method": method,
+                "full_retrain": method == "full_retrain",
+                "full_retrain_reason": reason,
+                "r2_last_training": r2_last_training,
+                "r2_before": r2_before,
+                "r2_after": r2_after,
+                "update_seconds": update_seconds,
+                "full_retrain_seconds": full_retrain_seconds,
+                "seconds_saved": (full_retrain_seconds - update_seconds
+                                  if full_retrain_seconds is not None and method != "full_retrain" else None),
+            }
+            history.append(entry)
+            with open(config.update_report_file_path, "w") as file_obj:
+                json.dump(history, file_obj, indent=2)
+
+            logging.info(f"Incremental update completed in {update_seconds:.2f}s by {method}"
+                         + (f", {entry['seconds_saved']:.2f}s less than the last full training"
+                            if entry["seconds_saved"] is not None else ""))
+            return entry
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold new student records into the current model")
+    parser.add_argument("new_data_path", help="CSV file with the new records, in the columns of the source data")
+    parser.add_argument("--full-retrain", action="store_true",
+                        help="Re-run the full model search instead of warm-starting the current model")
+    args = parser.parse_args()
+
+    print(json.dumps(IncrementalUpdate().initiate_incremental_update(args.new_data_path,
+                                                                     force_full_retrain=args.full_retrain), indent=2))
+
+    metrics.write(os.path.join("artifacts", "training_metrics.prom"))
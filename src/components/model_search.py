@@ -0,0 +1,450 @@
+import sys
+import time
+from contextlib import nullcontext
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs, parallel_backend
+
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import r2_score
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    HalvingRandomSearchCV,
+    ParameterGrid,
+    ParameterSampler,
+    RandomizedSearchCV,
+    check_cv,
+    cross_val_score,
+    train_test_split,
+)
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import metrics, timed
+
+def limit_model_threads(model, n_threads=1):
+    """
+    Caps the number of threads a model uses internally, so that running many
+    fits side by side in a process pool does not oversubscribe the CPU.
+
+    Args:
+        model: An unfitted estimator (sklearn, XGBoost or CatBoost).
+        n_threads (int): Threads each fit may use.
+
+    Returns:
+        dict: The original values of the parameters that were changed, for restoring them later.
+    """
+    params = model.get_params()
+    original = {}
+    if "n_jobs" in params:
+        original["n_jobs"] = params["n_jobs"]
+    if type(model).__module__.startswith("catboost"):
+        original["thread_count"] = params.get("thread_count", -1)
+    model.set_params(**{name: n_threads for name in original})
+    return original
+
+def _fit_and_score(model, params, X, y, train_index, test_index, fit_params):
+    """
+    Fits one (model, parameter set, fold) task and returns its R² on the held-out fold
+    together with the fit time in seconds.
+    A parameter set the model rejects scores NaN, like GridSearchCV's default error_score.
+    """
+    started = time.perf_counter()
+    try:
+        estimator = clone(model).set_params(**params)
+        estimator.fit(X[train_index], y[train_index], **fit_params)
+    except Exception:
+        return np.nan, time.perf_counter() - started
+    fit_seconds = time.perf_counter() - started
+    return r2_score(y[test_index], estimator.predict(X[test_index])), fit_seconds
+
+def _fit_final(model, params, X, y, fit_params):
+    estimator = clone(model).set_params(**params)
+    estimator.fit(X, y, **fit_params)
+    return estimator
+
+def evaluate_models_parallel(X_train, y_train, models, parameters, cv=3, n_jobs=-1, fit_params=None):
+    """
+    Runs the hyperparameter search for all models at once over a process pool.
+
+    Every (model, parameter set, fold) combination is an independent task, so the
+    pool stays busy even while one model has a much larger grid than the others.
+    Each task is limited to a single thread (n_jobs / thread_count for XGBoost and
+    CatBoost, BLAS/OpenMP through joblib) to avoid oversubscribing the machine.
+    The best parameter set per model (highest mean fold R², ties go to the first one,
+    same as GridSearchCV) is then fitted once on the full training data. The fitted
+    estimators keep the single-thread setting, which also suits single-row inference.
+
+    Args:
+        X_train (np.array): Training feature data
+        y_train (np.array): Training target data
+        models (dict): Model name -> unfitted estimator
+        parameters (dict): Model name -> parameter grid
+        cv (int): Number of cross-validation folds
+        n_jobs (int): Worker processes, -1 for one per CPU core
+        fit_params (dict, optional): Model name -> extra keyword arguments for fit
+
+    Returns:
+        dict: Model name -> estimator fitted on the full training data with its best parameters
+    """
+    fit_params = fit_params or {}
+    folds = list(check_cv(cv, y_train, classifier=False).split(X_train, y_train))
+    original_threads = {name: limit_model_threads(model) for name, model in models.items()}
+
+    tasks = []
+    for name, model in models.items():
+        for candidate_index, params in enumerate(ParameterGrid(parameters[name])):
+            for train_index, test_index in folds:
+                tasks.append((name, candidate_index, params, train_index, test_index))
+
+    with parallel_backend("loky", inner_max_num_threads=1):
+        fold_results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_and_score)(models[name], params, X_train, y_train, train_index, test_index,
+                                    fit_params.get(name, {}))
+            for name, _, params, train_index, test_index in tasks
+        )
+
+        candidate_scores = {}
+        candidate_fit_seconds = {}
+        for (name, candidate_index, params, _, _), (score, fit_seconds) in zip(tasks, fold_results):
+            candidate_scores.setdefault(name, {}).setdefault(candidate_index, (params, []))[1].append(score)
+            candidate_fit_seconds.setdefault((name, candidate_index), []).append(fit_seconds)
+
+        for (name, _), fit_seconds in candidate_fit_seconds.items():
+            metrics.observe("model_search_fit_seconds", float(np.mean(fit_seconds)), model=name)
+            metrics.inc("model_search_candidates_total", model=name)
+
+        best_params = {}
+        for name, candidates in candidate_scores.items():
+            mean_scores = {i: np.mean(scores) for i, (_, scores) in candidates.items()}
+            best_index = max(candidates, key=lambda i: (np.nan_to_num(mean_scores[i], nan=-np.inf), -i))
+            best_params[name] = candidates[best_index][0]
+
+        fitted = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_final)(models[name], best_params[name], X_train, y_train, fit_params.get(name, {}))
+            for name in models
+        )
+
+    for name, model in models.items():
+        model.set_params(**original_threads[name])
+    return dict(zip(models, fitted))
+
+SEARCH_STRATEGIES = ("grid", "random", "halving", "halving_random")
+
+class _BudgetedSearch:
+    """
+    The search of one model run in steps, with a deadline (a time.perf_counter() value)
+    checked between them. A step is a batch of as many candidates as run in parallel (within
+    a rung, for successive halving), evaluated by a public GridSearchCV over that explicit
+    list, so the budget does not depend on the internals of sklearn's search classes.
+
+    The candidates are the ones the matching sklearn search would try (ParameterGrid or
+    ParameterSampler with the same random_state). Successive halving follows sklearn's
+    min_resources="exhaust" schedule, on a random subsample of the training rows per rung.
+    Once the deadline has passed, the best candidate evaluated so far (in the last rung that
+    ran, for halving) is refitted on all the training rows and stopped_at_deadline is set.
+
+    Has the attributes of the sklearn searches that evaluate_models reads: best_estimator_,
+    cv_results_ (params and mean_fit_time) and, for halving, n_candidates_ and n_resources_.
+    """
+    def __init__(self, strategy, model, parameter, cv, n_jobs, n_candidates, deadline, factor=3, random_state=42):
+        self.strategy = strategy
+        self.model = model
+        self.parameter = parameter
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.n_candidates = n_candidates
+        self.deadline = deadline
+        self.factor = factor
+        self.random_state = random_state
+
+    def _candidates(self):
+        grid = ParameterGrid(self.parameter)
+        if self.strategy == "random":
+            n_iter = min(self.n_candidates or 10, len(grid))
+        elif self.strategy == "halving_random":
+            n_iter = min(self.n_candidates or len(grid), len(grid))
+        else:
+            return list(grid)
+        return list(ParameterSampler(self.parameter, n_iter=n_iter, random_state=self.random_state))
+
+    def _evaluate(self, candidates, X, y, fit_params):
+        # One grid per candidate keeps GridSearchCV to exactly these parameter sets, in this order
+        search = GridSearchCV(self.model, [{name: [value] for name, value in params.items()} for params in candidates],
+                              cv=self.cv, n_jobs=self.n_jobs, refit=False)
+        search.fit(X, y, **fit_params)
+        self._fit_times.extend(search.cv_results_["mean_fit_time"])
+        return list(search.cv_results_["mean_test_score"])
+
+    def _evaluate_until_deadline(self, candidates, X, y, fit_params):
+        """
+        Evaluates the candidates in batches of as many as run in parallel, until the deadline.
+
+        Returns:
+            tuple: The candidates evaluated and their mean cross-validation R².
+        """
+        batch_size = max(effective_n_jobs(self.n_jobs), 1)
+        evaluated, scores = [], []
+        for start in range(0, len(candidates), batch_size):
+            # At least one batch always runs, so there is a best candidate to refit
+            if self._params and time.perf_counter() > self.deadline:
+                self.stopped_at_deadline = True
+                break
+            batch = candidates[start:start + batch_size]
+            scores.extend(self._evaluate(batch, X, y, fit_params))
+            evaluated.extend(batch)
+            self._params.extend(batch)
+        return evaluated, scores
+
+    def _search_rungs(self, candidates, X, y, fit_params):
+        n_samples = X.shape[0]
+        n_splits = check_cv(self.cv).get_n_splits()
+        n_required_iterations = 1 + int(np.floor(np.log(len(candidates)) / np.log(self.factor)))
+        min_resources = max(2 * n_splits, n_samples // self.factor ** (n_required_iterations - 1))
+        n_possible_iterations = 1 + int(np.floor(np.log(max(n_samples // min_resources, 1)) / np.log(self.factor)))
+        rng = np.random.RandomState(self.random_state)
+
+        finalists, scores = candidates, []
+        for iteration in range(min(n_required_iterations, n_possible_iterations)):
+            if iteration > 0:
+                # Keep the best 1 / factor of the previous rung, ties to the earlier candidate
+                order = sorted(range(len(finalists)), key=lambda i: (-np.nan_to_num(scores[i], nan=-np.inf), i))
+                finalists = [finalists[i] for i in order[:int(np.ceil(len(finalists) / self.factor))]]
+            n_resources = min(int(self.factor ** iteration * min_resources), n_samples)
+            rows = np.sort(rng.choice(n_samples, n_resources, replace=False))
+            evaluated, rung_scores = self._evaluate_until_deadline(finalists, X[rows], y[rows], fit_params)
+            if evaluated:
+                # The best candidate is picked from the last rung that ran, the most rows it was scored on
+                finalists, scores = evaluated, rung_scores
+                self.n_candidates_.append(len(evaluated))
+                self.n_resources_.append(n_resources)
+            if self.stopped_at_deadline:
+                break
+        return finalists, scores
+
+    def fit(self, X, y, **fit_params):
+        self.stopped_at_deadline = False
+        self._params, self._fit_times = [], []
+        self.n_candidates_, self.n_resources_ = [], []
+        candidates = self._candidates()
+        if self.strategy.startswith("halving"):
+            finalists, scores = self._search_rungs(candidates, X, y, fit_params)
+        else:
+            finalists, scores = self._evaluate_until_deadline(candidates, X, y, fit_params)
+
+        best_index = max(range(len(finalists)), key=lambda i: (np.nan_to_num(scores[i], nan=-np.inf), -i))
+        self.best_params_ = finalists[best_index]
+        self.best_estimator_ = clone(self.model).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y, **fit_params)
+        self.cv_results_ = {"params": self._params, "mean_fit_time": np.asarray(self._fit_times)}
+        return self
+
+def _make_search(strategy, model, parameter, cv, n_jobs, n_candidates, deadline=None):
+    """
+    Builds the search object for one model and strategy: sklearn's, or a _BudgetedSearch
+    that stops at `deadline` if one is given.
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy {strategy!r}, expected one of {SEARCH_STRATEGIES}")
+    if deadline is not None:
+        return _BudgetedSearch(strategy, model, parameter, cv, n_jobs, n_candidates, deadline)
+    grid_size = len(ParameterGrid(parameter))
+    if strategy == "grid":
+        return GridSearchCV(model, parameter, cv=cv, n_jobs=n_jobs)
+    if strategy == "random":
+        # Budgeted search: at most n_candidates parameter sets per model
+        n_iter = min(n_candidates or 10, grid_size)
+        return RandomizedSearchCV(model, parameter, n_iter=n_iter, cv=cv, n_jobs=n_jobs, random_state=42)
+    if strategy == "halving":
+        return HalvingGridSearchCV(model, parameter, cv=cv, factor=3, n_jobs=n_jobs, random_state=42)
+    return HalvingRandomSearchCV(model, parameter, n_candidates=min(n_candidates or grid_size, grid_size),
+                                 min_resources="exhaust", cv=cv, factor=3, n_jobs=n_jobs, random_state=42)
+
+def _native_early_stopping(model, X_val, y_val, rounds):
+    """
+    Switches on the boosting libraries' own early stopping.
+
+    XGBoost and CatBoost stop on a held-out validation slice passed at fit time,
+    GradientBoosting holds out its own validation_fraction.
+
+    Returns:
+        dict: Extra keyword arguments for model.fit.
+    """
+    module = type(model).__module__
+    if module.startswith("xgboost"):
+        model.set_params(early_stopping_rounds=rounds)
+        return {"eval_set": [(X_val, y_val)], "verbose": False}
+    if module.startswith("catboost"):
+        return {"eval_set": (X_val, y_val), "early_stopping_rounds": rounds}
+    if "n_iter_no_change" in model.get_params():
+        model.set_params(n_iter_no_change=rounds, validation_fraction=0.1)
+    return {}
+
+def _screen_models(train_data, models, fit_params, cv):
+    """
+    Cheap first rung: cross-validates every model once with its default parameters,
+    on its training rows in train_data (model name -> (X, y)).
+
+    Returns:
+        dict: Model name -> mean cross-validation R².
+    """
+    scores = {}
+    for name, model in models.items():
+        X, y = train_data[name]
+        fold_scores = cross_val_score(clone(model), X, y, cv=cv, params=fit_params[name])
+        scores[name] = float(np.nanmean(fold_scores)) if np.isfinite(fold_scores).any() else -np.inf
+    return scores
+
+def evaluate_models(X_train, y_train, X_test, y_test, models, parameters, n_jobs=None,
+                    search_strategy="grid", n_candidates=None, time_budget_seconds=None,
+                    screening_margin=None, early_stopping_rounds=None, search_log=None, fit_params=None):
+    """
+    Evaluate multiple regression models based on R² score, with hyperparameter tuning.
+    
+    This function evaluates each model provided in the `models` dictionary using cross-validation 
+    for hyperparameter tuning via `GridSearchCV` (or the selected `search_strategy`) and evaluates
+    the refitted best estimator on the test set. The entries of `models` are replaced by those
+    fitted best estimators.
+    
+    With `n_jobs` set, the grid search runs in parallel via `evaluate_models_parallel`.
+    
+    The cheaper strategies prune work early:
+    - "random": a randomized search over at most `n_candidates` parameter sets per model.
+    - "halving" / "halving_random": successive halving, every candidate starts on a small
+      share of the training rows and only the best third moves on to the next rung.
+    - `screening_margin`: every model is first cross-validated once with default parameters,
+      and models scoring more than this margin below the leader are dropped before their search.
+    - `time_budget_seconds`: models are searched best-screened first. A search that is still
+      running when the budget is spent stops after its current batch of candidates and keeps
+      the best one so far, and the remaining models are skipped.
+    - `early_stopping_rounds`: XGBoost, CatBoost and GradientBoosting stop adding trees once a
+      validation slice (10% of the training rows) stops improving. Only XGBoost and CatBoost
+      are searched without that slice; every other model trains on all of X_train.
+    
+    Pruned models are left out of the report. What was pruned, at which stage and after
+    how many seconds is appended to `search_log`.
+
+    Args:
+        X_train (np.array): Training feature data
+        y_train (np.array): Training target data
+        X_test (np.array): Testing feature data
+        y_test (np.array): Testing target data
+        models (dict): A dictionary where keys are model names and values are model instances
+        parameters (dict): A dictionary where keys are model names and values are dictionaries of hyperparameters 
+                           to tune for each model
+        n_jobs (int, optional): Worker processes for the parallel search, -1 for one per CPU core.
+                                None keeps the sequential search.
+        search_strategy (str): One of "grid", "random", "halving" or "halving_random".
+        n_candidates (int, optional): Parameter sets per model for the randomized strategies.
+        time_budget_seconds (float, optional): Wall-clock budget for the whole search.
+        screening_margin (float, optional): R² margin for dropping models after screening.
+        early_stopping_rounds (int, optional): Rounds without improvement before boosting stops.
+        search_log (list, optional): Receives one dict per pruning event.
+        fit_params (dict, optional): Model name -> extra keyword arguments for fit
+                                     (e.g. CatBoost's cat_features).
+
+    Returns:
+        dict: A dictionary with model names as keys and their corresponding R² scores on the test data
+    """
+    try:
+        report = {}
+        search_log = search_log if search_log is not None else []
+        started = time.perf_counter()
+        
+        def log_event(name, event, **details):
+            entry = {"model": name, "event": event, "elapsed_seconds": round(time.perf_counter() - started, 3), **details}
+            search_log.append(entry)
+            logging.info(f"Model search: {entry}")
+        
+        fit_params = {name: dict((fit_params or {}).get(name, {})) for name in models}
+        # Training rows per model: a model that early-stops on an eval_set is searched without
+        # the validation slice, every other model on all of X_train
+        all_rows = (X_train, y_train)
+        train_data = {name: all_rows for name in models}
+        if early_stopping_rounds is not None:
+            X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.1, random_state=42)
+            for name, model in models.items():
+                early_stopping = _native_early_stopping(model, X_val, y_val, early_stopping_rounds)
+                fit_params[name].update(early_stopping)
+                if "eval_set" in early_stopping:
+                    train_data[name] = (X_fit, y_fit)
+        
+        search_order = list(models)
+        if screening_margin is not None or time_budget_seconds is not None:
+            screening_scores = _screen_models(train_data, models, fit_params, cv=3)
+            search_order.sort(key=lambda name: screening_scores[name], reverse=True)
+            if screening_margin is not None:
+                leader_score = screening_scores[search_order[0]]
+                for name in list(search_order):
+                    if screening_scores[name] < leader_score - screening_margin:
+                        search_order.remove(name)
+                        log_event(name, "pruned_at_screening", cv_r2=screening_scores[name], leader_cv_r2=leader_score)
+        
+        search_per_model = n_jobs is None or search_strategy != "grid" or time_budget_seconds is not None
+        if not search_per_model:
+            with timed("training_stage_seconds", stage="model_search"):
+                # One parallel search per set of training rows (with and without the validation slice)
+                for rows in {id(train_data[name][0]): train_data[name] for name in search_order}.values():
+                    searched = {name: models[name] for name in search_order if train_data[name][0] is rows[0]}
+                    models.update(evaluate_models_parallel(*rows, searched, parameters, cv=3,
+                                                           n_jobs=n_jobs, fit_params=fit_params))
+        
+        search_started = time.perf_counter()
+        for name in search_order:
+            model = models[name]
+            parameter = parameters[name]
+            
+            if time_budget_seconds is not None and time.perf_counter() - started > time_budget_seconds:
+                log_event(name, "pruned_by_time_budget", time_budget_seconds=time_budget_seconds)
+                continue
+            
+            if search_per_model:
+                # Hyperparameter Tuning with GridSearchCV (or the selected strategy)
+                deadline = started + time_budget_seconds if time_budget_seconds is not None else None
+                gs = _make_search(search_strategy, model, parameter, cv=3, n_jobs=n_jobs, n_candidates=n_candidates,
+                                  deadline=deadline)
+                original_threads, backend = {}, nullcontext()
+                if n_jobs is not None:
+                    # The search runs its fits in parallel, cap each fit's own threads like evaluate_models_parallel
+                    original_threads = limit_model_threads(model)
+                    backend = parallel_backend("loky", inner_max_num_threads=1)
+                try:
+                    with timed("model_search_seconds", model=name), backend:
+                        gs.fit(*train_data[name], **fit_params[name])
+                finally:
+                    model.set_params(**original_threads)
+                if deadline is not None and gs.stopped_at_deadline:
+                    log_event(name, "search_stopped_by_time_budget", time_budget_seconds=time_budget_seconds,
+                              candidates_evaluated=len(gs.cv_results_["params"]))
+                for fit_seconds in gs.cv_results_["mean_fit_time"]:
+                    metrics.observe("model_search_fit_seconds", float(fit_seconds), model=name)
+                metrics.inc("model_search_candidates_total", len(gs.cv_results_["params"]), model=name)
+                
+                if search_strategy.startswith("halving"):
+                    for iteration, (n_kept, n_rows) in enumerate(zip(gs.n_candidates_, gs.n_resources_)):
+                        log_event(name, "halving_rung", iteration=iteration, candidates=int(n_kept), n_samples=int(n_rows))
+                
+                # GridSearchCV already refits the best hyperparameters on the
+                # whole training set, so reuse that instead of fitting again
+                model = gs.best_estimator_
+                models[name] = model
+            
+            # model.fit(X_train, y_train)  # Training the model 
+            
+            # y_train_pred = model.predict(X_train)
+            y_test_pred = model.predict(X_test)
+            
+            # train_model_score = r2_score(y_train, y_train_pred)
+            test_model_score = r2_score(y_test, y_test_pred)
+            
+            report[name] = test_model_score
+        
+        if search_per_model:
+            # Same series as the parallel search; the time per model is in model_search_seconds
+            metrics.observe("training_stage_seconds", time.perf_counter() - search_started, stage="model_search")
+            
+        return report
+            
+    except Exception as e:
+        raise CustomException(e,sys)
@@ -0,0 +1,187 @@
+import statistics
+import time
+
+import dill
+import numpy as np
+
+from src.pipeline.compiled_model import check_model_parity, compile_model
+
+def _median_seconds(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def _batch(X_sample, batch_rows):
+    # The sample's rows repeated up to batch_rows, so the batch cost is measured at a
+    # realistic bulk size however small the test set is
+    take = np.resize(np.arange(X_sample.shape[0]), batch_rows)
+    return X_sample.iloc[take] if hasattr(X_sample, "iloc") else X_sample[take]
+
+def serving_cost(predictor, X_sample, batch_rows=4096, single_row_repeat=20, batch_repeat=5, load_repeat=3):
+    """
+    Measures what serving one artifact costs: its pickled size, load time, and the latency
+    of a single-row and of a `batch_rows` predict.
+
+    Args:
+        predictor: The fitted estimator or its compiled export.
+        X_sample (np.array): Transformed features; its first row is the single row and its
+                             rows repeated up to `batch_rows` the batch.
+        batch_rows (int): Rows of the timed batch.
+        single_row_repeat (int): Timed single-row predict calls; the median is reported.
+        batch_repeat (int): Timed batch predict calls.
+        load_repeat (int): Timed deserializations.
+
+    Returns:
+        dict: size_bytes, load_ms, single_row_ms, batch_rows, batch_ms and batch_us_per_row.
+    """
+    payload = dill.dumps(predictor)
+    row = X_sample[:1]
+    batch = _batch(X_sample, batch_rows)
+    predictor.predict(row)  # Warm up lazily initialized state (thread pools, caches) before timing
+    batch_seconds = _median_seconds(lambda: predictor.predict(batch), batch_repeat)
+    return {
+        "size_bytes": len(payload),
+        "load_ms": _median_seconds(lambda: dill.loads(payload), load_repeat) * 1000.0,
+        "single_row_ms": _median_seconds(lambda: predictor.predict(row), single_row_repeat) * 1000.0,
+        "batch_rows": batch_rows,
+        "batch_ms": batch_seconds * 1000.0,
+        "batch_us_per_row": batch_seconds * 1e6 / batch_rows,
+    }
+
+# Load times this close are measurement noise, a model is loaded once per process
+_LOAD_MS_TOLERANCE = 1.0
+
+def compiled_serving_mode(model_cost, compiled_cost):
+    """
+    Decides how a compiled model that reproduces the estimator is served, from the
+    serving_cost of both.
+
+    Returns:
+        str: "compiled" if it is no slower to load, on a single row and on the batch: it replaces
+             model.pkl. "routed" if it is only faster on a single row: it serves the small
+             batches and model.pkl the large ones. None if it is not faster on a single row.
+    """
+    faster_single_row = compiled_cost["single_row_ms"] <= model_cost["single_row_ms"]
+    if (faster_single_row and compiled_cost["batch_ms"] <= model_cost["batch_ms"]
+            and compiled_cost["load_ms"] <= model_cost["load_ms"] + _LOAD_MS_TOLERANCE):
+        return "compiled"
+    if faster_single_row:
+        return "routed"
+    return None
+
+def compiled_row_limit(model, compiled_model, X_sample, max_rows=4096, repeat=5):
+    """
+    The largest batch the compiled model still predicts no slower than the estimator,
+    trying batch sizes doubling from one row up to `max_rows`.
+
+    Returns:
+        int: The row limit, 0 if the compiled model is slower even on a single row.
+    """
+    limit, rows = 0, 1
+    while rows <= max_rows:
+        batch = _batch(X_sample, rows)
+        if _median_seconds(lambda: compiled_model.predict(batch), repeat) > _median_seconds(lambda: model.predict(batch), repeat):
+            break
+        limit, rows = rows, rows * 2
+    return limit
+
+def profile_model(model, X_sample, **cost_options):
+    """
+    Measures what serving a fitted model costs, on the artifacts the prediction service
+    would actually load: the NumPy export when the model can be compiled and it is no slower
+    (see compiled_serving_mode), the export for single rows and model.pkl for batches when
+    it is only faster on small batches, otherwise the pickled model itself.
+
+    Args:
+        model: The fitted estimator.
+        X_sample (np.array): Transformed features (see serving_cost).
+        **cost_options: Passed to serving_cost.
+
+    Returns:
+        dict: served_as, size_bytes, load_ms, single_row_ms, batch_rows, batch_ms and batch_us_per_row.
+    """
+    model_cost = serving_cost(model, X_sample, **cost_options)
+    try:
+        compiled_model = compile_model(model)
+        check_model_parity(model, compiled_model, X_sample)
+    except ValueError:
+        return {"served_as": "model.pkl", **model_cost}
+
+    compiled_cost = serving_cost(compiled_model, X_sample, **cost_options)
+    mode = compiled_serving_mode(model_cost, compiled_cost)
+    if mode == "compiled":
+        return {"served_as": "compiled_model.pkl", **compiled_cost}
+    if mode == "routed":
+        # Both artifacts are loaded, single rows go to the export and the batch to the faster of the two
+        return {
+            "served_as": "compiled_model.pkl+model.pkl",
+            **min(model_cost, compiled_cost, key=lambda cost: cost["batch_ms"]),
+            "size_bytes": model_cost["size_bytes"] + compiled_cost["size_bytes"],
+            "load_ms": model_cost["load_ms"] + compiled_cost["load_ms"],
+            "single_row_ms": compiled_cost["single_row_ms"],
+        }
+    return {"served_as": "model.pkl", **model_cost}
+
+# Serving costs a model is compared on, lower is better
+_COSTS = ("single_row_ms", "batch_us_per_row", "size_bytes")
+
+def pareto_front(report):
+    """
+    Names of the models no other model beats on R², single-row latency, batch cost per row and size at once.
+
+    Args:
+        report (dict): Model name -> {"r2_score", "single_row_ms", "batch_us_per_row", "size_bytes", ...}.
+
+    Returns:
+        list: The Pareto-optimal model names, best R² first.
+    """
+    def dominates(a, b):
+        at_least_as_good = a["r2_score"] >= b["r2_score"] and all(a[cost] <= b[cost] for cost in _COSTS)
+        better = a["r2_score"] > b["r2_score"] or any(a[cost] < b[cost] for cost in _COSTS)
+        return at_least_as_good and better
+
+    front = [name for name, entry in report.items()
+             if not any(dominates(other, entry) for other_name, other in report.items() if other_name != name)]
+    return sorted(front, key=lambda name: report[name]["r2_score"], reverse=True)
+
+def select_model(report, latency_budget_ms=None, size_budget_bytes=None, r2_tolerance=0.0,
+                 batch_budget_us_per_row=None):
+    """
+    Picks the model to ship from the R² and serving cost of every candidate.
+
+    Models over the single-row latency, batch cost or size budget are ruled out. Among the
+    rest, every model whose R² is within `r2_tolerance` of the best one counts as equally
+    accurate, and the fastest of those on a single row wins (then the cheapest per row on a
+    batch, then the smaller). With no budgets and a zero tolerance this is simply the best R².
+
+    Args:
+        report (dict): Model name -> {"r2_score", "single_row_ms", "batch_us_per_row", "size_bytes", ...}.
+        latency_budget_ms (float): Maximum single-row predict latency, None for no limit.
+        size_budget_bytes (int): Maximum serialized size, None for no limit.
+        r2_tolerance (float): R² the winner may give up for a faster model.
+        batch_budget_us_per_row (float): Maximum batch predict cost per row, None for no limit.
+
+    Returns:
+        str: The selected model name.
+
+    Raises:
+        ValueError: If no model fits within the budgets.
+    """
+    feasible = {
+        name: entry for name, entry in report.items()
+        if (latency_budget_ms is None or entry["single_row_ms"] <= latency_budget_ms)
+        and (batch_budget_us_per_row is None or entry["batch_us_per_row"] <= batch_budget_us_per_row)
+        and (size_budget_bytes is None or entry["size_bytes"] <= size_budget_bytes)
+    }
+    if not feasible:
+        raise ValueError(f"No model meets the latency budget of {latency_budget_ms} ms, batch budget of "
+                         f"{batch_budget_us_per_row} us per row and size budget of {size_budget_bytes} bytes")
+
+    best_r2_score = max(entry["r2_score"] for entry in feasible.values())
+    if r2_tolerance <= 0:
+        return max(feasible, key=lambda name: feasible[name]["r2_score"])
+    accurate = [name for name, entry in feasible.items() if entry["r2_score"] >= best_r2_score - r2_tolerance]
+    return min(accurate, key=lambda name: tuple(feasible[name][cost] for cost in _COSTS))
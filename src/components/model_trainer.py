@@ -1,5 +1,7 @@
+import json
 import os
 import sys
+import time
 from dataclasses import dataclass
 
 from catboost import CatBoostRegressor
@@ -9,29 +11,250 @@ from sklearn.neighbors import KNeighborsRegressor
 from sklearn.tree import DecisionTreeRegressor
 from xgboost import XGBRegressor
 
+from src.components import feature_plans as feature_plans_module
+from src.components import model_search as model_search_module
+from src.components import model_selection as model_selection_module
+from src.components.feature_plans import ONE_HOT_PLANS, matrix_nbytes, prepare_model, to_serving_input
+from src.components.model_search import evaluate_models
+from src.components.model_selection import (
+    compiled_row_limit, compiled_serving_mode, pareto_front, profile_model, select_model, serving_cost
+)
+from src.artifact_store import ArtifactStore
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object, evaluate_models
+from src.metrics import timed
+from src.pipeline import compiled_model as compiled_model_module
+from src.pipeline.compiled_model import check_model_parity, compile_model
+from src.stage_cache import StageCache, code_version, config_values, hash_array, hash_matrix
+from src.utils import load_object, save_object
 
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = os.path.join("artifacts", "model.pkl")
+    # NumPy-only export of the best model, served instead of model.pkl when present
+    # (or only for small batches, when that is where it is faster)
+    compiled_model_file_path = os.path.join("artifacts", "compiled_model.pkl")
+    search_log_file_path = os.path.join("artifacts", "search_log.json")
+    # R², latency, size and load time of every candidate, and why the winner was picked
+    model_report_file_path = os.path.join("artifacts", "model_report.json")
+    # Worker processes for the hyperparameter search, -1 for one per CPU core, None for sequential
+    search_n_jobs = -1
+    # "grid", "random", "halving" or "halving_random" (see evaluate_models)
+    search_strategy = "grid"
+    search_n_candidates = None
+    search_time_budget_seconds = None
+    search_screening_margin = None
+    early_stopping_rounds = None
+    # Model selection: the best R² among the models within the budgets (None for no budget).
+    # The latency is one single-row predict of the artifact that will be served
+    selection_latency_budget_ms = None
+    selection_size_budget_bytes = None
+    # Maximum cost per row of a 4096-row batch predict (bulk scoring, /api/predict), e.g. 50.0
+    selection_batch_budget_us_per_row = None
+    # R² the winner may give up for a faster model, e.g. 0.005 ships the fastest model within 0.005 of the best
+    selection_r2_tolerance = 0.0
+    # Feature plan of each model when the trainer is given feature sets (see feature_plans.FEATURE_PLANS)
+    model_feature_plans = {
+        "Linear Regression": "one_hot_sparse",
+        "K-Neighbors Regressor": "one_hot_dense",
+        "Decision Tree": "one_hot_sparse",
+        "Random Forest Regressor": "one_hot_sparse",
+        "XGBRegressor": "native_categorical",
+        "Gradient Boosting Regressor": "one_hot_sparse",
+        "CatBoosting Regressor": "native_categorical_object",
+        "AdaBoost Regressor": "one_hot_sparse"
+    }
+    # Written when a native categorical plan wins, the compiled one-hot preprocessor is then removed
+    preprocessor_file_path = os.path.join("artifacts", "preprocessor.pkl")
+    compiled_preprocessor_file_path = os.path.join("artifacts", "compiled_preprocessor.pkl")
+    use_stage_cache = True
     
 class ModelTrainer:
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()
+        self.stage_cache = StageCache("model_trainer")
+        # Per-model search results, so changing one model's grid only re-runs that model
+        self.model_cache = StageCache("model_search")
+        self.artifact_store = ArtifactStore()
         
-    def initiate_model_trainer(self, train_array, test_array):
+    def get_models(self):
+        """
+        Returns the candidate models, unfitted, keyed by name.
+        """
+        return {
+            "Linear Regression": LinearRegression(),
+            "K-Neighbors Regressor": KNeighborsRegressor(),
+            "Decision Tree": DecisionTreeRegressor(),
+            "Random Forest Regressor": RandomForestRegressor(),
+            "XGBRegressor": XGBRegressor(),
+            "Gradient Boosting Regressor": GradientBoostingRegressor(),
+            "CatBoosting Regressor": CatBoostRegressor(verbose=False),
+            "AdaBoost Regressor": AdaBoostRegressor()
+        }
+
+    def get_model_params(self):
+        """
+        Returns the hyperparameter grid searched for each model in get_models.
+        """
+        return {
+            "Linear Regression": {},
+            "K-Neighbors Regressor": {
+                "n_neighbors": [5,7,9,11],
+                # "weights": ["uniform", "distance"],
+                # "algorithm": ["ball_tree", "kd_tree", "brute"]
+            },
+            "Decision Tree": {
+                "criterion": ["squared_error", "friedman_mse", "absolute_error", "poisson"],
+                # "splitter": ["best", "random"],
+                # "max_features": ["sqrt", "log2"]
+            },
+            "Random Forest Regressor": {
+                # "criterion": ["squared_error", "friedman_mse", "absolute_error", "poisson"],
+                # "max_features": ["sqrt", "log2"],
+                "n_estimators": [8, 16, 32, 64, 128, 256]
+            },
+            "XGBRegressor": {
+                "learning_rate": [.1, .01, .05, .001],
+                "n_estimators": [8, 16, 32, 64, 128, 256]
+            },
+            "Gradient Boosting Regressor": {
+                # "loss": ["squared_error", "huber", "absolute_error", "quantile"],
+                "learning_rate": [.1, .01, .05, .001],
+                "subsample": [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
+                # "criterion": ["squared_error", "friedman_mse"],
+                # "max_features": ["sqrt", "log2"],
+                "n_estimators": [8, 16, 32, 64, 128, 256]
+            },
+            "CatBoosting Regressor": {
+                "depth": [6,8,10],
+                "learning_rate": [.01, .05, .1],
+                "iterations": [30, 50, 100]
+            },
+            "AdaBoost Regressor": {
+                "learning_rate": [.1, .01, .05, .001],
+                # "loss": ["linear", "square", "exponential"],
+                "n_estimators": [8, 16, 32, 64, 128, 256]
+            }
+        }
+
+    def _remove_compiled_preprocessor(self):
+        # The compiled preprocessor only covers the one-hot features
+        if os.path.exists(self.model_trainer_config.compiled_preprocessor_file_path):
+            os.remove(self.model_trainer_config.compiled_preprocessor_file_path)
+
+    def _remove_compiled_model(self):
+        # A compiled model left over from an earlier run would be served instead of the new model.pkl
+        if os.path.exists(self.model_trainer_config.compiled_model_file_path):
+            os.remove(self.model_trainer_config.compiled_model_file_path)
+
+    @timed("training_stage_seconds", stage="model_export")
+    def export_compiled_model(self, model, X_train, X_test):
+        """
+        Exports the best model to a NumPy-only artifact the prediction service loads
+        instead of, or next to, model.pkl. The export is faster to load and much faster per
+        call than the original estimator (e.g. a 256-tree RandomForest or a CatBoost model),
+        but it walks every tree level by level, so on large batches it can be several times slower.
+
+        The export is only written if it reproduces model.predict on the train and test
+        sets, and it is then served by its measured cost (see compiled_serving_mode):
+        - no slower to load, on a single row and on a batch: instead of model.pkl;
+        - only faster on a single row: for batches up to the size where model.pkl overtakes it
+          (max_batch_rows), model.pkl serves the larger ones;
+        - otherwise not at all.
+        Model types that cannot be compiled are served from model.pkl.
+
+        Args:
+            model: The fitted best model.
+            X_train (np.array): Training features.
+            X_test (np.array): Testing features.
+
+        Returns:
+            bool: True if compiled_model.pkl was written.
+        """
+        self._remove_compiled_model()
+        name = type(model).__name__
+        try:
+            compiled_model = compile_model(model)
+            max_diff = max(check_model_parity(model, compiled_model, X_train),
+                           check_model_parity(model, compiled_model, X_test))
+        except ValueError as e:
+            logging.info(f"Serving {name} from model.pkl, it was not exported: {e}")
+            return False
+
+        model_cost = serving_cost(model, X_test)
+        compiled_cost = serving_cost(compiled_model, X_test)
+        costs = (f"single row {compiled_cost['single_row_ms']:.3f} vs {model_cost['single_row_ms']:.3f} ms, "
+                 f"{compiled_cost['batch_rows']} rows {compiled_cost['batch_ms']:.1f} vs {model_cost['batch_ms']:.1f} ms, "
+                 f"load {compiled_cost['load_ms']:.1f} vs {model_cost['load_ms']:.1f} ms")
+        mode = compiled_serving_mode(model_cost, compiled_cost)
+        if mode == "routed":
+            compiled_model.max_batch_rows = compiled_row_limit(model, compiled_model, X_test)
+            if not compiled_model.max_batch_rows:
+                mode = None
+        if mode is None:
+            logging.info(f"Serving {name} from model.pkl, the compiled export is not faster ({costs})")
+            return False
+
+        save_object(file_path=self.model_trainer_config.compiled_model_file_path, obj=compiled_model)
+        served = ("for every batch" if compiled_model.max_batch_rows is None
+                  else f"for batches of up to {compiled_model.max_batch_rows} rows, model.pkl serves larger ones")
+        logging.info(f"Exported {name} to {self.model_trainer_config.compiled_model_file_path}, served {served} "
+                     f"({costs}; largest difference from predict: {max_diff:g})")
+        return True
+
+    def publish_artifacts(self, metadata, source_key=None):
+        """
+        Publishes the artifacts the prediction service loads (model, preprocessor and their
+        compiled exports, whichever exist) as a new version of the artifact store, which the
+        model registry then loads instead of the individual files.
+
+        Args:
+            metadata (dict): Training metadata recorded in the version's manifest.
+            source_key (str, optional): The stage cache key of the run; a rerun with the same
+                                        key keeps the current version (see ArtifactStore.publish).
+
+        Returns:
+            str: The published version.
+        """
+        config = self.model_trainer_config
+        paths = {
+            "model": config.trained_model_file_path,
+            "preprocessor": config.preprocessor_file_path,
+            "compiled_preprocessor": config.compiled_preprocessor_file_path,
+            "compiled_model": config.compiled_model_file_path,
+        }
+        objects = {name: load_object(path) for name, path in paths.items() if os.path.exists(path)}
+        previous_version = self.artifact_store.current_version()
+        version = self.artifact_store.publish(objects, metadata=metadata, source_key=source_key)
+        if version == previous_version:
+            logging.info(f"Artifacts unchanged, keeping artifact version {version}")
+        else:
+            logging.info(f"Published {sorted(objects)} as artifact version {version}")
+        return version
+
+    @timed("training_stage_seconds", stage="model_trainer")
+    def initiate_model_trainer(self, train_array, test_array, feature_sets=None):
         """
         Train and evaluate multiple models to select the best one based on R² score, 
         and save the best model if the score is above a threshold.
 
+        Every candidate's serving cost (single-row and batch latency, size, load time) is
+        measured too; models over the configured budgets are ruled out and the selection_*
+        settings can trade a little R² for a faster model (see select_model). The
+        measurements are written to model_report.json next to model.pkl.
+
+        With `feature_sets` (from DataTransformation.initiate_feature_plans), each model is
+        searched on the matrices of its plan in `model_feature_plans` (e.g. CSR one-hot, or
+        category codes for XGBoost / CatBoost native categorical support). A winner trained
+        on a native categorical plan is shipped with that plan's preprocessor.
+
         Args:
             train_array (np.array): Training data
             test_array (np.array): Testing data
+            feature_sets (dict, optional): Feature plan name -> FeatureSet
 
         Raises:
-            CustomException: If no model performs well (R² < 0.6)
+            CustomException: If no model performs well (R² < 0.6) or none fits the budgets
 
         Returns:
             float: The R² score of the best model on the test set
@@ -44,74 +267,197 @@ class ModelTrainer:
                 test_array[:,:-1],
                 test_array[:,-1]
             )
-            models = {
-                "Linear Regression": LinearRegression(),
-                "K-Neighbors Regressor": KNeighborsRegressor(),
-                "Decision Tree": DecisionTreeRegressor(),
-                "Random Forest Regressor": RandomForestRegressor(),
-                "XGBRegressor": XGBRegressor(),
-                "Gradient Boosting Regressor": GradientBoostingRegressor(),
-                "CatBoosting Regressor": CatBoostRegressor(verbose=False),
-                "AdaBoost Regressor": AdaBoostRegressor()
-            }
+            models = self.get_models()
+            params = self.get_model_params()
+            
+            config = self.model_trainer_config
             
-            params = {
-                "Linear Regression": {},
-                "K-Neighbors Regressor": {
-                    "n_neighbors": [5,7,9,11],
-                    # "weights": ["uniform", "distance"],
-                    # "algorithm": ["ball_tree", "kd_tree", "brute"]
-                },
-                "Decision Tree": {
-                    "criterion": ["squared_error", "friedman_mse", "absolute_error", "poisson"],
-                    # "splitter": ["best", "random"],
-                    # "max_features": ["sqrt", "log2"]
-                },
-                "Random Forest Regressor": {
-                    # "criterion": ["squared_error", "friedman_mse", "absolute_error", "poisson"],
-                    # "max_features": ["sqrt", "log2"],
-                    "n_estimators": [8, 16, 32, 64, 128, 256]
-                },
-                "XGBRegressor": {
-                    "learning_rate": [.1, .01, .05, .001],
-                    "n_estimators": [8, 16, 32, 64, 128, 256]
-                },
-                "Gradient Boosting Regressor": {
-                    # "loss": ["squared_error", "huber", "absolute_error", "quantile"],
-                    "learning_rate": [.1, .01, .05, .001],
-                    "subsample": [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
-                    # "criterion": ["squared_error", "friedman_mse"],
-                    # "max_features": ["sqrt", "log2"],
-                    "n_estimators": [8, 16, 32, 64, 128, 256]
-                },
-                "CatBoosting Regressor": {
-                    "depth": [6,8,10],
-                    "learning_rate": [.01, .05, .1],
-                    "iterations": [30, 50, 100]
-                },
-                "AdaBoost Regressor": {
-                    "learning_rate": [.1, .01, .05, .001],
-                    # "loss": ["linear", "square", "exponential"],
-                    "n_estimators": [8, 16, 32, 64, 128, 256]
+            # Without feature plans every model trains on the dense one-hot arrays
+            plan_data = {"one_hot_dense": (X_train, y_train, X_test, y_test)}
+            model_plans = {name: "one_hot_dense" for name in models}
+            model_fit_params = {name: {} for name in models}
+            if feature_sets is not None:
+                plan_data.update({
+                    plan: (feature_set.X_train, feature_set.y_train, feature_set.X_test, feature_set.y_test)
+                    for plan, feature_set in feature_sets.items()
+                })
+                for name, model in models.items():
+                    model_plans[name] = config.model_feature_plans.get(name, "one_hot_dense")
+                    feature_set = feature_sets[model_plans[name]]
+                    model_fit_params[name] = prepare_model(model, feature_set.plan, feature_set.n_numerical,
+                                                           feature_set.n_categorical)
+            
+            # Every model's search result depends on the data, its estimator and grid,
+            # the search settings and the search code
+            model_keys = {}
+            stage_key = None
+            if config.use_stage_cache:
+                plan_hashes = {"one_hot_dense": (hash_array(train_array), hash_array(test_array))}
+                for plan in set(model_plans.values()) & set(feature_sets or ()):
+                    plan_X_train, plan_y_train, plan_X_test, plan_y_test = plan_data[plan]
+                    plan_hashes[plan] = (hash_matrix(plan_X_train), hash_array(plan_y_train),
+                                         hash_matrix(plan_X_test), hash_array(plan_y_test))
+                search_settings = {
+                    "strategy": config.search_strategy,
+                    "n_candidates": config.search_n_candidates,
+                    "early_stopping_rounds": config.early_stopping_rounds,
                 }
-            }
+                search_code = code_version(model_search_module)
+                for name, model in models.items():
+                    model_keys[name] = self.model_cache.make_key(
+                        data=plan_hashes[model_plans[name]], plan=model_plans[name], model=name,
+                        estimator=model.get_params(), fit_params=model_fit_params[name], grid=params[name],
+                        search=search_settings, code=search_code,
+                    )
+                stage_key = self.stage_cache.make_key(
+                    models=model_keys, config=config_values(config),
+                    code=code_version(__file__, compiled_model_module, model_selection_module, feature_plans_module),
+                )
+                cached = self.stage_cache.load(stage_key)
+                if cached is not None:
+                    logging.info("Model trainer inputs unchanged, reusing the cached best model")
+                    if "compiled_model.pkl" not in cached["files"]:
+                        self._remove_compiled_model()
+                    if cached["values"].get("feature_plan", "one_hot_dense") not in ONE_HOT_PLANS:
+                        # The cached preprocessor.pkl of the plan was restored, the compiled one does not match it
+                        self._remove_compiled_preprocessor()
+                    self.publish_artifacts({
+                        "source": "model_trainer",
+                        "selected": cached["values"]["best_model_name"],
+                        "r2_score": cached["values"]["best_r2_score"],
+                        "feature_plan": cached["values"].get("feature_plan", "one_hot_dense"),
+                    }, source_key=stage_key)
+                    return cached["values"]["best_r2_score"]
+            
+            models_report = {}
+            pending_models = {}
+            for name, model in models.items():
+                cached = self.model_cache.load(model_keys[name]) if name in model_keys else None
+                if cached is None:
+                    pending_models[name] = model
+                else:
+                    models[name] = cached["objects"]["model"]
+                    models_report[name] = cached["values"]["r2_score"]
+            if models_report:
+                logging.info(f"Reusing cached search results for {list(models_report)}")
+            
+            search_log = []
+            plan_report = {}
+            for plan in sorted(set(model_plans.values())):
+                plan_X_train, plan_y_train, plan_X_test, plan_y_test = plan_data[plan]
+                plan_report[plan] = {
+                    "models": [name for name in models if model_plans[name] == plan],
+                    "train_matrix_mb": matrix_nbytes(plan_X_train) / 1e6,
+                    "preprocessor_fit_seconds": feature_sets[plan].fit_seconds if plan in (feature_sets or {}) else None,
+                    "search_seconds": None,
+                }
+                plan_pending = {name: model for name, model in pending_models.items() if model_plans[name] == plan}
+                if not plan_pending:
+                    continue
+                
+                started = time.perf_counter()
+                pending_report = evaluate_models(X_train=plan_X_train, y_train=plan_y_train,
+                                                 X_test=plan_X_test, y_test=plan_y_test,
+                                                 models=plan_pending, parameters=params,
+                                                 n_jobs=config.search_n_jobs,
+                                                 search_strategy=config.search_strategy,
+                                                 n_candidates=config.search_n_candidates,
+                                                 time_budget_seconds=config.search_time_budget_seconds,
+                                                 screening_margin=config.search_screening_margin,
+                                                 early_stopping_rounds=config.early_stopping_rounds,
+                                                 search_log=search_log, fit_params=model_fit_params)
+                plan_report[plan]["search_seconds"] = time.perf_counter() - started
+                logging.info(f"Feature plan {plan}: searched {list(plan_pending)} in "
+                             f"{plan_report[plan]['search_seconds']:.2f}s on a "
+                             f"{plan_report[plan]['train_matrix_mb']:.2f} MB training matrix")
+                models.update(plan_pending)
+                models_report.update(pending_report)
+                for name, r2 in pending_report.items():
+                    if name in model_keys:
+                        self.model_cache.store(model_keys[name], objects={"model": models[name]},
+                                               values={"r2_score": r2})
             
-            models_report: dict = evaluate_models(X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, 
-                                                  models=models, parameters=params)
+            # Keep a record of what the search pruned and when
+            os.makedirs(os.path.dirname(config.search_log_file_path), exist_ok=True)
+            with open(config.search_log_file_path, "w") as file_obj:
+                json.dump(search_log, file_obj, indent=2)
             
-            # Find the model with the best R² score
-            best_model_name, best_r2_score = max(models_report.items(), key=lambda x: x[1])
+            # Measure what serving each candidate costs, then pick the best R² within the budgets
+            with timed("training_stage_seconds", stage="model_selection"):
+                # Profiled on the input the prediction service will feed the model
+                selection_report = {
+                    name: {"r2_score": r2, "feature_plan": model_plans[name],
+                           **profile_model(models[name], to_serving_input(plan_data[model_plans[name]][2]))}
+                    for name, r2 in models_report.items()
+                }
+                best_model_name = select_model(
+                    selection_report,
+                    latency_budget_ms=config.selection_latency_budget_ms,
+                    size_budget_bytes=config.selection_size_budget_bytes,
+                    r2_tolerance=config.selection_r2_tolerance,
+                    batch_budget_us_per_row=config.selection_batch_budget_us_per_row,
+                )
+            best_r2_score = models_report[best_model_name]
             best_model = models[best_model_name]
             
+            with open(config.model_report_file_path, "w") as file_obj:
+                json.dump({
+                    "selected": best_model_name,
+                    "objective": {
+                        "latency_budget_ms": config.selection_latency_budget_ms,
+                        "size_budget_bytes": config.selection_size_budget_bytes,
+                        "batch_budget_us_per_row": config.selection_batch_budget_us_per_row,
+                        "r2_tolerance": config.selection_r2_tolerance,
+                    },
+                    "pareto_front": pareto_front(selection_report),
+                    "models": selection_report,
+                    "feature_plans": plan_report,
+                }, file_obj, indent=2)
+            
             if best_r2_score < 0.6:
-                raise CustomException("No best model found")
+                raise CustomException("No best model found", sys)
             
-            logging.info(f"The best model was identified as {best_model_name} based on the highest r2_score: {best_r2_score} obtained on the test data")
+            logging.info(f"The best model was identified as {best_model_name} with r2_score {best_r2_score} on the test data "
+                         f"and {selection_report[best_model_name]['single_row_ms']:.3f} ms per single-row prediction, "
+                         f"{selection_report[best_model_name]['batch_us_per_row']:.2f} us per row on a batch")
             
             save_object(
                 file_path=self.model_trainer_config.trained_model_file_path,
                 obj=best_model
             )
+            best_plan = model_plans[best_model_name]
+            if best_plan not in ONE_HOT_PLANS:
+                # The model needs its plan's preprocessor at serving time, not the standard one-hot one
+                save_object(file_path=config.preprocessor_file_path, obj=feature_sets[best_plan].preprocessor)
+                self._remove_compiled_preprocessor()
+            best_X_train, _, best_X_test, _ = plan_data[best_plan]
+            exported = self.export_compiled_model(best_model, to_serving_input(best_X_train),
+                                                  to_serving_input(best_X_test))
+            
+            if stage_key is not None:
+                output_files = {
+                    "model.pkl": config.trained_model_file_path,
+                    "search_log.json": config.search_log_file_path,
+                    "model_report.json": config.model_report_file_path,
+                }
+                if exported:
+                    output_files["compiled_model.pkl"] = config.compiled_model_file_path
+                if best_plan not in ONE_HOT_PLANS:
+                    output_files["preprocessor.pkl"] = config.preprocessor_file_path
+                self.stage_cache.store(
+                    stage_key,
+                    files=output_files,
+                    values={"best_model_name": best_model_name, "best_r2_score": best_r2_score,
+                            "feature_plan": best_plan},
+                )
+            
+            self.publish_artifacts({
+                "source": "model_trainer",
+                "selected": best_model_name,
+                "r2_score": best_r2_score,
+                "feature_plan": best_plan,
+                "single_row_ms": selection_report[best_model_name]["single_row_ms"],
+            }, source_key=stage_key)
             
             # Instead of this:
             # y_predicted = best_model.predict(X_test)
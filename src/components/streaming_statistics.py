@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from src.pipeline.compiled_preprocessor import CompiledPreprocessor
+
+class StreamingStatistics:
+    """
+    Accumulates the statistics of the DataTransformation preprocessor one chunk at a time.
+
+    Per column it only keeps a value -> count table plus a missing-value count. That is
+    enough to derive every fitted statistic exactly, without holding the data:
+    - numerical: median (SimpleImputer), then mean / variance of the imputed column (StandardScaler)
+    - categorical: mode (SimpleImputer), the sorted category set (OneHotEncoder) and the
+      per-category frequency, whose p * (1 - p) is the one-hot column's variance
+
+    Memory grows with the number of distinct values per column, not with the number of
+    rows; the scores here have at most 101 distinct values.
+    """
+    def __init__(self, numerical_columns, categorical_columns):
+        self.numerical_columns = list(numerical_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.input_columns = None
+        self.n_rows = 0
+        self.value_counts = {column: pd.Series(dtype=np.int64) for column in self.numerical_columns + self.categorical_columns}
+        self.missing_counts = {column: 0 for column in self.numerical_columns + self.categorical_columns}
+
+    def update(self, features_df):
+        if self.input_columns is None:
+            self.input_columns = list(features_df.columns)
+        self.n_rows += len(features_df)
+        for column in self.numerical_columns + self.categorical_columns:
+            values = features_df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Count the values themselves, a Categorical would also list its unused categories
+                values = values.astype(object)
+            self.missing_counts[column] += int(values.isna().sum())
+            self.value_counts[column] = self.value_counts[column].add(values.value_counts(), fill_value=0)
+
+    def _median(self, column):
+        counts = self.value_counts[column].sort_index()
+        values = counts.index.to_numpy(dtype=np.float64)
+        cumulative = counts.to_numpy().cumsum()
+        n = cumulative[-1]
+        # Same as np.median: the middle value, or the mean of the two middle values
+        lower = values[np.searchsorted(cumulative, (n - 1) // 2 + 1)]
+        upper = values[np.searchsorted(cumulative, n // 2 + 1)]
+        return (lower + upper) / 2.0
+
+    def _mode(self, column):
+        counts = self.value_counts[column]
+        # SimpleImputer(strategy="most_frequent") breaks ties with the smallest value
+        most = counts.max()
+        return sorted(counts[counts == most].index)[0]
+
+    def to_compiled_preprocessor(self):
+        """
+        Builds the fitted preprocessor from the accumulated statistics.
+
+        Returns:
+            CompiledPreprocessor: Same layout as compile_preprocessor(ColumnTransformer) output,
+                                  numerical columns first, then the one-hot columns.
+        """
+        fill_values, category_index, output_index = {}, {}, {}
+        offset, scale = [], []
+
+        for column in self.numerical_columns:
+            median = self._median(column)
+            counts = self.value_counts[column]
+            values = counts.index.to_numpy(dtype=np.float64)
+            weights = counts.to_numpy(dtype=np.float64)
+            # The imputed column has the missing rows set to the median
+            values = np.append(values, median)
+            weights = np.append(weights, self.missing_counts[column])
+            mean = np.average(values, weights=weights)
+            var = np.average((values - mean) ** 2, weights=weights)
+
+            fill_values[column] = median
+            output_index[column] = len(offset)
+            offset.append(mean)
+            scale.append(np.sqrt(var) if var > 0 else 1.0)
+
+        for column in self.categorical_columns:
+            mode = self._mode(column)
+            counts = self.value_counts[column].copy()
+            counts[mode] = counts.get(mode, 0) + self.missing_counts[column]
+
+            fill_values[column] = mode
+            category_index[column] = {}
+            for category in sorted(counts.index):
+                p = counts[category] / self.n_rows
+                var = p * (1.0 - p)
+                category_index[column][str(category)] = len(offset)
+                offset.append(0.0)  # StandardScaler(with_mean=False)
+                scale.append(np.sqrt(var) if var > 0 else 1.0)
+
+        return CompiledPreprocessor(
+            input_columns=self.input_columns,
+            numerical_columns=self.numerical_columns,
+            categorical_columns=self.categorical_columns,
+            fill_values=fill_values,
+            category_index=category_index,
+            output_index=output_index,
+            offset=offset,
+            scale=scale,
+        )
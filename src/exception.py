@@ -1,6 +1,27 @@
 import sys # Provides access to system-specific parameters and functions (e.g., exception handling)
 # from src.logger import logging # For tracking events during runtime
 
+# Utility function to format the detailed error message from a traceback
+def format_error_message(error, exc_tb):
+    """
+    Formats the detailed error message for an error and the traceback it was caught with.
+
+    Parameters:
+    error (Exception): The caught exception object.
+    exc_tb (traceback): The traceback of the caught exception, or None outside an except block.
+
+    Returns:
+    str: A formatted error message string.
+    """
+    if exc_tb is None:
+        # Raised directly rather than from an except block, there is no location to report
+        return "Error occurred error message [{0}]".format(str(error))
+    file_name = exc_tb.tb_frame.f_code.co_filename  # Get the name of the script where the exception occurred
+    error_message = "Error occurred in python script name [{0}] line number [{1}] error message [{2}]".format(
+        file_name, exc_tb.tb_lineno, str(error)  # Format the error details: filename, line number, and error message
+    )
+    return error_message  # Return the formatted error message
+
 # Utility function to create a detailed error message
 def error_message_detail(error, error_detail: sys):
     """
@@ -17,11 +38,7 @@ def error_message_detail(error, error_detail: sys):
     str: A formatted error message string.
     """
     _, _, exc_tb = error_detail.exc_info()  # Extract traceback details (type, value, and traceback object)
-    file_name = exc_tb.tb_frame.f_code.co_filename  # Get the name of the script where the exception occurred
-    error_message = "Error occurred in python script name [{0}] line number [{1}] error message [{2}]".format(
-        file_name, exc_tb.tb_lineno, str(error)  # Format the error details: filename, line number, and error message
-    )
-    return error_message  # Return the formatted error message
+    return format_error_message(error, exc_tb)
     
 # Custom exception class for detailed error reporting
 class CustomException(Exception):
@@ -29,20 +46,33 @@ class CustomException(Exception):
     A custom exception class to provide detailed error messages,
     including the filename, line number, and error message.
 
+    Only the traceback is kept when the exception is raised; the message is formatted
+    the first time it is rendered (str(), logging), so wrapping errors on hot paths
+    stays cheap when nobody looks at the message.
+
     Inherits from Python's built-in Exception class.
     """
 
-    def __init__(self, error_message, error_detail: sys):
+    def __init__(self, error_message, error_detail: sys = sys):
         """
         Constructor for the CustomException class.
 
         Parameters:
         error_message (str): A custom message describing the error.
-        error_detail (sys): sys module to access exception traceback details.
+        error_detail (sys): sys module to access exception traceback details (the default).
         """
         super().__init__(error_message)  # Initialize the parent Exception class with the error message
-        # Use the error_message_detail function to generate a detailed error message
-        self.error_message = error_message_detail(error_message, error_detail=error_detail)
+        self._exc_tb = error_detail.exc_info()[2]  # Keep the traceback, the message is built on first use
+        self._error_message = None
+
+    @property
+    def error_message(self):
+        """
+        The detailed error message, formatted once on first access.
+        """
+        if self._error_message is None:
+            self._error_message = format_error_message(self.args[0], self._exc_tb)
+        return self._error_message
 
     def __str__(self):
         """
@@ -52,10 +82,21 @@ class CustomException(Exception):
         str: The detailed error message.
         """
         return self.error_message  # Return the detailed error message when the exception is converted to a string
+
+# Exception class for rejected prediction inputs
+class ValidationError(ValueError):
+    """
+    Raised when a prediction input is rejected up front (missing field, unknown
+    category, score out of range).
+
+    It is an expected outcome of bad user input rather than a failure, so it carries
+    no traceback details and is never wrapped in a CustomException: callers catch it
+    and answer with a 400 or a form error.
+    """
     
 # if __name__ == "__main__":
 #     try:
 #         a=1/0
 #     except Exception as e:
 #         logging.info("Divide by Zero")
-#         raise CustomException(e, sys)
\ No newline at end of file
+#         raise CustomException(e, sys)
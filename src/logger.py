@@ -1,27 +1,245 @@
+import atexit # For flushing the queued records when the process exits
+import json # For writing each record as one JSON line
 import logging # For logging messages to a file or console
+import logging.handlers # For QueueHandler
 import os # For interacting with the operating system (e.g., file paths, directories)
-from datetime import datetime # For working with dates and times
+import queue # For handing records from the caller to the writer thread
+import sys # For reporting write failures on stderr
+import threading # For the background writer thread
+import traceback # For reporting write failures on stderr
+from dataclasses import dataclass
+from datetime import datetime, timezone # For the record timestamps
 
-# Generate a unique log file name based on the current timestamp
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+@dataclass
+class LoggingConfig:
+    # One log file shared by every process started from the same directory
+    log_dir: str = os.environ.get("LOG_DIR", os.path.join(os.getcwd(), "logs"))
+    log_file_name: str = "app.jsonl"
+    level: str = os.environ.get("LOG_LEVEL", "INFO")
+    # Rotate to app.jsonl.1 ... app.jsonl.<backup_count> once the file reaches max_bytes
+    max_bytes: int = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    backup_count: int = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+    # Records held in memory; when the writer falls this far behind, new records are dropped (and counted)
+    queue_size: int = 10_000
+    # Records written with a single write() call at most
+    batch_size: int = 256
+    # How long the writer waits to fill a batch before writing what it has
+    flush_interval_seconds: float = 0.2
 
-# Define the path for the logs directory and include the log file
-logs_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
+# Attributes every LogRecord has; anything else was passed with extra={...} and is added to the JSON line
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
 
-# Create the logs directory if it doesn't already exist
-os.makedirs(logs_path, exist_ok=True)
+class JSONFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line: timestamp, level, logger, message,
+    source location, process / thread, the exception if any, plus any extra={...} fields.
+    """
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "lineno": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for name, value in vars(record).items():
+            if name not in _STANDARD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        return json.dumps(entry, default=str)
+
+class BatchingJSONFileWriter:
+    """
+    Background thread that drains the log queue and appends the records to the log
+    file in batches, one write() per batch.
+
+    Only the writer thread opens, writes and rotates the file, so no other thread can
+    hold a handle that a rotation renames away. Rotation is also safe with several
+    processes writing the same file (e.g. the pre-fork server's workers): the size is
+    checked on the path rather than on the open file, and a writer whose file was
+    rotated away by another process reopens the new one.
+    """
+    def __init__(self, config: LoggingConfig, log_queue):
+        self.logging_config = config
+        self.log_queue = log_queue
+        self.file_path = os.path.join(config.log_dir, config.log_file_name)
+        self.formatter = JSONFormatter()
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._file = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Asks the thread to write what is queued and exit, and waits up to `timeout` seconds.
+
+        Returns:
+            bool: True if the thread has exited (it no longer holds the file).
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        try:
+            self.log_queue.put(None, timeout=timeout)
+        except queue.Full:
+            return False
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def record_dropped(self):
+        """
+        Counts one record the caller could not enqueue; safe to call from any thread.
+        """
+        with self._dropped_lock:
+            self._dropped += 1
+
+    def _take_dropped(self):
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+    def _open(self):
+        os.makedirs(self.logging_config.log_dir, exist_ok=True) # Create the logs directory on first use
+        # Unbuffered append: each batch is a single write() call, so batches from
+        # several processes never interleave in the middle of a line
+        self._file = open(self.file_path, "ab", buffering=0)
+
+    def _rotate_if_needed(self):
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            self._file.close()
+            return self._open()
+        if stat.st_ino != os.fstat(self._file.fileno()).st_ino:
+            # Another process rotated the file, follow it
+            self._file.close()
+            return self._open()
+        if stat.st_size < self.logging_config.max_bytes:
+            return
+        self._file.close()
+        for index in range(self.logging_config.backup_count - 1, 0, -1):
+            source = f"{self.file_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.file_path}.{index + 1}")
+        if self.logging_config.backup_count > 0:
+            os.replace(self.file_path, f"{self.file_path}.1")
+        else:
+            os.remove(self.file_path)
+        self._open()
+
+    def _write(self, records):
+        lines = [self.formatter.format(record) for record in records]
+        dropped = self._take_dropped()
+        if dropped:
+            lines.append(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "level": "WARNING", "logger": __name__,
+                "message": f"Log queue was full, dropped {dropped} records",
+            }))
+        if self._file is None:
+            self._open()
+        else:
+            self._rotate_if_needed()
+        self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def _run(self):
+        config = self.logging_config
+        stopping = False
+        while not stopping:
+            record = self.log_queue.get()
+            if record is None:
+                break
+            batch = [record]
+            # Keep filling the batch until it is full or nothing arrives for flush_interval_seconds
+            while len(batch) < config.batch_size:
+                try:
+                    record = self.log_queue.get(timeout=config.flush_interval_seconds)
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            try:
+                self._write(batch)
+            except Exception:
+                # Never let a logging failure kill the thread
+                print(f"--- Failed to write {len(batch)} log records ---", file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+        if self._file is not None:
+            self._file.close()
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    The handler on the caller's side: it only resolves the message and enqueues the
+    record, the file I/O happens on the writer thread. The writer is started on the
+    first record (importing this module has no side effects) and again after a fork,
+    since the parent's thread does not exist in the child.
+    """
+    def __init__(self, config: LoggingConfig):
+        self.logging_config = config
+        self._lock = threading.Lock()
+        self._reset()
+        super().__init__(self.log_queue)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self.log_queue = self.queue = queue.Queue(maxsize=self.logging_config.queue_size)
+        self.writer = None
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _ensure_writer(self):
+        if self.writer is None:
+            with self._lock:
+                if self.writer is None:
+                    writer = BatchingJSONFileWriter(self.logging_config, self.log_queue)
+                    writer.start()
+                    atexit.register(writer.stop)
+                    self.writer = writer
+
+    def prepare(self, record):
+        # Resolve the message and the traceback now, the writer thread formats the rest
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_writer()
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            self.writer.record_dropped()
+
+logging_config = LoggingConfig()
 
 # Complete path to the log file
-LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
+LOG_FILE_PATH = os.path.join(logging_config.log_dir, logging_config.log_file_name)
 
 # Configure the logging system
 logging.basicConfig(
-    filename = LOG_FILE_PATH, # Set the file to which logs will be written
-    format = "[%(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s", # Define the log message format
-    level = logging.INFO, # Set the logging level to INFO (captures INFO, WARNING, ERROR, CRITICAL)
+    handlers = [NonBlockingQueueHandler(logging_config)], # Enqueue records, a background thread writes them
+    level = logging_config.level, # Set the logging level (INFO by default: captures INFO, WARNING, ERROR, CRITICAL)
 )
 
 # # Main block: This ensures the following code runs only when the script is executed directly
 # if __name__ == "__main__":
 #     # Log an informational message to indicate that logging has started
-#     logging.info("Logging has started")
\ No newline at end of file
+#     logging.info("Logging has started")
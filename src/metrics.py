@@ -0,0 +1,186 @@
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Upper bounds in seconds, from 100 µs (a cached prediction) to a minute (a training stage)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# HELP text of the metrics recorded in this repo
+DESCRIPTIONS = {
+    "http_request_duration_seconds": "Time to handle an HTTP request",
+    "prediction_stage_seconds": "Time spent in each stage of a prediction request",
+    "training_stage_seconds": "Time spent in each training pipeline stage",
+    "model_search_seconds": "Time to search the hyperparameters of one model",
+    "model_search_fit_seconds": "Mean fit time of one hyperparameter candidate per cross-validation fold",
+    "model_search_candidates_total": "Hyperparameter candidates evaluated",
+    "micro_batch_size": "Records scored together in one micro-batch",
+    "micro_batch_queue_depth": "Records still queued when a micro-batch is dispatched",
+}
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+class Histogram:
+    """
+    A Prometheus-style histogram: cumulative bucket counts, sum and count, per label set.
+    """
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, labels=()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def snapshot(self, labels=()):
+        """
+        The bucket counts (per bucket, not cumulative), count and sum of one label set.
+        """
+        counts, total, count = self._series.get(labels, ([0] * (len(self.buckets) + 1), 0, 0))
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {"buckets": dict(zip(bounds, counts)), "count": count, "sum": total}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(labels)} {total}")
+            lines.append(f"{self.name}_count{_label_text(labels)} {count}")
+        return lines
+
+class Counter:
+    """
+    A Prometheus-style counter per label set.
+    """
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._series = {}
+
+    def inc(self, amount=1, labels=()):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_label_text(labels)} {value}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Process-wide collection of histograms and counters.
+
+    Recording is a perf_counter call, a bisect and a few additions under one lock
+    (a few microseconds), so the instrumentation stays on in production.
+    Each process keeps its own numbers; under the pre-fork server every worker
+    answers /metrics for itself.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, kind, name, description, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self.lock:
+                metric = self._metrics.setdefault(name, kind(name, description or DESCRIPTIONS.get(name, ""), **kwargs))
+        return metric
+
+    def histogram(self, name, description="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, description, buckets=buckets)
+
+    def counter(self, name, description=""):
+        return self._get(Counter, name, description)
+
+    def observe(self, name, value, description="", **labels):
+        histogram = self.histogram(name, description)
+        with self.lock:
+            histogram.observe(value, _label_key(labels))
+
+    def inc(self, name, amount=1, description="", **labels):
+        counter = self.counter(name, description)
+        with self.lock:
+            counter.inc(amount, _label_key(labels))
+
+    def snapshot(self, name, **labels):
+        """
+        Returns one series of the histogram `name` as a dict (see Histogram.snapshot).
+        """
+        histogram = self.histogram(name)
+        with self.lock:
+            return histogram.snapshot(_label_key(labels))
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self.lock:
+            lines = []
+            for name in sorted(self._metrics):
+                lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path):
+        """
+        Writes the metrics to a file, for batch jobs such as training that are not
+        scraped (e.g. for node_exporter's textfile collector).
+        """
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path + ".tmp", "w") as file_obj:
+            file_obj.write(self.render())
+        os.replace(file_path + ".tmp", file_path)
+
+metrics = MetricsRegistry()
+
+class timed:
+    """
+    Records the duration of the enclosed block in the histogram `name`, in seconds.
+    Works as a decorator too, timing every call of the function.
+
+    Example:
+        with timed("prediction_stage_seconds", stage="transform"):
+            features = preprocessor.transform(df)
+    """
+    def __init__(self, name, description="", **labels):
+        self.histogram = metrics.histogram(name, description)
+        self.labels = _label_key(labels)
+        self._started = None
+
+    def _observe(self, elapsed):
+        with metrics.lock:
+            self.histogram.observe(elapsed, self.labels)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._observe(time.perf_counter() - self._started)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._observe(time.perf_counter() - started)
+        return wrapper
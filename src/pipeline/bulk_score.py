@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.columnar_store import load_frame
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.model_registry import get_model_registry
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS, PredictPipeline
+
+PREDICTION_COLUMN = "predicted_math_score"
+ERROR_COLUMN = "error"
+
+@dataclass
+class BulkScoringConfig:
+    chunksize: int = 50_000
+    n_workers: int = os.cpu_count() or 1
+    resume: bool = False
+    keep_shards: bool = False
+
+# Set once per worker process by _init_worker
+_worker_pipeline = None
+
+def _init_worker():
+    """
+    Loads the model artifacts once when a worker process starts.
+    """
+    global _worker_pipeline
+    _worker_pipeline = PredictPipeline()
+    _worker_pipeline.registry.get()
+
+def _score_shard(shard_index, chunk, shard_path):
+    """
+    Scores one chunk and writes it (input columns + prediction + error) to its shard file.
+    The file is written under a temporary name and renamed, so an existing shard file
+    always means a completed shard.
+
+    Returns:
+        tuple: (shard_index, number of rows, model version)
+    """
+    results = _worker_pipeline.predict_batch(chunk[FEATURE_COLUMNS].to_dict("records"))
+    errors = {error["index"]: error["error"] for error in results["errors"]}
+
+    chunk = chunk.copy()
+    chunk[PREDICTION_COLUMN] = results["predictions"]
+    chunk[ERROR_COLUMN] = [errors.get(i, "") for i in range(len(chunk))]
+    chunk.to_csv(shard_path + ".tmp", index=False, header=False)
+    os.replace(shard_path + ".tmp", shard_path)
+    return shard_index, len(chunk), results["model_version"]
+
+def iter_chunks(input_path, chunksize):
+    """
+    Yields the input in chunks of `chunksize` rows, from a CSV file or a columnar dataset directory.
+    """
+    if os.path.isdir(input_path):
+        df = load_frame(input_path, mmap=True)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunksize)
+
+class BulkScorer:
+    """
+    Scores a large file of students with PredictPipeline across a process pool.
+
+    The input is streamed in chunks and each chunk is one shard. Shards go to a pool of
+    worker processes that each load the artifacts once. Finished shards are written to
+    <output>.shards/, so an interrupted run started again with resume=True only scores the
+    shards that are missing. When all shards are done, they are concatenated in input order
+    into the output CSV.
+    """
+    def __init__(self, config: BulkScoringConfig = None):
+        self.scoring_config = config or BulkScoringConfig()
+
+    def _prepare_shard_dir(self, shard_dir, manifest):
+        manifest_path = os.path.join(shard_dir, "manifest.json")
+        if self.scoring_config.resume and os.path.exists(manifest_path):
+            with open(manifest_path) as file_obj:
+                previous = json.load(file_obj)
+            if previous != manifest:
+                raise ValueError(
+                    "Cannot resume: the input, chunk size or model version differs from the interrupted run"
+                )
+            return
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        os.makedirs(shard_dir)
+        with open(manifest_path, "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2)
+
+    def score(self, input_path, output_path):
+        """
+        Scores every row of `input_path` and writes the results to `output_path` in input order.
+
+        Args:
+            input_path (str): CSV file or columnar dataset directory with the feature columns.
+            output_path (str): CSV file to write, with the input columns plus
+                               predicted_math_score and error.
+
+        Returns:
+            dict: Rows scored, rows skipped on resume, elapsed seconds and rows per second.
+        """
+        try:
+            config = self.scoring_config
+            started = time.perf_counter()
+            shard_dir = output_path + ".shards"
+            model_version = get_model_registry().get().version
+
+            chunks = iter_chunks(input_path, config.chunksize)
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                raise ValueError(f"{input_path} has no rows")
+            missing = [column for column in FEATURE_COLUMNS if column not in first_chunk.columns]
+            if missing:
+                raise ValueError(f"{input_path} is missing columns: {', '.join(missing)}")
+
+            manifest = {
+                "input_path": os.path.abspath(input_path),
+                "chunksize": config.chunksize,
+                "model_version": model_version,
+                "columns": list(first_chunk.columns) + [PREDICTION_COLUMN, ERROR_COLUMN],
+            }
+            self._prepare_shard_dir(shard_dir, manifest)
+
+            def shard_path(index):
+                return os.path.join(shard_dir, f"shard_{index:06d}.csv")
+
+            n_scored = n_skipped = n_shards = 0
+            pending = set()
+            with ProcessPoolExecutor(max_workers=config.n_workers, initializer=_init_worker) as executor:
+                def collect(return_when):
+                    nonlocal pending, n_scored
+                    done, pending = wait(pending, return_when=return_when)
+                    for future in done:
+                        shard_index, n_rows, version = future.result()
+                        if version != model_version:
+                            raise ValueError(f"Shard {shard_index} was scored with model {version}, expected {model_version}")
+                        n_scored += n_rows
+                        elapsed = time.perf_counter() - started
+                        logging.info(f"Scored shard {shard_index}: {n_scored} rows, {n_scored / elapsed:.0f} rows/s")
+                        print(f"\rscored {n_scored} rows ({n_scored / elapsed:,.0f} rows/s)", end="", file=sys.stderr)
+
+                for shard_index, chunk in enumerate(itertools.chain([first_chunk], chunks)):
+                    n_shards += 1
+                    if config.resume and os.path.exists(shard_path(shard_index)):
+                        n_skipped += len(chunk)
+                        continue
+                    # Bound the number of chunks held in memory at once
+                    if len(pending) >= 2 * config.n_workers:
+                        collect(FIRST_COMPLETED)
+                    pending.add(executor.submit(_score_shard, shard_index, chunk, shard_path(shard_index)))
+                while pending:
+                    collect(FIRST_COMPLETED)
+            print(file=sys.stderr)
+
+            # Concatenate the shards in input order
+            with open(output_path + ".tmp", "w", newline="") as output_file:
+                pd.DataFrame(columns=manifest["columns"]).to_csv(output_file, index=False)
+                for shard_index in range(n_shards):
+                    with open(shard_path(shard_index), newline="") as shard_file:
+                        shutil.copyfileobj(shard_file, output_file)
+            os.replace(output_path + ".tmp", output_path)
+            if not config.keep_shards:
+                shutil.rmtree(shard_dir)
+
+            elapsed = time.perf_counter() - started
+            summary = {
+                "rows_scored": n_scored,
+                "rows_resumed": n_skipped,
+                "shards": n_shards,
+                "model_version": model_version,
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(n_scored / elapsed, 1) if elapsed > 0 else None,
+            }
+            logging.info(f"Bulk scoring completed: {summary}")
+            return summary
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a file of students with the trained model")
+    parser.add_argument("input_path", help="CSV file or columnar dataset directory")
+    parser.add_argument("output_path", help="CSV file to write the predictions to")
+    parser.add_argument("--chunksize", type=int, default=BulkScoringConfig.chunksize, help="Rows per shard")
+    parser.add_argument("--workers", type=int, default=BulkScoringConfig.n_workers, help="Worker processes")
+    parser.add_argument("--resume", action="store_true", help="Keep the shards of an interrupted run")
+    parser.add_argument("--keep-shards", action="store_true", help="Do not delete the shard files at the end")
+    args = parser.parse_args()
+
+    scorer = BulkScorer(BulkScoringConfig(
+        chunksize=args.chunksize, n_workers=args.workers, resume=args.resume, keep_shards=args.keep_shards
+    ))
+    print(json.dumps(scorer.score(args.input_path, args.output_path), indent=2))
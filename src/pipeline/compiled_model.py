@@ -0,0 +1,339 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+class CompiledLinearModel:
+    """
+    A NumPy-only copy of a fitted linear model: predict is X @ coef + intercept.
+    """
+    # Set on export when the compiled model is only faster on small batches: the largest batch
+    # it serves, larger ones go to model.pkl (see BatchSizeRouter). None serves every batch
+    max_batch_rows = None
+
+    def __init__(self, coef, intercept, source):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.source = source
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+class CompiledTreeEnsemble:
+    """
+    A NumPy-only copy of fitted regression trees (a single tree, a forest or a boosted ensemble).
+
+    Every tree is flattened into shared node arrays: feature, threshold, left, right and
+    value, with leaves pointing to themselves. Prediction walks all rows through all trees
+    at once, one vectorized step per tree level, so the cost is max_depth NumPy calls per
+    chunk of rows instead of one Python call per tree.
+
+    The trees are combined as base + scale * sum(leaf values), or as the weighted median
+    of the tree predictions (AdaBoost) when `weights` is given.
+
+    Features are cast to float32 before the comparisons, as sklearn, XGBoost and CatBoost
+    all do. Missing values are not handled: the preprocessor imputes them beforehand.
+    """
+    # Rows evaluated at once, so a large batch does not allocate a (n_rows, n_trees) index per level for all rows
+    chunk_size = 4096
+    max_batch_rows = None
+
+    def __init__(self, trees, base=0.0, scale=1.0, strict=False, weights=None, source=""):
+        """
+        Args:
+            trees (list): One (feature, threshold, left, right, value) tuple of per-node arrays per tree,
+                          where left / right are -1 for a leaf.
+            base (float): Constant added to the combined prediction.
+            scale (float): Factor applied to the sum of the leaf values.
+            strict (bool): Go left on x < threshold (XGBoost) instead of x <= threshold (sklearn).
+            weights (array): Per-tree weights for a weighted median instead of a sum.
+            source (str): Class name of the exported model.
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for feature, threshold, left, right, value in trees:
+            n_nodes = len(value)
+            index = np.arange(offset, offset + n_nodes)
+            left, right = np.asarray(left), np.asarray(right)
+            is_leaf = left < 0
+            # Leaves point to themselves, so rows that reached one stay put while the rest keep walking
+            lefts.append(np.where(is_leaf, index, left + offset))
+            rights.append(np.where(is_leaf, index, right + offset))
+            features.append(np.where(is_leaf, 0, feature))
+            thresholds.append(np.where(is_leaf, 0.0, threshold))
+            values.append(value)
+            roots.append(offset)
+            offset += n_nodes
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.value = np.concatenate(values).astype(np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max(_tree_depth(np.asarray(left), np.asarray(right)) for _, _, left, right, _ in trees)
+        self.base = float(base)
+        self.scale = float(scale)
+        self.strict = strict
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.source = source
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaf_values(self, X):
+        n_rows = len(X)
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        rows = np.arange(n_rows)[:, None]
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x < self.threshold[node] if self.strict else x <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node]
+
+    def _combine(self, leaf_values):
+        if self.weights is None:
+            return self.base + self.scale * leaf_values.sum(axis=1)
+        # Weighted median of the tree predictions, the way AdaBoostRegressor combines them
+        sorted_index = np.argsort(leaf_values, axis=1)
+        weight_cdf = np.cumsum(self.weights[sorted_index], axis=1)
+        median_index = np.argmax(weight_cdf >= 0.5 * weight_cdf[:, -1][:, None], axis=1)
+        rows = np.arange(len(leaf_values))
+        return leaf_values[rows, sorted_index[rows, median_index]]
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        predictions = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_size):
+            stop = start + self.chunk_size
+            predictions[start:stop] = self._combine(self._leaf_values(X[start:stop]))
+        return predictions
+
+class CompiledObliviousEnsemble:
+    """
+    A NumPy-only copy of a CatBoost model with symmetric (oblivious) trees.
+
+    Every level of an oblivious tree uses the same split, so a row's leaf is just the
+    bits (x > border) of the tree's splits read as an integer; all trees are evaluated
+    with one comparison per split and a gather from the flattened leaf values.
+    """
+    def __init__(self, trees, scale, bias, source):
+        """
+        Args:
+            trees (list): One (features, borders, leaf_values) tuple per tree, where split i sets bit i of the leaf index.
+            scale (float): Factor applied to the sum of the leaf values.
+            bias (float): Constant added after scaling.
+            source (str): Class name of the exported model.
+        """
+        depths = [len(features) for features, _, _ in trees]
+        self.max_depth = max(depths)
+        n_trees = len(trees)
+        # Pad shallower trees with a split that never fires (x > inf), so every tree has max_depth splits
+        self.split_feature = np.zeros((n_trees, self.max_depth), dtype=np.intp)
+        self.split_border = np.full((n_trees, self.max_depth), np.inf, dtype=np.float64)
+        leaf_offsets = []
+        leaf_values = []
+        offset = 0
+        for i, (features, borders, values) in enumerate(trees):
+            self.split_feature[i, :len(features)] = features
+            self.split_border[i, :len(borders)] = np.asarray(borders, dtype=np.float32)
+            leaf_offsets.append(offset)
+            leaf_values.append(np.asarray(values, dtype=np.float64))
+            offset += len(values)
+        self.leaf_offset = np.asarray(leaf_offsets, dtype=np.intp)
+        self.leaf_value = np.concatenate(leaf_values)
+        self.bit = (1 << np.arange(self.max_depth)).astype(np.intp)
+        self.scale = float(scale)
+        self.bias = float(bias)
+        self.source = source
+
+    # Rows evaluated at once, bounding the (n_rows, n_trees, depth) split outcomes
+    chunk_size = 1024
+    max_batch_rows = None
+
+    def _predict_chunk(self, X):
+        # (n_rows, n_trees, depth) split outcomes -> (n_rows, n_trees) leaf index
+        bits = X[:, self.split_feature] > self.split_border
+        leaf = (bits * self.bit).sum(axis=2) + self.leaf_offset
+        return self.bias + self.scale * self.leaf_value[leaf].sum(axis=1)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        predictions = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_size):
+            stop = start + self.chunk_size
+            predictions[start:stop] = self._predict_chunk(X[start:stop])
+        return predictions
+
+class BatchSizeRouter:
+    """
+    Serves a compiled model together with the estimator it was exported from.
+
+    The compiled trees are walked level by level for every row and tree, which beats the
+    estimator's per-call overhead on a few rows but loses to its native code on large
+    batches. Batches of up to compiled.max_batch_rows rows go to the compiled model and
+    larger ones to the estimator.
+    """
+    def __init__(self, compiled, model):
+        self.compiled = compiled
+        self.model = model
+        self.max_compiled_rows = compiled.max_batch_rows
+
+    def predict(self, X):
+        if X.shape[0] <= self.max_compiled_rows:
+            return self.compiled.predict(X)
+        return self.model.predict(X)
+
+def _tree_depth(left, right):
+    max_depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if left[node] < 0:
+            max_depth = max(max_depth, depth)
+        else:
+            stack.append((left[node], depth + 1))
+            stack.append((right[node], depth + 1))
+    return max_depth
+
+def _sklearn_tree(estimator):
+    tree = estimator.tree_
+    return tree.feature, tree.threshold, tree.children_left, tree.children_right, tree.value[:, 0, 0]
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    if booster.feature_types and any(feature_type == "c" for feature_type in booster.feature_types):
+        raise ValueError("XGBoost models with categorical splits cannot be compiled")
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    gradient_booster = learner["gradient_booster"]
+    if gradient_booster["name"] != "gbtree":
+        raise ValueError(f"XGBoost booster {gradient_booster['name']} cannot be compiled")
+    if learner["objective"]["name"] not in ("reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror"):
+        raise ValueError(f"XGBoost objective {learner['objective']['name']} cannot be compiled")
+
+    trees = gradient_booster["model"]["trees"]
+    try:
+        # After early stopping predict() only uses the trees up to the best iteration
+        n_parallel_trees = int(gradient_booster["model"]["gbtree_model_param"]["num_parallel_tree"])
+        trees = trees[:(model.best_iteration + 1) * n_parallel_trees]
+    except AttributeError:
+        pass
+
+    flattened = []
+    for tree in trees:
+        left = np.asarray(tree["left_children"])
+        # A leaf's weight is stored in its split_conditions slot
+        flattened.append((tree["split_indices"], np.asarray(tree["split_conditions"], dtype=np.float32),
+                          left, tree["right_children"], np.where(left < 0, tree["split_conditions"], 0.0)))
+    # base_score is "5.0E1", or "[5.0E1]" since XGBoost 3
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+    return CompiledTreeEnsemble(flattened, base=base_score, strict=True, source=type(model).__name__)
+
+def _compile_catboost(model):
+    file_descriptor, json_path = tempfile.mkstemp(suffix=".json")
+    os.close(file_descriptor)
+    try:
+        model.save_model(json_path, format="json")
+        with open(json_path) as file_obj:
+            dump = json.load(file_obj)
+    finally:
+        os.remove(json_path)
+
+    if "oblivious_trees" not in dump:
+        raise ValueError("Only CatBoost models with symmetric trees can be compiled")
+    float_features = dump["features_info"]["float_features"]
+    if dump["features_info"].get("categorical_features"):
+        raise ValueError("Only CatBoost models with numerical features can be compiled")
+    flat_index = {feature["feature_index"]: feature["flat_feature_index"] for feature in float_features}
+
+    trees = []
+    for tree in dump["oblivious_trees"]:
+        splits = tree["splits"]
+        if any(split["split_type"] != "FloatFeature" for split in splits):
+            raise ValueError("Only CatBoost float feature splits can be compiled")
+        trees.append((
+            [flat_index[split["float_feature_index"]] for split in splits],
+            [split["border"] for split in splits],
+            tree["leaf_values"],
+        ))
+    scale, bias = dump.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    return CompiledObliviousEnsemble(trees, scale=scale, bias=bias, source=type(model).__name__)
+
+def compile_model(model):
+    """
+    Exports a fitted model from ModelTrainer.get_models to a NumPy-only equivalent.
+
+    Supported: LinearRegression, DecisionTreeRegressor, RandomForestRegressor,
+    GradientBoostingRegressor, AdaBoostRegressor, XGBRegressor and CatBoostRegressor.
+    K-Neighbors needs the whole training set at predict time and is not exported.
+
+    Args:
+        model: The fitted estimator.
+
+    Returns:
+        CompiledLinearModel | CompiledTreeEnsemble | CompiledObliviousEnsemble: An object with the same predict().
+
+    Raises:
+        ValueError: If the model type or its configuration cannot be compiled.
+    """
+    # Dispatch on the class name, so exporting never imports a library the model does not use
+    name = type(model).__name__
+
+    if name == "LinearRegression":
+        return CompiledLinearModel(np.ravel(model.coef_), np.ravel(model.intercept_)[0], source=name)
+
+    if name == "DecisionTreeRegressor":
+        return CompiledTreeEnsemble([_sklearn_tree(model)], source=name)
+
+    if name == "RandomForestRegressor":
+        return CompiledTreeEnsemble([_sklearn_tree(tree) for tree in model.estimators_],
+                                    scale=1.0 / len(model.estimators_), source=name)
+
+    if name == "GradientBoostingRegressor":
+        if model.init_ == "zero":
+            base = 0.0
+        elif type(model.init_).__name__ == "DummyRegressor":
+            base = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ValueError(f"GradientBoostingRegressor with init={type(model.init_).__name__} cannot be compiled")
+        return CompiledTreeEnsemble([_sklearn_tree(tree) for tree in model.estimators_[:, 0]],
+                                    base=base, scale=model.learning_rate, source=name)
+
+    if name == "AdaBoostRegressor":
+        n_estimators = len(model.estimators_)
+        return CompiledTreeEnsemble([_sklearn_tree(tree) for tree in model.estimators_],
+                                    weights=model.estimator_weights_[:n_estimators], source=name)
+
+    if name == "XGBRegressor":
+        return _compile_xgboost(model)
+
+    if name == "CatBoostRegressor":
+        return _compile_catboost(model)
+
+    raise ValueError(f"Cannot compile {name}")
+
+def check_model_parity(model, compiled, X, tolerance=1e-5):
+    """
+    Verifies that the compiled model reproduces model.predict.
+
+    The tree ensembles may differ from the original in the last bits, because the
+    leaf values are summed in a different order (XGBoost and CatBoost also sum in
+    float32), so the predictions are compared up to `tolerance` relative to their scale.
+
+    Returns:
+        float: The largest absolute difference.
+
+    Raises:
+        ValueError: If any prediction differs by more than the tolerance.
+    """
+    expected = np.asarray(model.predict(X), dtype=np.float64).ravel()
+    actual = compiled.predict(X)
+    if actual.shape != expected.shape:
+        raise ValueError(f"Compiled model returned shape {actual.shape}, expected {expected.shape}")
+    max_diff = float(np.max(np.abs(actual - expected), initial=0.0))
+    if max_diff > tolerance * max(1.0, float(np.max(np.abs(expected), initial=0.0))):
+        raise ValueError(f"Compiled model differs from {type(model).__name__}.predict by up to {max_diff:g}")
+    return max_diff
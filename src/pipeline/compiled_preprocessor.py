@@ -0,0 +1,190 @@
+import numpy as np
+
+class CompiledPreprocessor:
+    """
+    A pandas-free copy of the fitted ColumnTransformer from DataTransformation.
+
+    Fitting still happens in sklearn. After that, the fitted statistics are exported into
+    a few plain arrays:
+    - fill_values: the imputer median / mode per input column
+    - category_index: category -> output column lookup table per categorical column
+    - offset / scale: one vector each covering every output column, so all the StandardScaler
+      steps run as a single (X - offset) / scale
+
+    The output is bit-for-bit the same as preprocessor.transform, which check_parity verifies.
+    The streaming transformation builds one directly from chunked statistics instead.
+    """
+    def __init__(self, input_columns, numerical_columns, categorical_columns,
+                 fill_values, category_index, output_index, offset, scale):
+        self.input_columns = list(input_columns)
+        self.numerical_columns = list(numerical_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.fill_values = dict(fill_values)
+        self.category_index = {column: dict(table) for column, table in category_index.items()}
+        self.output_index = dict(output_index)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.n_features_out = len(self.offset)
+
+    @property
+    def categories(self):
+        return {column: set(table) for column, table in self.category_index.items()}
+
+    def transform_columns(self, columns):
+        """
+        Transforms column-oriented input into the feature matrix.
+
+        Args:
+            columns: Any mapping of column name -> 1-D array-like (a dict of lists,
+                     a NumPy structured array, or a DataFrame).
+
+        Returns:
+            np.ndarray: Feature matrix of shape (n_rows, n_features_out).
+
+        Raises:
+            ValueError: If a categorical column holds a value not seen during fitting.
+        """
+        n_rows = len(columns[self.input_columns[0]])
+        X = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+
+        for column in self.numerical_columns:
+            values = np.array(columns[column], dtype=np.float64)
+            values[np.isnan(values)] = self.fill_values[column]
+            X[:, self.output_index[column]] = values
+
+        rows = np.arange(n_rows)
+        for column in self.categorical_columns:
+            values = np.asarray(columns[column], dtype=object)
+            missing = np.array([value is None or value != value for value in values.tolist()], dtype=bool)
+            if missing.any():
+                values = values.copy()
+                values[missing] = self.fill_values[column]
+
+            # Look up each distinct value once, then scatter with the inverse index
+            unique_values, inverse = np.unique(values.astype(str), return_inverse=True)
+            table = self.category_index[column]
+            try:
+                unique_index = np.array([table[value] for value in unique_values.tolist()], dtype=np.intp)
+            except KeyError as e:
+                raise ValueError(f"Found unknown category {e.args[0]!r} in column {column}")
+            X[rows, unique_index[inverse.reshape(-1)]] = 1.0
+
+        X -= self.offset
+        X /= self.scale
+        return X
+
+    def transform(self, records):
+        """
+        Transforms row-oriented input into the feature matrix.
+
+        Args:
+            records: A list of dicts, a list of tuples in `input_columns` order,
+                     a single dict, or a NumPy structured array. A DataFrame is accepted
+                     too, so this object can stand in for preprocessor.transform.
+
+        Returns:
+            np.ndarray: Feature matrix of shape (n_rows, n_features_out).
+        """
+        if hasattr(records, "columns") or (isinstance(records, np.ndarray) and records.dtype.names is not None):
+            return self.transform_columns(records)
+        if isinstance(records, dict):
+            records = [records]
+        if not len(records):
+            columns = {column: [] for column in self.input_columns}
+        elif isinstance(records[0], dict):
+            columns = {column: [record.get(column) for record in records] for column in self.input_columns}
+        else:
+            columns = dict(zip(self.input_columns, zip(*records)))
+        return self.transform_columns(columns)
+
+def compile_preprocessor(preprocessor):
+    """
+    Exports the fitted ColumnTransformer built by DataTransformation.get_data_transformer_object.
+
+    Each transformer must be a Pipeline of SimpleImputer, an optional OneHotEncoder and
+    a StandardScaler, which is what this repo fits.
+
+    Args:
+        preprocessor (ColumnTransformer): The fitted preprocessor.
+
+    Returns:
+        CompiledPreprocessor: The equivalent NumPy-only preprocessor.
+
+    Raises:
+        ValueError: If the preprocessor contains steps that cannot be compiled.
+    """
+    numerical_columns, categorical_columns = [], []
+    fill_values, category_index, output_index = {}, {}, {}
+    offset, scale = [], []
+
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "remainder":
+            if pipeline != "drop":
+                raise ValueError("Only remainder='drop' can be compiled")
+            continue
+
+        steps = pipeline.named_steps
+        imputer = steps.get("imputer")
+        encoder = steps.get("one_hot_encoder")
+        scaler = steps.get("scaler")
+        if imputer is None or scaler is None or len(steps) != (3 if encoder is not None else 2):
+            raise ValueError(f"Cannot compile transformer {name} with steps {list(steps)}")
+
+        # Output columns before scaling, in the order the ColumnTransformer emits them
+        for i, column in enumerate(columns):
+            fill_values[column] = imputer.statistics_[i]
+            if encoder is None:
+                numerical_columns.append(column)
+                output_index[column] = len(offset)
+                offset.append(0.0)
+            else:
+                if encoder.drop_idx_ is not None:
+                    raise ValueError("OneHotEncoder(drop=...) cannot be compiled")
+                categorical_columns.append(column)
+                category_index[column] = {}
+                for category in encoder.categories_[i]:
+                    category_index[column][str(category)] = len(offset)
+                    offset.append(0.0)
+
+        # Fuse this transformer's StandardScaler into the shared offset / scale vectors
+        start = len(scale)
+        n_out = len(offset) - start
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_out)
+        scale_ = scaler.scale_ if scaler.with_std else np.ones(n_out)
+        offset[start:] = list(mean)
+        scale.extend(scale_)
+
+    return CompiledPreprocessor(
+        input_columns=list(preprocessor.feature_names_in_),
+        numerical_columns=numerical_columns,
+        categorical_columns=categorical_columns,
+        fill_values=fill_values,
+        category_index=category_index,
+        output_index=output_index,
+        offset=offset,
+        scale=scale,
+    )
+
+def check_parity(preprocessor, compiled, features_df, expected=None):
+    """
+    Verifies that the compiled preprocessor reproduces preprocessor.transform exactly,
+    for both the column-oriented and the row-oriented entry points.
+
+    Args:
+        expected (np.ndarray, optional): preprocessor.transform(features_df), when the caller already has it.
+
+    Raises:
+        ValueError: If any output value differs.
+    """
+    if expected is None:
+        expected = preprocessor.transform(features_df)
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+
+    columns = {column: features_df[column].to_numpy() for column in compiled.input_columns}
+    records = features_df[compiled.input_columns].to_dict("records")
+    for name, actual in (("transform_columns", compiled.transform_columns(columns)),
+                         ("transform", compiled.transform(records))):
+        if actual.shape != expected.shape or not np.array_equal(actual, expected):
+            n_diff = int(np.sum(actual != expected)) if actual.shape == expected.shape else "all"
+            raise ValueError(f"Compiled preprocessor {name} differs from preprocessor.transform ({n_diff} values)")
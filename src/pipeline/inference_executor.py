@@ -0,0 +1,151 @@
+import asyncio
+import collections
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from src.logger import logging
+
+@dataclass
+class InferenceExecutorConfig:
+    max_workers: int = 4
+    # Requests allowed to wait for a worker; beyond that new requests are rejected
+    max_queue_depth: int = 32
+    default_deadline_ms: float = 1000.0
+    # Recent latencies kept for the percentiles
+    latency_window: int = 10_000
+
+class Overloaded(Exception):
+    """
+    The executor's queue is full. The caller should retry later (HTTP 429).
+    """
+
+class DeadlineExceeded(Exception):
+    """
+    The request's deadline passed before its prediction was ready (HTTP 503).
+    """
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted list, None if it is empty.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100.0 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+class InferenceExecutor:
+    """
+    Runs blocking prediction work on a bounded thread pool for asyncio callers, with
+    admission control.
+
+    - At most max_workers predictions run at once and at most max_queue_depth wait.
+      A request arriving when both are taken is rejected immediately with Overloaded
+      instead of queueing behind everyone else.
+    - Every request carries a deadline. A queued task whose deadline has already passed
+      when a worker picks it up is dropped without running. A caller whose deadline
+      passes while waiting gets DeadlineExceeded, and its task is cancelled if it has
+      not started yet.
+    """
+    def __init__(self, config: InferenceExecutorConfig = None):
+        self.executor_config = config or InferenceExecutorConfig()
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.executor_config.max_workers, thread_name_prefix="inference"
+        )
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._latencies_ms = collections.deque(maxlen=self.executor_config.latency_window)
+        self._counts = collections.Counter()
+
+    @property
+    def capacity(self):
+        return self.executor_config.max_workers + self.executor_config.max_queue_depth
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._counts["rejected_overloaded"] += 1
+                raise Overloaded(f"{self._admitted} requests in flight, limit is {self.capacity}")
+            self._admitted += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._admitted -= 1
+
+    def _run_before_deadline(self, deadline, fn, args):
+        if time.monotonic() >= deadline:
+            with self._lock:
+                self._counts["expired_in_queue"] += 1
+            raise DeadlineExceeded("Deadline passed while the request was queued")
+        return fn(*args)
+
+    async def run(self, fn, *args, deadline_ms=None):
+        """
+        Runs fn(*args) on the pool and awaits its result.
+
+        Args:
+            fn: Blocking callable, e.g. PredictPipeline.predict_batch.
+            deadline_ms (float): Time budget for queueing plus running,
+                                 defaults to default_deadline_ms.
+
+        Raises:
+            Overloaded: If the queue is full.
+            DeadlineExceeded: If the result is not ready within the deadline.
+        """
+        started = time.monotonic()
+        deadline_ms = self.executor_config.default_deadline_ms if deadline_ms is None else deadline_ms
+        deadline = started + deadline_ms / 1000.0
+
+        self._admit()
+        try:
+            future = self._pool.submit(self._run_before_deadline, deadline, fn, args)
+        except Exception:
+            self._release()
+            raise
+        # The slot is held until the task finishes or is cancelled, not until the caller gives up
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            # wait_for cancels the wrapper, which cancels the task if it is still queued
+            with self._lock:
+                self._counts["deadline_exceeded"] += 1
+            raise DeadlineExceeded(f"No result within {deadline_ms:.0f} ms")
+        except DeadlineExceeded:
+            with self._lock:
+                self._counts["deadline_exceeded"] += 1
+            raise
+
+        with self._lock:
+            self._counts["completed"] += 1
+            self._latencies_ms.append((time.monotonic() - started) * 1000.0)
+        return result
+
+    def stats(self):
+        """
+        Returns the in-flight count, outcome counters and p50 / p90 / p99 latency
+        (ms) of the recently completed requests.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            counts = dict(self._counts)
+            in_flight = self._admitted
+        return {
+            "in_flight": in_flight,
+            "max_workers": self.executor_config.max_workers,
+            "max_queue_depth": self.executor_config.max_queue_depth,
+            "counts": counts,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "window": len(latencies),
+            },
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        logging.info("Inference executor stopped")
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+
+# Fields of /proc/<pid>/smaps_rollup worth reporting, all in kB
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+def process_memory(pid="self"):
+    """
+    Reads the memory footprint of one process from /proc/<pid>/smaps_rollup (Linux only).
+
+    For forked workers the interesting numbers are:
+    - Pss: the process's fair share, shared pages divided by the number of processes mapping them
+    - Private_Clean + Private_Dirty (USS): what the process costs on its own; pages of the
+      preloaded model that a worker touched and copied show up here
+
+    Args:
+        pid (int | str): Process id, "self" for the calling process.
+
+    Returns:
+        dict: Field -> kB for MEMORY_FIELDS plus "Uss", or None if the process is gone
+              or the kernel does not provide smaps_rollup.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file_obj:
+            lines = file_obj.readlines()
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+
+    memory = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in MEMORY_FIELDS:
+            memory[name] = int(value.split()[0])
+    memory["Uss"] = memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0)
+    return memory
+
+def child_pids(pid):
+    """
+    Lists the direct children of a process, e.g. the workers of the pre-fork master.
+    """
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as file_obj:
+            children.extend(int(child) for child in file_obj.read().split())
+    return sorted(children)
+
+def memory_report(master_pid):
+    """
+    Memory footprint of the master process and each of its workers.
+
+    Returns:
+        dict: {"master": {...}, "workers": {pid: {...}}, "total_pss_kb": int}
+    """
+    master = process_memory(master_pid)
+    workers = {pid: process_memory(pid) for pid in child_pids(master_pid)}
+    workers = {pid: memory for pid, memory in workers.items() if memory is not None}
+    total_pss = sum(memory["Pss"] for memory in [master, *workers.values()] if memory is not None)
+    return {"master": master, "workers": workers, "total_pss_kb": total_pss}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the memory footprint of the pre-fork server and its workers")
+    parser.add_argument("master_pid", type=int, help="PID of the gunicorn master")
+    args = parser.parse_args()
+    print(json.dumps(memory_report(args.master_pid), indent=2))
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+
+from src.exception import ValidationError
+from src.logger import logging
+from src.metrics import metrics
+from src.pipeline.inference_executor import DeadlineExceeded
+from src.pipeline.predict_pipeline import PredictPipeline
+
+@dataclass
+class MicroBatcherConfig:
+    max_batch_size: int = 64
+    max_wait_ms: float = 2.0
+    # How long predict() waits for a result unless the caller passes its own timeout
+    default_timeout_ms: float = 1000.0
+    histogram_buckets: tuple = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+class MicroBatcher:
+    """
+    Collects concurrent single-row prediction requests into small batches.
+
+    Callers submit one record and get a Future back. A background worker waits for
+    the first record, then keeps collecting until it has `max_batch_size` records or
+    `max_wait_ms` has passed, and scores the whole batch with one
+    PredictPipeline.predict_batch call (one transform and one model.predict).
+    """
+    def __init__(self, predict_pipeline: PredictPipeline = None, config: MicroBatcherConfig = None):
+        self.batcher_config = config or MicroBatcherConfig()
+        self.predict_pipeline = predict_pipeline or PredictPipeline()
+        self._queue = queue.Queue()
+        # Record counts, not seconds: create both histograms with count buckets before the first observe
+        for name in ("micro_batch_size", "micro_batch_queue_depth"):
+            metrics.histogram(name, buckets=self.batcher_config.histogram_buckets)
+        self._worker = None
+        self._stopping = False
+
+    def start(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+        logging.info(
+            f"Micro-batcher started with max_batch_size={self.batcher_config.max_batch_size} "
+            f"max_wait_ms={self.batcher_config.max_wait_ms}"
+        )
+
+    def stop(self):
+        """
+        Stops the worker after it has scored everything already queued.
+        """
+        self._stopping = True
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def submit(self, record) -> Future:
+        """
+        Queues one record for scoring.
+
+        Args:
+            record (dict): Feature values for one student.
+
+        Returns:
+            Future: Resolves to the predicted math score, or raises ValidationError
+                    if the record fails validation.
+        """
+        if self._worker is None:
+            self.start()
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def predict(self, record, timeout=None):
+        """
+        Scores one record through the batcher and waits for its result.
+
+        Args:
+            record (dict): Feature values for one student.
+            timeout (float): Seconds to wait, e.g. what is left of the request's deadline;
+                             defaults to default_timeout_ms.
+
+        Raises:
+            ValidationError: If the record fails validation.
+            DeadlineExceeded: If the result is not ready in time. A record still queued is
+                              then dropped instead of scored.
+        """
+        if timeout is None:
+            timeout = self.batcher_config.default_timeout_ms / 1000.0
+        future = self.submit(record)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"No result within {timeout * 1000.0:.0f} ms")
+
+    def _collect_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.batcher_config.max_wait_ms / 1000.0
+        while len(batch) < self.batcher_config.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop sentinel, put it back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                if self._stopping and self._queue.empty():
+                    return
+                continue
+
+            metrics.observe("micro_batch_size", len(batch))
+            metrics.observe("micro_batch_queue_depth", self._queue.qsize())
+
+            # Skip the records whose caller has given up waiting (cancelled futures)
+            batch = [(record, future) for record, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            futures = [future for _, future in batch]
+            try:
+                results = self.predict_pipeline.predict_batch([record for record, _ in batch])
+                errors = {error["index"]: error["error"] for error in results["errors"]}
+                for index, future in enumerate(futures):
+                    if index in errors:
+                        future.set_exception(ValidationError(errors[index]))
+                    else:
+                        future.set_result(results["predictions"][index])
+            except Exception as e:
+                # Whatever went wrong, fail this batch's requests and keep serving the next ones
+                logging.error(f"Micro-batch prediction failed: {e}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self):
+        """
+        Returns the current queue depth plus batch-size and queue-depth histograms,
+        for tuning max_batch_size and max_wait_ms. The histograms are also on /metrics.
+        """
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.batcher_config.max_batch_size,
+            "max_wait_ms": self.batcher_config.max_wait_ms,
+            "batch_size": metrics.snapshot("micro_batch_size"),
+            "queue_depth_at_dispatch": metrics.snapshot("micro_batch_queue_depth")
+        }
@@ -0,0 +1,275 @@
+import hashlib
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import timed
+from src.pipeline.compiled_model import BatchSizeRouter
+from src.utils import load_object
+
+@dataclass
+class ModelRegistryConfig:
+    model_file_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    compiled_preprocessor_file_path: str = os.path.join("artifacts", "compiled_preprocessor.pkl")
+    compiled_model_file_path: str = os.path.join("artifacts", "compiled_model.pkl")
+    # Versioned artifacts published by training; when the store has a current version it is
+    # loaded instead of the files above
+    artifact_store_dir: str = os.path.join("artifacts", "store")
+    # Check every file of a store version against its manifest hash before loading it.
+    # Hashing reads the whole version, so it costs more than the memory-mapped load itself
+    verify_artifacts: bool = True
+    poll_interval_seconds: float = 2.0
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    An immutable pair of fitted artifacts that were loaded together.
+    When a compiled preprocessor exists, `preprocessor` is that same object.
+    When a compiled model exists, `model` is the compiled model and model.pkl is not loaded,
+    unless the compiled model is slower on large batches: `model` then routes each call to
+    one of the two by its row count (see BatchSizeRouter).
+
+    A request should fetch the bundle once and use only that reference, so a reload
+    that happens mid-request never mixes a new model with an old preprocessor.
+    """
+    model: object
+    preprocessor: object
+    version: str
+    compiled_preprocessor: object = None
+
+class ModelRegistry:
+    """
+    Process-wide holder for the fitted model and preprocessor.
+
+    The artifacts are deserialized once and the same bundle is handed to every caller.
+    An optional background thread watches the artifact files and swaps in a new bundle
+    when their content changes. The swap is a single reference assignment, so requests
+    already holding the old bundle finish on it untouched.
+
+    When training has published to the artifact store, the bundle is loaded from its
+    current version, with the large arrays memory-mapped rather than copied.
+    """
+    def __init__(self, config: ModelRegistryConfig = None):
+        self.registry_config = config or ModelRegistryConfig()
+        self._bundle = None
+        self._loaded_fingerprint = None
+        self._observed_fingerprint = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self.artifact_store = ArtifactStore(ArtifactStoreConfig(root_dir=self.registry_config.artifact_store_dir))
+
+    def _artifact_paths(self):
+        return (
+            self.registry_config.model_file_path,
+            self.registry_config.preprocessor_file_path,
+        )
+
+    def _optional_artifact_paths(self):
+        return (
+            self.registry_config.compiled_preprocessor_file_path,
+            self.registry_config.compiled_model_file_path,
+        )
+
+    def _uses_store(self):
+        return os.path.exists(self.artifact_store.current_file_path)
+
+    def _fingerprint(self):
+        # mtime and size are cheap to read, so they are used to decide whether
+        # the (more expensive) content hash needs to be computed at all
+        if self._uses_store():
+            # A publish replaces CURRENT only once the new version is complete
+            stat = os.stat(self.artifact_store.current_file_path)
+            return (("store", stat.st_mtime_ns, stat.st_size),)
+        fingerprint = []
+        for path in self._artifact_paths():
+            stat = os.stat(path)
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        for path in self._optional_artifact_paths():
+            if os.path.exists(path):
+                stat = os.stat(path)
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+            else:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+
+    def _content_hash(self):
+        if self._uses_store():
+            # The manifest already holds the hash of every file in the version
+            return self.artifact_store.current_version()
+        digest = hashlib.sha256()
+        paths = self._artifact_paths() + tuple(
+            path for path in self._optional_artifact_paths() if os.path.exists(path)
+        )
+        for path in paths:
+            with open(path, "rb") as file_obj:
+                for block in iter(lambda: file_obj.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()[:12]
+
+    def get(self) -> ModelBundle:
+        """
+        Returns the current bundle, loading the artifacts on first use.
+
+        Returns:
+            ModelBundle: The model, preprocessor and the version they were loaded from.
+        """
+        bundle = self._bundle
+        if bundle is None:
+            self.reload(force=True)
+            bundle = self._bundle
+        return bundle
+
+    def reload(self, force=False):
+        """
+        Loads the artifacts from disk if their content changed since the last load.
+
+        Args:
+            force (bool): Reload even if the files look unchanged.
+
+        Returns:
+            bool: True if a new bundle was swapped in.
+
+        Raises:
+            CustomException: If the artifacts cannot be read or deserialized.
+        """
+        try:
+            with self._lock:
+                fingerprint = self._fingerprint()
+                if not force and fingerprint == self._loaded_fingerprint:
+                    return False
+
+                version = self._content_hash()
+                if self._bundle is not None and version == self._bundle.version:
+                    # Touched but not modified, nothing to swap
+                    self._loaded_fingerprint = fingerprint
+                    return False
+
+                with timed("prediction_stage_seconds", stage="artifact_load"):
+                    if self._uses_store():
+                        bundle = self._load_store_bundle(version)
+                    else:
+                        bundle = self._load_file_bundle(version)
+
+                self._bundle = bundle
+                self._loaded_fingerprint = fingerprint
+                logging.info(f"Loaded model artifacts version {version}")
+                return True
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _load_store_bundle(self, version):
+        # Same precedence as the files: the compiled artifacts stand in for the sklearn ones
+        names = self.artifact_store.manifest(version)["artifacts"]
+        store = self.artifact_store
+        verify = self.registry_config.verify_artifacts
+        if "compiled_preprocessor" in names:
+            compiled_preprocessor = store.load("compiled_preprocessor", version=version, verify=verify)
+            preprocessor = compiled_preprocessor
+        else:
+            compiled_preprocessor = None
+            preprocessor = store.load("preprocessor", version=version, verify=verify)
+        if "compiled_model" in names:
+            model = store.load("compiled_model", version=version, verify=verify)
+            if model.max_batch_rows is not None:
+                model = BatchSizeRouter(model, store.load("model", version=version, verify=verify))
+        else:
+            model = store.load("model", version=version, verify=verify)
+        return ModelBundle(
+            model=model,
+            preprocessor=preprocessor,
+            version=version,
+            compiled_preprocessor=compiled_preprocessor,
+        )
+
+    def _load_file_bundle(self, version):
+        model_path, preprocessor_path = self._artifact_paths()
+        compiled_preprocessor_path, compiled_model_path = self._optional_artifact_paths()
+        if os.path.exists(compiled_preprocessor_path):
+            # The compiled preprocessor was parity-checked against preprocessor.pkl when
+            # it was written, so it stands in for it and sklearn.compose is never imported
+            compiled_preprocessor = load_object(file_path=compiled_preprocessor_path)
+            preprocessor = compiled_preprocessor
+        else:
+            compiled_preprocessor = None
+            preprocessor = load_object(file_path=preprocessor_path)
+        # Likewise the compiled model was parity-checked against model.pkl, and loading it
+        # needs neither sklearn nor XGBoost / CatBoost. One that is only faster on small
+        # batches is served next to model.pkl, which takes the large ones
+        if os.path.exists(compiled_model_path):
+            model = load_object(file_path=compiled_model_path)
+            if model.max_batch_rows is not None:
+                model = BatchSizeRouter(model, load_object(file_path=model_path))
+        else:
+            model = load_object(file_path=model_path)
+        return ModelBundle(
+            model=model,
+            preprocessor=preprocessor,
+            version=version,
+            compiled_preprocessor=compiled_preprocessor,
+        )
+
+    def _poll(self):
+        """
+        Reloads only once the files have stopped changing between two polls, so a
+        training run that is still writing model.pkl / preprocessor.pkl is not picked up half way.
+        """
+        try:
+            fingerprint = self._fingerprint()
+        except OSError:
+            return
+
+        settled = fingerprint == self._observed_fingerprint
+        self._observed_fingerprint = fingerprint
+        if settled and fingerprint != self._loaded_fingerprint:
+            try:
+                self.reload()
+            except CustomException as e:
+                logging.warning(f"Model reload failed, keeping version {self.version}: {e}")
+
+    def _watch(self):
+        while not self._stop_event.wait(self.registry_config.poll_interval_seconds):
+            self._poll()
+
+    @property
+    def version(self):
+        bundle = self._bundle
+        return bundle.version if bundle is not None else None
+
+    def start_watching(self):
+        """
+        Starts the background thread that hot-reloads changed artifacts.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._observed_fingerprint = self._loaded_fingerprint
+        self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+        logging.info("Started watching model artifacts for changes")
+
+    def stop_watching(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Returns the registry shared by the whole process, creating it on first call.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -1,25 +1,246 @@
+import math
 import sys
-import pandas as pd
-from src.exception import CustomException
-from src.utils import load_object
+import numpy as np
+from src.exception import CustomException, ValidationError
+from src.metrics import timed
+from src.pipeline.model_registry import get_model_registry
+from src.pipeline.prediction_cache import make_cache_key
+
+CATEGORICAL_FEATURES = [
+    "gender",
+    "race_ethnicity",
+    "parental_level_of_education",
+    "lunch",
+    "test_preparation_course"
+]
+NUMERICAL_FEATURES = ["reading_score", "writing_score"]
+FEATURE_COLUMNS = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+
+SCORE_RANGE = (0.0, 100.0)
+
+def get_known_categories(preprocessor):
+    """
+    Reads the categories the fitted one-hot encoder was trained on.
+
+    Args:
+        preprocessor (ColumnTransformer | Pipeline): The fitted preprocessor from DataTransformation,
+            or the preprocessor of a native categorical feature plan.
+
+    Returns:
+        dict: Column name -> set of accepted category values.
+    """
+    if hasattr(preprocessor, "steps"):
+        # A feature plan preprocessor wraps the ColumnTransformer in a Pipeline
+        preprocessor = preprocessor.steps[0][1]
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "categorical_pipeline":
+            encoder = pipeline.named_steps.get("one_hot_encoder") or pipeline.named_steps["ordinal_encoder"]
+            return {
+                column: set(categories)
+                for column, categories in zip(columns, encoder.categories_)
+            }
+    raise ValueError("preprocessor has no categorical_pipeline")
+
+def validate_record(record, known_categories):
+    """
+    Checks a single input record and converts it to the types the preprocessor expects.
+
+    Args:
+        record (dict): Raw feature values for one student.
+        known_categories (dict): Accepted values per categorical column.
+
+    Returns:
+        tuple: (clean_record, None) if the record is valid, otherwise (None, error_message).
+    """
+    if not isinstance(record, dict):
+        return None, "record must be a JSON object"
+
+    missing = [column for column in FEATURE_COLUMNS if record.get(column) is None]
+    if missing:
+        return None, f"missing fields: {', '.join(missing)}"
+
+    clean_record = {}
+    for column in CATEGORICAL_FEATURES:
+        value = record[column]
+        if value not in known_categories[column]:
+            return None, f"unknown value {value!r} for {column}"
+        clean_record[column] = value
+
+    for column in NUMERICAL_FEATURES:
+        value = record[column]
+        if isinstance(value, bool):
+            return None, f"{column} must be a number"
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None, f"{column} must be a number"
+        if math.isnan(value) or not SCORE_RANGE[0] <= value <= SCORE_RANGE[1]:
+            return None, f"{column} must be between {SCORE_RANGE[0]:g} and {SCORE_RANGE[1]:g}"
+        clean_record[column] = value
+
+    return clean_record, None
+
+def columns_to_records(columns):
+    """
+    Converts columnar input ({"gender": [...], "lunch": [...], ...}) to a list of records.
+
+    Raises:
+        ValidationError: If the columns are not lists of the same length.
+    """
+    lengths = {len(values) for values in columns.values() if isinstance(values, list)}
+    if len(lengths) != 1 or not all(isinstance(values, list) for values in columns.values()):
+        raise ValidationError("columns must be lists of equal length")
+    n_rows = lengths.pop()
+    return [{column: values[i] for column, values in columns.items()} for i in range(n_rows)]
 
 class PredictPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, registry=None, cache=None):
+        # The artifacts are loaded once per process by the registry, not per request
+        self.registry = registry or get_model_registry()
+        # Optional PredictionCache shared across requests
+        self.cache = cache
+        self._known_categories = None
+        self._known_categories_version = None
+    
+    def validate(self, record):
+        """
+        Checks one record against the categories of the current model, before any
+        DataFrame is built or the model is called.
+
+        Args:
+            record (dict): Raw feature values for one student (e.g. the form fields).
+
+        Returns:
+            dict: The record with the scores converted to float.
+
+        Raises:
+            ValidationError: If the record is rejected.
+        """
+        clean_record, error = validate_record(record, self._get_known_categories(self.registry.get()))
+        if error is not None:
+            raise ValidationError(error)
+        return clean_record
     
     def predict(self, features_df):
         try:
-            model_path = "artifacts\model.pkl"
-            preprocessor_path = "artifacts\preprocessor.pkl"
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
+            # Hold on to one bundle for the whole call so a hot reload
+            # cannot swap the model out from under this request
+            bundle = self.registry.get()
             
-            features_df_scaled = preprocessor.transform(features_df)
-            predictions = model.predict(features_df_scaled)
+            if self.cache is not None:
+                records = features_df.to_dict("records")
+                return np.array(self._score_records(bundle, records))
+            
+            with timed("prediction_stage_seconds", stage="transform"):
+                features_df_scaled = bundle.preprocessor.transform(features_df)
+            with timed("prediction_stage_seconds", stage="model_predict"):
+                predictions = bundle.model.predict(features_df_scaled)
             return predictions
         
         except Exception as e:
             raise CustomException(e, sys)
+    
+    def _get_known_categories(self, bundle):
+        if self._known_categories_version != bundle.version:
+            if bundle.compiled_preprocessor is not None:
+                self._known_categories = bundle.compiled_preprocessor.categories
+            else:
+                self._known_categories = get_known_categories(bundle.preprocessor)
+            self._known_categories_version = bundle.version
+        return self._known_categories
+    
+    def _score_columns(self, bundle, columns):
+        # The compiled preprocessor skips the DataFrame build and sklearn's per-call overhead
+        with timed("prediction_stage_seconds", stage="transform"):
+            if bundle.compiled_preprocessor is not None:
+                features_scaled = bundle.compiled_preprocessor.transform_columns(columns)
+            else:
+                import pandas as pd  # Only the sklearn fallback needs pandas, keep it off the import path
+                features_scaled = bundle.preprocessor.transform(pd.DataFrame(columns))
+        with timed("prediction_stage_seconds", stage="model_predict"):
+            return bundle.model.predict(features_scaled).tolist()
+    
+    def _score_records(self, bundle, records):
+        """
+        Scores already validated records, answering from the cache where possible
+        and computing all misses with one preprocessor and model call.
+        """
+        if self.cache is None:
+            columns = {column: [record[column] for record in records] for column in FEATURE_COLUMNS}
+            return self._score_columns(bundle, columns)
+        
+        self.cache.ensure_grid(bundle, CATEGORICAL_FEATURES, NUMERICAL_FEATURES, self._get_known_categories(bundle))
+        
+        predictions = [None] * len(records)
+        keys = [make_cache_key(record, CATEGORICAL_FEATURES, NUMERICAL_FEATURES) for record in records]
+        missed = []
+        for i, key in enumerate(keys):
+            predictions[i] = self.cache.get(key, bundle.version)
+            if predictions[i] is None:
+                missed.append(i)
+        
+        if missed:
+            columns = {column: [records[i][column] for i in missed] for column in FEATURE_COLUMNS}
+            for i, prediction in zip(missed, self._score_columns(bundle, columns)):
+                predictions[i] = prediction
+                self.cache.put(keys[i], bundle.version, prediction)
+        return predictions
+    
+    def predict_batch(self, records):
+        """
+        Scores many students with a single preprocessor and model call.
+
+        Invalid records are reported individually and left out of the model call,
+        so one bad row does not fail the whole batch.
+
+        Args:
+            records (list | dict): A list of records, or a dict of equal-length
+                                   column lists keyed by feature name.
+
+        Returns:
+            dict: {"predictions": [...], "errors": [...], "model_version": str}, where
+                  predictions has one entry per input record (None for invalid ones) and
+                  errors lists {"index": i, "error": message} for each rejected record.
+
+        Raises:
+            ValidationError: If `records` is a dict of columns of unequal length.
+        """
+        try:
+            if isinstance(records, dict):
+                records = columns_to_records(records)
+            
+            bundle = self.registry.get()
+            known_categories = self._get_known_categories(bundle)
+            
+            valid_indices = []
+            valid_records = []
+            errors = []
+            with timed("prediction_stage_seconds", stage="validate"):
+                for index, record in enumerate(records):
+                    clean_record, error = validate_record(record, known_categories)
+                    if error is not None:
+                        errors.append({"index": index, "error": error})
+                        continue
+                    valid_indices.append(index)
+                    valid_records.append(clean_record)
+            
+            predictions = [None] * len(records)
+            if valid_records:
+                # One transform and one predict for all valid rows
+                for index, prediction in zip(valid_indices, self._score_records(bundle, valid_records)):
+                    predictions[index] = prediction
+            
+            return {
+                "predictions": predictions,
+                "errors": errors,
+                "model_version": bundle.version
+            }
+        
+        except ValidationError:
+            # Bad input, not a failure: let the caller answer it without the traceback details
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
         
 
 # Responsible for mapping all the inputs that we get from the html with the backend    
@@ -42,18 +263,31 @@ class CustomData:
         self.reading_score = reading_score
         self.writing_score = writing_score
         
+    def get_input_data_as_dict(self):
+        return {
+            'gender': self.gender,
+            'race_ethnicity': self.race_ethnicity,
+            'parental_level_of_education': self.parental_level_of_education,
+            'lunch': self.lunch,
+            'test_preparation_course': self.test_preparation_course,
+            'reading_score': self.reading_score,
+            'writing_score': self.writing_score
+        }
+        
     def get_input_data_as_data_frame(self):
         try:
-            custom_data_dict = {
-                'gender': [self.gender],
-                'race_ethnicity': [self.race_ethnicity],
-                'parental_level_of_education': [self.parental_level_of_education],
-                'lunch': [self.lunch],
-                'test_preparation_course': [self.test_preparation_course],
-                'reading_score': [self.reading_score],
-                'writing_score': [self.writing_score]
-            }
-            return pd.DataFrame(custom_data_dict)
+            import pandas as pd
+            with timed("prediction_stage_seconds", stage="build_dataframe"):
+                custom_data_dict = {
+                    'gender': [self.gender],
+                    'race_ethnicity': [self.race_ethnicity],
+                    'parental_level_of_education': [self.parental_level_of_education],
+                    'lunch': [self.lunch],
+                    'test_preparation_course': [self.test_preparation_course],
+                    'reading_score': [self.reading_score],
+                    'writing_score': [self.writing_score]
+                }
+                return pd.DataFrame(custom_data_dict)
         
         except Exception as e:
             raise CustomException(e, sys)
\ No newline at end of file
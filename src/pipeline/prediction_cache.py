@@ -0,0 +1,210 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.logger import logging
+
+@dataclass
+class PredictionCacheConfig:
+    max_entries: int = 100_000
+    ttl_seconds: float = 3600.0
+    precompute_grid: bool = False
+    grid_score_range: tuple = (0, 100)
+    grid_chunk_size: int = 100_000
+
+def make_cache_key(record, categorical_columns, numerical_columns):
+    """
+    Normalizes one record into a hashable key, so that e.g. 70, 70.0 and "70"
+    for a score all hit the same entry.
+    """
+    return (
+        tuple(str(record[column]) for column in categorical_columns)
+        + tuple(float(record[column]) for column in numerical_columns)
+    )
+
+class PredictionGrid:
+    """
+    Dense lookup table holding the model's prediction for every combination of the
+    categorical values and every integer score in `score_range`.
+
+    For this dataset that is 240 category combinations x 101 x 101 scores (about 2.4M
+    float64 values, ~20MB), after which any integer-score request is a single array read.
+    """
+    def __init__(self, bundle, categorical_columns, numerical_columns, known_categories,
+                 score_range=(0, 100), chunk_size=100_000):
+        self.version = bundle.version
+        self.categorical_columns = list(categorical_columns)
+        self.numerical_columns = list(numerical_columns)
+        self.score_min, self.score_max = score_range
+        self.categories = [sorted(known_categories[column]) for column in self.categorical_columns]
+        self.category_position = [
+            {category: i for i, category in enumerate(categories)} for categories in self.categories
+        ]
+
+        n_scores = self.score_max - self.score_min + 1
+        self.shape = tuple(len(categories) for categories in self.categories) + (n_scores,) * len(self.numerical_columns)
+        self.table = self._build(bundle, chunk_size)
+
+    def _build(self, bundle, chunk_size):
+        axes = self.categories + [
+            np.arange(self.score_min, self.score_max + 1, dtype=np.float64)
+        ] * len(self.numerical_columns)
+        columns_order = self.categorical_columns + self.numerical_columns
+        n_cells = int(np.prod(self.shape))
+        table = np.empty(n_cells, dtype=np.float64)
+
+        started = time.perf_counter()
+        cells = itertools.product(*axes)
+        for start in range(0, n_cells, chunk_size):
+            chunk = list(itertools.islice(cells, chunk_size))
+            columns = {column: [cell[i] for cell in chunk] for i, column in enumerate(columns_order)}
+            if bundle.compiled_preprocessor is not None:
+                features = bundle.compiled_preprocessor.transform_columns(columns)
+            else:
+                import pandas as pd  # Only the sklearn fallback needs pandas
+                features = bundle.preprocessor.transform(pd.DataFrame(columns))
+            table[start:start + len(chunk)] = bundle.model.predict(features)
+
+        logging.info(
+            f"Precomputed prediction grid of {n_cells} cells for model version {self.version} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return table.reshape(self.shape)
+
+    def lookup(self, key):
+        """
+        Returns the precomputed prediction for a cache key, or None if the key falls
+        outside the grid (unknown category, non-integer or out-of-range score).
+        """
+        index = []
+        n_categorical = len(self.categorical_columns)
+        for position, value in zip(self.category_position, key[:n_categorical]):
+            i = position.get(value)
+            if i is None:
+                return None
+            index.append(i)
+        for score in key[n_categorical:]:
+            if not score.is_integer() or not self.score_min <= score <= self.score_max:
+                return None
+            index.append(int(score) - self.score_min)
+        return float(self.table[tuple(index)])
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions with a per-entry TTL.
+
+    Entries are tied to the model version they were computed with: the first lookup
+    made with a different version clears the cache (and drops the grid), so a hot
+    reload in the ModelRegistry never serves stale predictions.
+    """
+    def __init__(self, config: PredictionCacheConfig = None):
+        self.cache_config = config or PredictionCacheConfig()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._grid = None
+        self._grid_thread = None
+        self.hits = 0
+        self.grid_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        # Caller holds self._lock
+        if version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+                logging.info(f"Model version changed to {version}, clearing prediction cache")
+            self._entries.clear()
+            self._grid = None
+            self._version = version
+            return True
+        return False
+
+    def get(self, key, version):
+        """
+        Returns the cached prediction for `key` under model `version`, or None.
+        """
+        with self._lock:
+            self._check_version(version)
+            grid = self._grid
+            if grid is not None:
+                prediction = grid.lookup(key)
+                if prediction is not None:
+                    self.grid_hits += 1
+                    return prediction
+
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            prediction, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return prediction
+
+    def put(self, key, version, prediction):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (prediction, time.monotonic() + self.cache_config.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.cache_config.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def ensure_grid(self, bundle, categorical_columns, numerical_columns, known_categories):
+        """
+        Starts building the dense grid for `bundle` in a background thread if
+        precompute_grid is enabled and no grid exists for this model version yet.
+        Lookups fall back to the LRU entries until the grid is ready.
+        """
+        if not self.cache_config.precompute_grid:
+            return
+        with self._lock:
+            self._check_version(bundle.version)
+            if self._grid is not None or (self._grid_thread is not None and self._grid_thread.is_alive()):
+                return
+
+            def build():
+                try:
+                    grid = PredictionGrid(
+                        bundle, categorical_columns, numerical_columns, known_categories,
+                        score_range=self.cache_config.grid_score_range,
+                        chunk_size=self.cache_config.grid_chunk_size
+                    )
+                except Exception as e:
+                    logging.exception(f"Building the prediction grid failed, lookups use the LRU entries only: {e}")
+                    return
+                with self._lock:
+                    # The model may have been swapped while the grid was being built
+                    if self._version == grid.version:
+                        self._grid = grid
+
+            self._grid_thread = threading.Thread(target=build, name="prediction-grid", daemon=True)
+            self._grid_thread.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model_version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self.cache_config.max_entries,
+                "hits": self.hits,
+                "grid_hits": self.grid_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "grid_ready": self._grid is not None
+            }
@@ -0,0 +1,145 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from src.logger import BatchingJSONFileWriter, LoggingConfig, logging_config
+
+@dataclass
+class RequestCaptureConfig:
+    # Next to the application log by default; rotated to .1 ... .<backup_count> like it
+    file_path: str = os.path.join(logging_config.log_dir, "captured_requests.jsonl")
+    max_bytes: int = 50 * 1024 * 1024
+    backup_count: int = 5
+    # Fraction of requests captured, to bound the volume under heavy traffic
+    sample_rate: float = 1.0
+    # Entries held in memory; when the writer falls this far behind, new entries are dropped (and counted)
+    queue_size: int = 10_000
+    batch_size: int = 256
+    flush_interval_seconds: float = 0.5
+
+class _EntryFormatter:
+    def format(self, entry):
+        return json.dumps(entry, default=str)
+
+class RequestCapture:
+    """
+    Appends every prediction request and its result to a JSON-lines file, for replaying
+    real traffic with benchmarks/replay.py.
+
+    capture() only builds the entry and puts it on a bounded queue; the logger's batching
+    writer thread does the file I/O, one write() per batch, with the same size-based
+    rotation that is safe with several worker processes appending to one file. The writer
+    is started on the first entry, and again after a fork (the pre-fork server's workers).
+
+    One line per request:
+    {"timestamp", "endpoint", "status", "latency_ms", "model_version", "records", "predictions", "errors"}
+    """
+    def __init__(self, config: RequestCaptureConfig = None):
+        self.capture_config = config or RequestCaptureConfig()
+        self._writer_config = LoggingConfig(
+            log_dir=os.path.dirname(self.capture_config.file_path) or ".",
+            log_file_name=os.path.basename(self.capture_config.file_path),
+            max_bytes=self.capture_config.max_bytes,
+            backup_count=self.capture_config.backup_count,
+            queue_size=self.capture_config.queue_size,
+            batch_size=self.capture_config.batch_size,
+            flush_interval_seconds=self.capture_config.flush_interval_seconds,
+        )
+        self._lock = threading.Lock()
+        self._reset()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.capture_config.queue_size)
+        self.writer = None
+        self.captured = 0
+        self.dropped = 0
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _ensure_writer(self):
+        if self.writer is None or not self.writer.is_alive():
+            with self._lock:
+                if self.writer is None or not self.writer.is_alive():
+                    writer = BatchingJSONFileWriter(self._writer_config, self._queue)
+                    writer.formatter = _EntryFormatter()
+                    writer.start()
+                    atexit.register(writer.stop)
+                    self.writer = writer
+
+    def capture(self, endpoint, records, status, latency_ms, model_version=None, predictions=None, errors=None):
+        """
+        Queues one request for the capture file; never blocks and never raises on a full queue.
+
+        Args:
+            endpoint (str): The route that served the request.
+            records (list): The input records as received.
+            status (int): The HTTP status of the response.
+            latency_ms (float): Time spent serving the request.
+            model_version (str): Version of the artifacts that produced the predictions.
+            predictions (list): The predictions returned, if any.
+            errors (list): Per-record validation errors, or the request's error message.
+        """
+        if self.capture_config.sample_rate < 1.0 and random.random() >= self.capture_config.sample_rate:
+            return
+        self._ensure_writer()
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "endpoint": endpoint,
+            "status": status,
+            "latency_ms": round(latency_ms, 3),
+            "model_version": model_version,
+            "records": records,
+            "predictions": predictions,
+            "errors": errors,
+        }
+        try:
+            self._queue.put_nowait(entry)
+            queued = True
+        except queue.Full:
+            queued = False
+        # Request threads call this concurrently, the counters are updated under the lock
+        with self._lock:
+            if queued:
+                self.captured += 1
+            else:
+                self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            captured, dropped = self.captured, self.dropped
+        return {
+            "file_path": self.capture_config.file_path,
+            "sample_rate": self.capture_config.sample_rate,
+            "captured": captured,
+            "dropped": dropped,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def flush(self, timeout=5.0):
+        """
+        Writes out everything queued so far and stops the writer; the next capture() starts a new one.
+
+        A new writer is only started once the old thread has exited, so two threads never
+        write (or rotate) the capture file at the same time.
+
+        Returns:
+            bool: False if the writer did not finish within `timeout` seconds.
+        """
+        with self._lock:
+            writer = self.writer
+        if writer is None:
+            return True
+        if not writer.stop(timeout):
+            return False
+        with self._lock:
+            if self.writer is writer:
+                self.writer = None
+        return True
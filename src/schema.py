@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# Declared schema of the student dataset (notebook/data/stud.csv and every dataset derived from it).
+# Each categorical column has a fixed category set: a value outside it is rejected when the data is
+# read, instead of silently becoming a new category (or, with a CategoricalDtype, a missing value)
+CATEGORIES = {
+    "gender": ["female", "male"],
+    "race_ethnicity": ["group A", "group B", "group C", "group D", "group E"],
+    "parental_level_of_education": [
+        "associate's degree", "bachelor's degree", "high school",
+        "master's degree", "some college", "some high school",
+    ],
+    "lunch": ["free/reduced", "standard"],
+    "test_preparation_course": ["completed", "none"],
+}
+CATEGORICAL_COLUMNS = list(CATEGORIES)
+NUMERICAL_COLUMNS = ["reading_score", "writing_score"]
+TARGET_COLUMN_NAME = "math_score"
+FEATURE_COLUMNS = CATEGORICAL_COLUMNS + NUMERICAL_COLUMNS
+SCORE_COLUMNS = [TARGET_COLUMN_NAME] + NUMERICAL_COLUMNS
+
+# Scores are whole numbers from 0 to 100. float32 stores them exactly in half the memory of the
+# float64 / int64 pd.read_csv infers, and unlike a small integer type it can hold a missing
+# score (NaN), which the preprocessor imputes
+SCORE_DTYPE = np.dtype(np.float32)
+SCORE_RANGE = (0, 100)
+
+CATEGORY_DTYPES = {column: pd.CategoricalDtype(categories) for column, categories in CATEGORIES.items()}
+
+def _used_categories(values):
+    codes = values.cat.codes.to_numpy()
+    return values.cat.categories[np.unique(codes[codes >= 0])]
+
+def apply_schema(df):
+    """
+    Validates a student DataFrame against the declared schema and converts it to the compact dtypes:
+    Categoricals with the declared category set (int8 codes) and float32 scores.
+
+    Columns that already have their declared dtype, e.g. the memory-mapped columns of a columnar
+    dataset, are used as they are, without a copy. Columns outside the schema are kept unchanged.
+
+    Args:
+        df (pd.DataFrame): Student records, e.g. straight from pd.read_csv.
+
+    Returns:
+        pd.DataFrame: The same columns in the declared dtypes.
+
+    Raises:
+        ValueError: If a column is missing, a categorical column holds a value outside its
+                    categories, or a score is not a number from 0 to 100.
+    """
+    missing = [column for column in CATEGORICAL_COLUMNS + SCORE_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Student data is missing the columns {missing}")
+
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in CATEGORY_DTYPES and values.dtype != CATEGORY_DTYPES[column]:
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+            unknown = sorted(set(_used_categories(values)) - set(CATEGORIES[column]), key=str)
+            if unknown:
+                raise ValueError(f"Column {column} has values outside its declared categories: {unknown[:10]}")
+            values = values.cat.set_categories(CATEGORIES[column])
+        elif column in SCORE_COLUMNS:
+            if values.dtype != SCORE_DTYPE:
+                try:
+                    values = values.astype(SCORE_DTYPE)
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Column {column} holds a value that is not a score: {e}")
+            scores = values.to_numpy()
+            # NaN compares False, so missing scores pass and are left to the imputer
+            out_of_range = (scores < SCORE_RANGE[0]) | (scores > SCORE_RANGE[1])
+            if out_of_range.any():
+                raise ValueError(f"Column {column} has {int(out_of_range.sum())} scores outside "
+                                 f"{SCORE_RANGE[0]}-{SCORE_RANGE[1]}, e.g. {scores[out_of_range][0]:g}")
+        columns[column] = values
+    return pd.DataFrame(columns, copy=False)
+
+def read_students(file_path, chunksize=None):
+    """
+    Reads a student CSV straight into the declared dtypes and validates it (see apply_schema).
+
+    The categorical columns are parsed as Categoricals, so the strings of each row are never
+    held as Python objects, and the scores as float32.
+
+    Args:
+        file_path (str): The CSV file.
+        chunksize (int, optional): Read in chunks of this many rows.
+
+    Returns:
+        pd.DataFrame, or an iterator of DataFrames when chunksize is set.
+    """
+    dtypes = {column: "category" for column in CATEGORICAL_COLUMNS}
+    dtypes.update({column: SCORE_DTYPE for column in SCORE_COLUMNS})
+    if chunksize is None:
+        return apply_schema(pd.read_csv(file_path, dtype=dtypes))
+    return (apply_schema(chunk) for chunk in pd.read_csv(file_path, dtype=dtypes, chunksize=chunksize))
+
+def feature_frame(df, score_dtype=None):
+    """
+    The feature columns of a student DataFrame as a new DataFrame over the same column data,
+    where df.drop(columns=[TARGET_COLUMN_NAME]) would copy every column.
+
+    Args:
+        df (pd.DataFrame): Student records.
+        score_dtype (optional): Convert the score columns to this dtype (a copy of those two columns only).
+    """
+    columns = {}
+    for column in FEATURE_COLUMNS:
+        values = df[column]
+        if score_dtype is not None and column in NUMERICAL_COLUMNS:
+            values = values.astype(score_dtype)
+        columns[column] = values
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,191 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from dataclasses import asdict, dataclass, is_dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object, save_object
+
+@dataclass
+class StageCacheConfig:
+    cache_dir: str = os.path.join("artifacts", "cache")
+
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_path(path):
+    """
+    Hashes a file, or every file of a directory (e.g. a columnar dataset) in name order.
+    """
+    if not os.path.isdir(path):
+        return hash_file(path)
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        digest.update(name.encode())
+        digest.update(hash_path(os.path.join(path, name)).encode())
+    return digest.hexdigest()
+
+def _copy_path(source, target):
+    if os.path.isdir(source):
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(source, target)
+    else:
+        shutil.copyfile(source, target)
+
+def hash_array(array):
+    digest = hashlib.sha256()
+    array = np.ascontiguousarray(array)
+    digest.update(str((array.dtype.str, array.shape)).encode())
+    digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+def hash_matrix(matrix):
+    """
+    Hashes a dense, sparse (CSR / CSC) or object feature matrix.
+    """
+    if hasattr(matrix, "indptr"):
+        return hash_value([matrix.format, matrix.shape, hash_array(matrix.data),
+                           hash_array(matrix.indices), hash_array(matrix.indptr)])
+    if matrix.dtype == object:
+        return hash_array(np.asarray(matrix, dtype=np.float64))
+    return hash_array(matrix)
+
+def hash_value(value):
+    """
+    Hashes configs, parameter grids and other plain values through a canonical JSON dump.
+    """
+    if is_dataclass(value):
+        value = asdict(value)
+    payload = json.dumps(value, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def config_values(config):
+    """
+    Collects the settings of a component config, including the ones declared
+    as plain class attributes rather than dataclass fields.
+    """
+    values = {
+        name: value for name, value in vars(type(config)).items()
+        if not name.startswith("_") and not callable(value)
+    }
+    values.update(vars(config))
+    return values
+
+def code_version(*sources):
+    """
+    Hashes the source files of the given modules (or file paths), so a cached
+    stage is invalidated as soon as the code that produced it changes.
+    """
+    digest = hashlib.sha256()
+    for source in sources:
+        file_path = source if isinstance(source, str) else inspect.getsourcefile(source)
+        with open(file_path, "rb") as file_obj:
+            digest.update(file_obj.read())
+    return digest.hexdigest()
+
+class StageCache:
+    """
+    Content-addressed store for the outputs of one pipeline stage.
+
+    A stage computes a key from everything its output depends on (input file hashes,
+    config and code version). If an entry exists for that key, the stage restores the
+    stored artifacts instead of recomputing them.
+
+    Each entry is a directory artifacts/cache/<stage>/<key>/ holding copies of the output
+    files, any extra objects and arrays, and a manifest.json written last, so an entry
+    without a manifest (e.g. from an interrupted run) is never treated as a hit.
+    """
+    def __init__(self, stage_name, config: StageCacheConfig = None):
+        self.cache_config = config or StageCacheConfig()
+        self.stage_name = stage_name
+        self.stage_dir = os.path.join(self.cache_config.cache_dir, stage_name)
+
+    def make_key(self, **parts):
+        return hash_value(parts)[:16]
+
+    def _entry_dir(self, key):
+        return os.path.join(self.stage_dir, key)
+
+    def load(self, key):
+        """
+        Restores a cached entry.
+
+        Output files (or directories) are copied back to their original paths, skipped
+        when the content there is already the same. Arrays are memory-mapped, not read.
+
+        Returns:
+            dict | None: {"files": {...}, "objects": {...}, "arrays": {...}, "values": {...}},
+                         or None on a cache miss.
+        """
+        entry_dir = self._entry_dir(key)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path) as file_obj:
+                manifest = json.load(file_obj)
+
+            for name, entry in manifest["files"].items():
+                target = entry["path"]
+                if not os.path.exists(target) or hash_path(target) != entry["sha256"]:
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    _copy_path(os.path.join(entry_dir, name), target)
+
+            logging.info(f"Stage cache hit for {self.stage_name} ({key})")
+            return {
+                "files": {name: entry["path"] for name, entry in manifest["files"].items()},
+                "objects": {
+                    name: load_object(os.path.join(entry_dir, f"{name}.pkl")) for name in manifest["objects"]
+                },
+                "arrays": {
+                    name: np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r")
+                    for name in manifest["arrays"]
+                },
+                "values": manifest["values"],
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def store(self, key, files=None, objects=None, arrays=None, values=None):
+        """
+        Stores the outputs of a stage run under `key`.
+
+        Args:
+            key (str): Cache key from make_key.
+            files (dict): Name -> path of output files or directories to copy into the cache.
+            objects (dict): Name -> picklable object.
+            arrays (dict): Name -> NumPy array.
+            values (dict): Name -> JSON-serializable value.
+        """
+        files, objects, arrays, values = files or {}, objects or {}, arrays or {}, values or {}
+        try:
+            entry_dir = self._entry_dir(key)
+            os.makedirs(entry_dir, exist_ok=True)
+
+            manifest = {"files": {}, "objects": list(objects), "arrays": list(arrays), "values": values}
+            for name, path in files.items():
+                _copy_path(path, os.path.join(entry_dir, name))
+                manifest["files"][name] = {"path": path, "sha256": hash_path(path)}
+            for name, obj in objects.items():
+                save_object(os.path.join(entry_dir, f"{name}.pkl"), obj)
+            for name, array in arrays.items():
+                np.save(os.path.join(entry_dir, f"{name}.npy"), array)
+
+            # The manifest marks the entry as complete, so write it last and atomically
+            manifest_path = os.path.join(entry_dir, "manifest.json")
+            with open(manifest_path + ".tmp", "w") as file_obj:
+                json.dump(manifest, file_obj, indent=2)
+            os.replace(manifest_path + ".tmp", manifest_path)
+            logging.info(f"Stored {self.stage_name} outputs in the stage cache ({key})")
+        except Exception as e:
+            raise CustomException(e, sys)
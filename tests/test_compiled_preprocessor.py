@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_transformation import DataTransformation
+from src.pipeline.compiled_preprocessor import check_parity, compile_preprocessor
+from src.schema import CATEGORIES, FEATURE_COLUMNS, NUMERICAL_COLUMNS, TARGET_COLUMN_NAME, apply_schema, feature_frame
+
+@pytest.fixture(scope="module")
+def students():
+    rng = np.random.default_rng(0)
+    n_rows = 300
+    df = pd.DataFrame({column: rng.choice(categories, n_rows) for column, categories in CATEGORIES.items()})
+    for column in NUMERICAL_COLUMNS + [TARGET_COLUMN_NAME]:
+        df[column] = rng.integers(0, 101, n_rows).astype(float)
+    # Missing values in both kinds of columns, which the imputers fill
+    df.loc[[3, 17], "reading_score"] = np.nan
+    df.loc[[5, 40], "lunch"] = None
+    return feature_frame(apply_schema(df), score_dtype=np.float64)
+
+@pytest.fixture(scope="module")
+def fitted(students):
+    preprocessor = DataTransformation().get_data_transformer_object()
+    preprocessor.fit(students)
+    return preprocessor, compile_preprocessor(preprocessor)
+
+def test_check_parity_passes_on_training_data(students, fitted):
+    preprocessor, compiled = fitted
+    check_parity(preprocessor, compiled, students)
+
+def test_row_inputs_match_sklearn(students, fitted):
+    preprocessor, compiled = fitted
+    expected = preprocessor.transform(students)
+    records = students[compiled.input_columns].astype(object).where(students.notna(), None).to_dict("records")
+
+    np.testing.assert_array_equal(compiled.transform(records), expected)
+    np.testing.assert_array_equal(compiled.transform([tuple(record.values()) for record in records]), expected)
+    np.testing.assert_array_equal(compiled.transform(records[0]), expected[:1])
+
+def test_structured_array_matches_sklearn(students, fitted):
+    preprocessor, compiled = fitted
+    dtype = [(column, object if column in CATEGORIES else np.float64) for column in compiled.input_columns]
+    structured = np.empty(len(students), dtype=dtype)
+    for column in compiled.input_columns:
+        structured[column] = students[column].astype(object if column in CATEGORIES else np.float64).to_numpy()
+
+    np.testing.assert_array_equal(compiled.transform(structured), preprocessor.transform(students))
+
+def test_missing_values_are_imputed(students, fitted):
+    preprocessor, compiled = fitted
+    record = dict(zip(FEATURE_COLUMNS, students.iloc[0]))
+    record.update(reading_score=np.nan, lunch=None)
+    imputed = dict(record, reading_score=compiled.fill_values["reading_score"],
+                   lunch=compiled.fill_values["lunch"])
+
+    np.testing.assert_array_equal(compiled.transform(record), compiled.transform(imputed))
+    assert not np.isnan(compiled.transform(record)).any()
+
+def test_unseen_category_is_rejected(students, fitted):
+    _, compiled = fitted
+    record = dict(zip(FEATURE_COLUMNS, students.iloc[0]), race_ethnicity="group Z")
+
+    with pytest.raises(ValueError, match="unknown category 'group Z'"):
+        compiled.transform(record)
+
+def test_check_parity_detects_a_mismatch(students, fitted):
+    preprocessor, compiled = fitted
+    tampered = compile_preprocessor(preprocessor)
+    tampered.scale = tampered.scale * 1.001
+
+    with pytest.raises(ValueError, match="differs from preprocessor.transform"):
+        check_parity(preprocessor, tampered, students)